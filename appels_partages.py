@@ -0,0 +1,165 @@
+"""Appels sortants partagés par le processus : requêtes identiques regroupées, limites par fournisseur.
+
+Sous charge, plusieurs sessions demandent en même temps la même donnée
+(prévisions d'Alger ou d'Oran, fiche d'un modèle de climatiseur courant).
+Une requête lancée alors qu'une requête de même clé est déjà en cours
+l'attend et reçoit son résultat (ou son exception), sans nouvel appel
+(regroupement « single flight »). Les appels réellement émis respectent,
+par fournisseur, un nombre maximal d'appels simultanés et un débit (seau à
+jetons) pour rester dans les quotas des API. L'attente d'un appel partagé est
+bornée (``attente_max``) : un appel bloqué ne retient pas indéfiniment les
+sessions qui l'attendent, elles reçoivent ``TimeoutError``.
+
+Le résultat partagé est le même objet pour tous les appelants : il ne doit
+pas être modifié. Seuls les appels simultanés sont regroupés ; la
+réutilisation d'un résultat dans le temps relève des caches
+(``cache_meteo.py``, ``cache_rapports.py``).
+"""
+import concurrent.futures
+import contextlib
+import threading
+import time
+
+import traces
+
+# Limites par fournisseur : appels simultanés, débit (appels par seconde), rafale (appels sans attente),
+# attente maximale d'un appel partagé (s, au-delà des délais HTTP de l'appel émis et de ses relances)
+LIMITES = {
+    "owm": (8, 1.0, 10, 30.0),  # offre gratuite OpenWeatherMap : 60 appels par minute
+    "tameteo": (2, 0.5, 2, 30.0),  # page web lue en flux : peu d'appels simultanés
+    "deepseek": (4, 2.0, 4, 120.0),
+}
+LIMITES_DEFAUT = (4, 1.0, 4, 60.0)
+
+COMPTEURS = ("demandes", "emis", "economises", "echecs", "expires")
+
+
+class LimiteDebit:
+    """Seau à jetons thread-safe : ``debit`` jetons par seconde, au plus ``rafale`` en réserve."""
+
+    def __init__(self, debit, rafale=1):
+        self.debit = float(debit)
+        self.rafale = float(rafale)
+        self._jetons = self.rafale
+        self._instant = time.monotonic()
+        self._verrou = threading.Lock()
+
+    def acquerir(self):
+        """Consomme un jeton, en attendant qu'il soit disponible ; retourne l'attente (s)."""
+        with self._verrou:
+            maintenant = time.monotonic()
+            self._jetons = min(self.rafale, self._jetons + (maintenant - self._instant) * self.debit)
+            self._instant = maintenant
+            self._jetons -= 1
+            attente = max(0.0, -self._jetons / self.debit)
+        # Jeton réservé (réserve négative) : l'attente se fait hors verrou, les suivants réservent derrière
+        if attente:
+            time.sleep(attente)
+        return attente
+
+
+class AppelsPartages:
+    """Appels à un fournisseur : requêtes identiques simultanées regroupées, concurrence et débit limités."""
+
+    def __init__(self, nom, concurrence_max=4, debit=1.0, rafale=4, attente_max=60.0):
+        self.nom = nom
+        self.attente_max = attente_max
+        self._places = threading.BoundedSemaphore(concurrence_max)
+        self._limite = LimiteDebit(debit, rafale) if debit else None
+        self._en_cours = {}
+        self._verrou = threading.Lock()
+        self._compteurs = dict.fromkeys(COMPTEURS, 0)
+        self._attente_s = 0.0
+
+    @contextlib.contextmanager
+    def emission(self):
+        """Contexte d'un appel émis : attend une place (concurrence) puis un jeton (débit).
+
+        Sert aussi aux appels non regroupables (ex. complétions en flux).
+        """
+        with traces.span("appel.emission", fournisseur=self.nom) as s:
+            debut = time.monotonic()
+            with self._places:
+                if self._limite is not None:
+                    self._limite.acquerir()
+                attente = time.monotonic() - debut
+                s["attente_ms"] = round(attente * 1e3, 1)
+                with self._verrou:
+                    self._compteurs["emis"] += 1
+                    self._attente_s += attente
+                yield
+
+    def appeler(self, cle, fonction):
+        """Résultat de ``fonction()``, partagé avec les appels de même ``cle`` lancés pendant son exécution."""
+        with self._verrou:
+            self._compteurs["demandes"] += 1
+            futur = self._en_cours.get(cle)
+            partage = futur is not None
+            if partage:
+                self._compteurs["economises"] += 1
+            else:
+                futur = self._en_cours[cle] = concurrent.futures.Future()
+        if partage:
+            with traces.span("appel.partage", fournisseur=self.nom):
+                try:
+                    return futur.result(timeout=self.attente_max)
+                except concurrent.futures.TimeoutError:
+                    with self._verrou:
+                        self._compteurs["expires"] += 1
+                    raise TimeoutError(f"Appel partagé {self.nom} sans réponse après {self.attente_max:g} s") from None
+        try:
+            with self.emission():
+                resultat = fonction()
+        except BaseException as e:
+            # Les appelants en attente reçoivent la même exception
+            with self._verrou:
+                del self._en_cours[cle]
+                self._compteurs["echecs"] += 1
+            futur.set_exception(e)
+            raise
+        with self._verrou:
+            del self._en_cours[cle]
+        futur.set_result(resultat)
+        return resultat
+
+    def statistiques(self):
+        """Compteurs cumulés et appels en cours, sous forme de dictionnaire.
+
+        « demandes » : appels regroupables demandés ; « emis » : appels
+        réellement émis (y compris non regroupables) ; « economises » : appels
+        servis par un appel identique en cours ; « expires » : attentes d'un
+        appel partagé abandonnées après ``attente_max`` ; « attente_s » : attente
+        totale due aux limites de concurrence et de débit.
+        """
+        with self._verrou:
+            return {**self._compteurs, "en_cours": len(self._en_cours), "attente_s": round(self._attente_s, 3)}
+
+
+_fournisseurs = {}
+_verrou_fournisseurs = threading.Lock()
+
+
+def fournisseur(nom):
+    """Appels partagés du fournisseur ``nom``, créés au premier usage avec ses ``LIMITES``."""
+    with _verrou_fournisseurs:
+        if nom not in _fournisseurs:
+            _fournisseurs[nom] = AppelsPartages(nom, *LIMITES.get(nom, LIMITES_DEFAUT))
+        return _fournisseurs[nom]
+
+
+def statistiques():
+    """Compteurs de chaque fournisseur déjà utilisé par le processus, par nom de fournisseur."""
+    with _verrou_fournisseurs:
+        appels = dict(_fournisseurs)
+    return {nom: a.statistiques() for nom, a in sorted(appels.items())}
+
+
+def exposition_prometheus():
+    """Compteurs au format texte Prometheus, étiquetés par fournisseur."""
+    par_fournisseur = statistiques()
+    lignes = []
+    for nom in (*COMPTEURS, "en_cours", "attente_s"):
+        type_metrique = "gauge" if nom == "en_cours" else "counter"
+        lignes.append(f"# TYPE appels_{nom} {type_metrique}")
+        lignes.extend(f'appels_{nom}{{fournisseur="{f}"}} {stats[nom]}' for f, stats in par_fournisseur.items())
+    return "\n".join(lignes) + "\n"
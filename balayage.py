@@ -0,0 +1,85 @@
+"""Balayage de paramètres : évaluation d'une grille cartésienne de scénarios.
+
+Chaque axe de la grille est une liste (ou un ``range``) de valeurs pour l'un des
+paramètres de ``simulation.simuler``. La grille complète est aplatie puis
+simulée par lots vectorisés, sans boucle Python par scénario.
+"""
+import numpy as np
+import pandas as pd
+
+from simulation import simuler
+
+# Paramètres de simulation pouvant être balayés (champs des sections 1 et 2)
+PARAMETRES = (
+    "consommation_kw", "est_inverter", "age", "frequence_entretien",
+    "heures_utilisation", "hauteur", "type_vitrage", "orientation",
+    "presence_appareils", "nbr_personnes", "temp_confort", "isolation",
+)
+# Nombre de scénarios simulés par lot (borne la mémoire des tableaux horaires)
+TAILLE_LOT = 8192
+
+
+def grille_cartesienne(axes):
+    """Aplatit le produit cartésien des axes en un tableau 1D par paramètre."""
+    noms = list(axes)
+    valeurs = [np.asarray(list(axes[nom]) if isinstance(axes[nom], range) else axes[nom])
+               for nom in noms]
+    formes = []
+    for k, v in enumerate(valeurs):
+        forme = [1] * len(valeurs)
+        forme[k] = v.size
+        formes.append(v.reshape(forme))
+    return {nom: v.ravel() for nom, v in zip(noms, np.broadcast_arrays(*formes))}
+
+
+def balayer(temp_jour, humid_jour, axes, fixes=None, taille_lot=TAILLE_LOT):
+    """Simule toutes les combinaisons de ``axes`` pour une même météo.
+
+    ``axes`` associe un nom de paramètre à la liste de valeurs à tester,
+    ``fixes`` les paramètres communs à tous les scénarios. Retourne un
+    DataFrame (une ligne par scénario) avec les consommations totales sur la
+    période en kWh et l'économie réalisée.
+    """
+    fixes = dict(fixes or {})
+    inconnus = [nom for nom in list(axes) + list(fixes) if nom not in PARAMETRES]
+    if inconnus:
+        raise ValueError(f"Paramètres de balayage inconnus : {', '.join(inconnus)}")
+    for nom in axes:
+        fixes.pop(nom, None)
+
+    grille = grille_cartesienne(axes)
+    n = len(next(iter(grille.values()))) if grille else 1
+    total_normal = np.empty(n)
+    total_optimise = np.empty(n)
+    for debut in range(0, n, taille_lot):
+        lot = {nom: v[debut:debut + taille_lot] for nom, v in grille.items()}
+        resultats = simuler(temp_jour, humid_jour, **fixes, **lot)
+        total_normal[debut:debut + taille_lot] = resultats["journaliere_normale"].sum(axis=-1)
+        total_optimise[debut:debut + taille_lot] = resultats["journaliere_optimisee"].sum(axis=-1)
+
+    df = pd.DataFrame(grille) if grille else pd.DataFrame(index=range(1))
+    df["Consommation normale (kWh)"] = total_normal
+    df["Consommation optimisée (kWh)"] = total_optimise
+    df["Économie (kWh)"] = total_normal - total_optimise
+    with np.errstate(divide="ignore", invalid="ignore"):
+        df["Économie (%)"] = np.where(total_normal > 0, (total_normal - total_optimise) / total_normal * 100, 0.0)
+    return df
+
+
+def classement(df, n=None):
+    """Scénarios triés par économie décroissante (les ``n`` meilleurs si précisé)."""
+    df = df.sort_values("Économie (kWh)", ascending=False, kind="stable").reset_index(drop=True)
+    df.index = df.index + 1
+    df.index.name = "Rang"
+    return df if n is None else df.head(n)
+
+
+def economies_par_tarif(df, tarifs):
+    """Tableau long (scénario x tarif) des économies en DZD pour la carte de chaleur."""
+    tarifs = np.asarray(tarifs, dtype=np.float64)
+    economie = df["Économie (kWh)"].to_numpy()[:, None] * tarifs
+    return pd.DataFrame({
+        "Scénario": np.repeat(df.index.to_numpy(), len(tarifs)),
+        "Tarif (DZD/kWh)": np.tile(tarifs, len(df)),
+        "Économie (DZD)": economie.ravel(),
+    })
@@ -0,0 +1,113 @@
+"""Simulation d'un bâtiment : plusieurs pièces climatisées sous une même météo et un même tarif.
+
+Les pièces (et leurs climatiseurs) sont décrites par un tableau, une ligne
+par pièce, avec les colonnes de ``simulation_lot.py`` (``conso``,
+``inverter``, ``orientation``...) plus ``piece`` (nom) et ``surface``. Les
+colonnes absentes ou vides reprennent les valeurs communes (celles saisies
+dans l'application). Toutes les pièces sont simulées ensemble sur des
+tableaux ``(pièces, jours, 24)`` ; les facteurs propres aux pièces sont
+calculés une fois par tableau et réutilisés pour chaque météo.
+"""
+import numpy as np
+import pandas as pd
+
+from simulation import TARIF_ELECTRICITE, courbe_temperature, preparer, simuler_prepare
+from simulation_lot import COLONNES, inverter_booleen
+
+# Colonnes descriptives (non utilisées par le modèle)
+COLONNES_CONTEXTE = ["piece", "surface"]
+
+
+def parametres_pieces(pieces, communs=None):
+    """Paramètres de simulation (tableaux ``(pièces,)``) depuis le tableau des pièces.
+
+    ``communs`` donne, par nom de paramètre, la valeur des colonnes absentes ou vides.
+    """
+    communs = communs or {}
+    parametres = {}
+    for colonne, (nom, defaut) in COLONNES.items():
+        defaut = communs.get(nom, defaut)
+        if colonne not in pieces:
+            parametres[nom] = np.full(len(pieces), defaut, dtype=object if isinstance(defaut, str) else None)
+        elif colonne == "inverter":
+            valeurs = pieces[colonne]
+            parametres[nom] = np.where(valeurs.isna().to_numpy(), bool(defaut),
+                                       inverter_booleen(valeurs.fillna(defaut)))
+        elif isinstance(defaut, str):
+            valeurs = pieces[colonne].astype(object)
+            parametres[nom] = valeurs.where(valeurs.notna() & (valeurs != ""), defaut).to_numpy()
+        else:
+            parametres[nom] = pd.to_numeric(pieces[colonne], errors="coerce").fillna(defaut).to_numpy()
+    return parametres
+
+
+class Batiment:
+    """Pièces d'un bâtiment, prêtes à être simulées pour n'importe quelle météo."""
+
+    def __init__(self, pieces, communs=None):
+        pieces = pd.DataFrame(pieces).reset_index(drop=True)
+        if pieces.empty:
+            raise ValueError("Le bâtiment doit comporter au moins une pièce.")
+        noms = pieces["piece"] if "piece" in pieces else pd.Series([None] * len(pieces))
+        self.noms = [str(nom) if pd.notna(nom) and str(nom) else f"Pièce {i + 1}" for i, nom in enumerate(noms)]
+        self.surfaces = (pd.to_numeric(pieces["surface"], errors="coerce").to_numpy()
+                         if "surface" in pieces else np.full(len(pieces), np.nan))
+        self.parametres = parametres_pieces(pieces, communs)
+        # Facteurs (pièces, 1, 24) indépendants de la météo
+        self.facteurs = preparer(**self.parametres)
+
+    def __len__(self):
+        return len(self.noms)
+
+    def simuler(self, temp_jour, humid_jour, tarif=TARIF_ELECTRICITE):
+        """Simule toutes les pièces pour la météo ``(jours,)`` commune.
+
+        Retourne un dictionnaire : consommations horaires ``(pièces, jours, 24)``,
+        appel de puissance du bâtiment ``(jours, 24)`` en kW (« appel_normal »,
+        « appel_optimise »), pointes et heure de pointe, et le détail par pièce
+        (DataFrame).
+        """
+        humid = np.asarray(humid_jour, dtype=np.float64)[..., None]
+        resultats = simuler_prepare(courbe_temperature(temp_jour), humid, self.facteurs)
+        horaire_normale = resultats["horaire_normale"]
+        horaire_optimisee = resultats["horaire_optimisee"]
+        # Appel normal : puissance nominale des pièces allumées, identique chaque jour
+        appel_normal = np.broadcast_to(
+            (self.facteurs["puissance"][:, 0, 0] @ self.facteurs["masque"][:, 0, :]),
+            horaire_optimisee.shape[1:])
+        appel_optimise = horaire_optimisee.sum(axis=0)
+        jour_pointe, heure_pointe = np.unravel_index(np.argmax(appel_optimise), appel_optimise.shape)
+
+        total_normal = resultats["journaliere_normale"].sum(axis=-1)
+        total_optimise = resultats["journaliere_optimisee"].sum(axis=-1)
+        par_piece = pd.DataFrame({
+            "Pièce": self.noms,
+            "Surface (m²)": self.surfaces,
+            "Consommation normale (kWh)": total_normal,
+            "Consommation optimisée (kWh)": total_optimise,
+            "Économie (kWh)": total_normal - total_optimise,
+            "Économie (DZD)": (total_normal - total_optimise) * tarif,
+            "Pointe de la pièce (kW)": horaire_optimisee.max(axis=(1, 2)),
+            "Part de la pointe du bâtiment (kW)": horaire_optimisee[:, jour_pointe, heure_pointe],
+        })
+        return {
+            "horaire_normale": horaire_normale,
+            "horaire_optimisee": horaire_optimisee,
+            "appel_normal": appel_normal,
+            "appel_optimise": appel_optimise,
+            "pointe_normale": float(appel_normal.max()),
+            "pointe_optimisee": float(appel_optimise[jour_pointe, heure_pointe]),
+            "jour_pointe": int(jour_pointe),
+            "heure_pointe": int(heure_pointe),
+            "par_piece": par_piece,
+        }
+
+
+def courbe_appel(resultats, jours):
+    """Appel de puissance horaire du bâtiment (une ligne par heure) pour le graphique."""
+    index = pd.Index([f"{jour} {h:02d}h" for jour in jours for h in range(resultats["appel_optimise"].shape[1])],
+                     name="Heure")
+    return pd.DataFrame({
+        "Appel normal (kW)": resultats["appel_normal"].ravel(),
+        "Appel optimisé (kW)": resultats["appel_optimise"].ravel(),
+    }, index=index)
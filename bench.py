@@ -0,0 +1,441 @@
+"""Bancs d'essai de performance hors ligne, sur données enregistrées (``donnees/fixtures``).
+
+Chaque banc s'exécute dans son propre processus Python (l'état laissé par
+un banc, mémoire, caches, threads, ne fausse pas le suivant), plusieurs fois
+(``--tours``) en alternance avec les autres bancs : un ralentissement
+passager de la machine ne touche qu'un tour, et le meilleur tour est
+retenu. Il prépare ses données (hors chronométrage), s'échauffe pendant
+``ECHAUFFEMENT_S``, puis mesure une opération répétée, ramasse-miettes
+suspendu comme avec ``timeit`` ; le temps médian, minimal et moyen est écrit
+dans un fichier JSON. Les opérations courtes sont enchaînées (``boucle``)
+pour qu'un échantillon dure au moins une dizaine de millisecondes, bien
+au-delà de la résolution de l'horloge et des interruptions de
+l'ordonnanceur. Avec une référence (``donnees/bench_reference.json``), le
+temps minimal de chaque banc (le moins sensible à la charge de la machine ;
+la médiane avec ``--statistique median_ms``) est comparé à celui de la
+référence et le programme échoue (code 1) si un banc est plus lent que la
+référence au-delà de son seuil.
+
+    python bench.py                          # tous les bancs, comparaison à la référence
+    python bench.py simulation_7j tameteo    # bancs choisis
+    python bench.py --seuil 0.5 --seuil-banc script_froid=1.0
+    python bench.py --tours 3                # moins de tours, exécution plus courte
+    python bench.py --enregistrer-reference  # remplace la référence par cette mesure
+
+Les temps dépendent de la machine : la référence doit être enregistrée sur la
+machine (ou le type de machine d'intégration continue) qui compare.
+"""
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+DOSSIER = os.path.dirname(os.path.abspath(__file__))
+FIXTURES = os.path.join(DOSSIER, "donnees", "fixtures")
+REFERENCE_DEFAUT = os.path.join(DOSSIER, "donnees", "bench_reference.json")
+SORTIE_DEFAUT = os.path.join(DOSSIER, "bench_resultats.json")
+# Ralentissement relatif toléré par rapport à la référence
+SEUIL_DEFAUT = 0.25
+# Durée minimale d'échauffement avant les mesures (s)
+ECHAUFFEMENT_S = 0.5
+# Nombre de processus de mesure par banc, répartis sur toute la durée de l'exécution
+TOURS_DEFAUT = 5
+
+BANCS = {}
+
+
+def banc(nom, repetitions, seuil=SEUIL_DEFAUT, boucle=1):
+    """Enregistre une fonction de préparation qui retourne l'opération (sans argument) à chronométrer.
+
+    Une mesure enchaîne ``boucle`` exécutions (opérations très courtes) ; le
+    temps rapporté est celui d'une exécution.
+    """
+    def enregistrer(preparer):
+        BANCS[nom] = {"preparer": preparer, "repetitions": repetitions, "seuil": seuil, "boucle": boucle,
+                      "description": (preparer.__doc__ or "").strip()}
+        return preparer
+    return enregistrer
+
+
+def fixture(nom, mode="r"):
+    with open(os.path.join(FIXTURES, nom), mode, **({} if "b" in mode else {"encoding": "utf-8"})) as f:
+        return f.read()
+
+
+def parametres_types():
+    return dict(consommation_kw=1.2, est_inverter=True, age=5, frequence_entretien="Annuel",
+                heures_utilisation=8, hauteur=2.5, type_vitrage="Double vitrage", orientation="Sud",
+                presence_appareils="Aucun", nbr_personnes=2, temp_confort=24, isolation="Moyenne")
+
+
+@banc("simulation_7j", repetitions=50, seuil=0.4, boucle=300)
+def _simulation_7j():
+    """Simulation vectorisée de 7 jours (moyennes journalières)."""
+    from simulation import simuler
+    temp = np.array([27.5, 29.0, 31.2, 33.4, 30.1, 28.7, 26.9])
+    humid = np.array([55, 60, 48, 40, 52, 58, 61.0])
+    parametres = parametres_types()
+    return lambda: simuler(temp, humid, **parametres)
+
+
+@banc("incertitude_7j", repetitions=30, seuil=0.4, boucle=2)
+def _incertitude_7j():
+    """Mode incertitude : 2000 tirages de la météo sur 7 jours et quantiles (``incertitude``)."""
+    from incertitude import simuler_incertitude
+    temp = np.array([27.5, 29.0, 31.2, 33.4, 30.1, 28.7, 26.9])
+    humid = np.array([55, 60, 48, 40, 52, 58, 61.0])
+    parametres = parametres_types()
+    return lambda: simuler_incertitude(temp, humid, **parametres)
+
+
+@banc("simulation_annee", repetitions=50, seuil=0.4, boucle=150)
+def _simulation_annee():
+    """Simulation horaire d'une année (366 x 24) sur les normales d'Alger."""
+    from normales import tranche
+    from simulation import simuler_horaire
+    temperature, humidite = (np.asarray(v, dtype=np.float64)
+                             for v in tranche("Alger", datetime.date(2000, 1, 1), 366))
+    parametres = parametres_types()
+    return lambda: simuler_horaire(temperature, humidite, **parametres)
+
+
+@banc("simulation_batiment", repetitions=50, seuil=0.6, boucle=15)
+def _simulation_batiment():
+    """Simulation de 7 jours d'un bâtiment de 500 pièces (``batiment.Batiment``, facteurs déjà préparés)."""
+    import pandas as pd
+    from batiment import Batiment
+    rng = np.random.default_rng(0)
+    n = 500
+    batiment = Batiment(pd.DataFrame({
+        "piece": [f"Pièce {i + 1}" for i in range(n)],
+        "conso": rng.uniform(0.5, 3.0, n).round(2),
+        "inverter": rng.choice(["oui", "non"], n),
+        "heures": rng.integers(1, 24, n),
+        "orientation": rng.choice(["Nord", "Est", "Sud", "Ouest"], n),
+        "confort": rng.integers(20, 27, n),
+    }), communs=parametres_types())
+    temp = np.array([27.5, 29.0, 31.2, 33.4, 30.1, 28.7, 26.9])
+    humid = np.array([55, 60, 48, 40, 52, 58, 61.0])
+    return lambda: batiment.simuler(temp, humid)
+
+
+@banc("cycles_semaine", repetitions=5, seuil=0.6)
+def _cycles_semaine():
+    """Cycles du compresseur à la minute sur 7 jours, 100 scénarios (``cyclage.simuler_cycles``)."""
+    from cyclage import simuler_cycles
+    rng = np.random.default_rng(0)
+    n = 100
+    temp = np.array([27.5, 29.0, 31.2, 33.4, 30.1, 28.7, 26.9])
+    humid = np.array([55, 60, 48, 40, 52, 58, 61.0])
+    parametres = {**parametres_types(), "est_inverter": rng.random(n) < 0.5,
+                  "heures_utilisation": rng.integers(4, 16, n), "temp_confort": rng.integers(21, 27, n)}
+    return lambda: simuler_cycles(temp, humid, profils=False, **parametres)
+
+
+@banc("planning_7j", repetitions=15, seuil=0.4, boucle=2)
+def _planning_7j():
+    """Planning de coût minimal sur 7 jours sous tarif heures creuses / pointe (``planification``)."""
+    from planification import TARIFS_HORAIRES, optimiser_planning
+    temp = np.array([27.5, 29.0, 31.2, 33.4, 30.1, 28.7, 26.9])
+    humid = np.array([55, 60, 48, 40, 52, 58, 61.0])
+    parametres = parametres_types()
+    prix = TARIFS_HORAIRES["Heures creuses / pleines / pointe (exemple)"]
+    return lambda: optimiser_planning(temp, humid, prix=prix, **parametres)
+
+
+@banc("simulation_lot", repetitions=15, seuil=0.4)
+def _simulation_lot():
+    """Simulation d'un bloc de 20 000 configurations (``simulation_lot.simuler_bloc``)."""
+    import pandas as pd
+    from simulation_lot import simuler_bloc
+    rng = np.random.default_rng(0)
+    n = 20000
+    bloc = pd.DataFrame({
+        "id": np.arange(n),
+        "conso": rng.uniform(0.5, 3.0, n).round(2),
+        "inverter": rng.choice(["oui", "non"], n),
+        "age": rng.integers(0, 20, n),
+        "entretien": rng.choice(["Annuel", "Tous les 2 ans", "Plus rare (> 2 ans)"], n),
+        "heures": rng.integers(1, 24, n),
+        "orientation": rng.choice(["Nord", "Est", "Sud", "Ouest"], n),
+        "confort": rng.integers(20, 27, n),
+        **{f"temp_{j + 1}": rng.uniform(20, 42, n).round(1) for j in range(7)},
+    })
+    return lambda: simuler_bloc(bloc)
+
+
+@banc("service_lot", repetitions=20, seuil=0.5)
+def _service_lot():
+    """Validation, simulation regroupée et réponses JSON de 1000 demandes du service HTTP (``service_simulation``)."""
+    from service_simulation import lire_demande, simuler_demandes
+    rng = np.random.default_rng(0)
+    demandes = [{"consommation_kw": round(float(rng.uniform(0.5, 3.0)), 2), "est_inverter": bool(rng.integers(2)),
+                 "heures_utilisation": int(rng.integers(1, 24)), "orientation": str(rng.choice(["Nord", "Sud"])),
+                 "temperatures": rng.uniform(20, 42, 7).round(1).tolist(), "humidites": [55.0] * 7}
+                for _ in range(1000)]
+    return lambda: json.dumps(simuler_demandes([lire_demande(d) for d in demandes]), separators=(",", ":"))
+
+
+@banc("historique_tableau", repetitions=20, seuil=0.4)
+def _historique_tableau():
+    """Synthèse de 2000 exécutions enregistrées (``historique.HistoriqueSimulations.tableau``)."""
+    import tempfile
+    from historique import HistoriqueSimulations
+    from simulation import simuler
+    historique = HistoriqueSimulations(os.path.join(tempfile.mkdtemp(), "historique.sqlite"))
+    temp = np.array([27.5, 29.0, 31.2, 33.4, 30.1, 28.7, 26.9])
+    humid = np.array([55, 60, 48, 40, 52, 58, 61.0])
+    parametres = parametres_types()
+    resultats = simuler(temp, humid, **parametres)
+    for i in range(2000):
+        historique.enregistrer(temp + i * 1e-3, humid, parametres, resultats, ville=("Alger", "Oran")[i % 2])
+    historique.tableau()  # import de pandas hors chronométrage
+    return lambda: historique.tableau()
+
+
+@banc("extraction_deepseek", repetitions=50, seuil=0.4, boucle=400)
+def _extraction_deepseek():
+    """Extraction par expressions régulières des caractéristiques dans des réponses DeepSeek enregistrées."""
+    from ia_deepseek import extraire_caracteristiques
+    textes = json.loads(fixture("deepseek_reponses.json"))["caracteristiques"]
+    return lambda: [extraire_caracteristiques(t) for t in textes]
+
+
+@banc("flux_deepseek", repetitions=50, seuil=0.4, boucle=1000)
+def _flux_deepseek():
+    """Consommation d'un rapport DeepSeek en flux rejoué depuis les morceaux enregistrés."""
+    import openai
+    import ia_deepseek
+    morceaux = json.loads(fixture("deepseek_reponses.json"))["flux_rapport"]
+    evenements = [{"choices": [{"delta": {"content": m}}]} for m in morceaux]
+
+    class Rejeu:
+        @staticmethod
+        def create(**parametres):
+            return iter(evenements)
+
+    def executer():
+        reel, openai.ChatCompletion = openai.ChatCompletion, Rejeu
+        try:
+            return "".join(ia_deepseek.generer_en_flux({}, model="deepseek-chat", messages=[]))
+        finally:
+            openai.ChatCompletion = reel
+    return executer
+
+
+@banc("owm_onecall", repetitions=50, boucle=1000)
+def _owm_onecall():
+    """Lecture des prévisions journalières d'une réponse OneCall enregistrée."""
+    from meteo import previsions_owm
+    donnees = json.loads(fixture("owm_onecall_alger.json"))
+    return lambda: previsions_owm(donnees)
+
+
+@banc("appel_partage", repetitions=50, boucle=2000)
+def _appel_partage():
+    """Surcoût d'un appel sortant non concurrent par ``appels_partages`` (regroupement, concurrence, débit)."""
+    from appels_partages import AppelsPartages
+    appels = AppelsPartages("banc", concurrence_max=4, debit=1e9, rafale=1e9)
+    reponse = {"daily": []}
+    return lambda: appels.appeler("http://api.exemple/onecall", lambda: reponse)
+
+
+@banc("tameteo", repetitions=50, boucle=60)
+def _tameteo():
+    """Analyse en flux (arrêt anticipé) d'une page Tameteo enregistrée."""
+    import tameteo
+    from bench_tameteo import reponse_simulee
+    contenu = fixture("tameteo_alger.html", "rb")
+    return lambda: tameteo.lire(reponse_simulee(contenu))
+
+
+@banc("graphique_quotidien", repetitions=50, seuil=0.4, boucle=2)
+def _graphique_quotidien():
+    """Construction du tableau ``df_chart`` et de la spécification Altair du graphique quotidien."""
+    from graphiques import donnees_quotidiennes, graphique_quotidien
+    jours = [f"{17 + j} Oct" for j in range(7)]
+    normale = [8.0] * 7
+    optimisee = [4.1, 4.6, 5.3, 6.0, 5.0, 4.4, 3.9]
+    return lambda: graphique_quotidien(donnees_quotidiennes(jours, normale, optimisee)).to_dict()
+
+
+@banc("serie_graphique_annee", repetitions=30, seuil=0.6, boucle=15)
+def _serie_graphique_annee():
+    """Réduction d'une année horaire (2 séries) à ``POINTS_MAX`` points au pas horaire (``series_graphiques``)."""
+    import pandas as pd
+    from series_graphiques import serie_graphique
+    rng = np.random.default_rng(0)
+    heures = pd.date_range("2024-01-01", periods=366 * 24, freq="h")
+    horaire = pd.DataFrame({"Consommation normale (kW)": rng.uniform(0, 1.2, len(heures)),
+                            "Consommation optimisée (kW)": rng.uniform(0, 1.2, len(heures))}, index=heures)
+    return lambda: serie_graphique(horaire, "Heure")
+
+
+@banc("calibration_annee", repetitions=10)
+def _calibration_annee():
+    """Lecture par blocs d'une année de relevés horaires (CSV) et calibration du modèle (``calibration``)."""
+    import io
+    import pandas as pd
+    from calibration import calibrer, lire_mesures
+    rng = np.random.default_rng(0)
+    heures = pd.date_range("2024-01-01", periods=366 * 24, freq="h")
+    temperature = 26 + 8 * np.sin(2 * np.pi * (heures.dayofyear - 110) / 366) + rng.normal(0, 2, len(heures))
+    releves = pd.DataFrame({"date_heure": heures, "consommation": rng.uniform(0, 1.2, len(heures)).round(3),
+                            "temperature": temperature.round(1),
+                            "humidite": rng.uniform(30, 80, len(heures)).round()}).to_csv(index=False)
+    parametres = parametres_types()
+    return lambda: calibrer(lire_mesures(io.StringIO(releves)), **parametres)
+
+
+@banc("script_froid", repetitions=5, seuil=0.5)
+def _script_froid():
+    """Exécution complète de ``script3.py`` dans une session neuve (harnais de test Streamlit, hors ligne)."""
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    def executer():
+        st.cache_resource.clear()
+        application = AppTest.from_file(os.path.join(DOSSIER, "script3.py"), default_timeout=120)
+        application.secrets["DEEPSEEK_KEY"] = ""
+        application.run()
+        if application.exception:
+            raise RuntimeError(application.exception[0].message)
+    return executer
+
+
+def mesurer(nom, facteur=1.0):
+    definition = BANCS[nom]
+    operation = definition["preparer"]()
+    # Échauffement (imports, caches de motifs, allocation, fréquence du processeur) : au moins 3 exécutions
+    debut = time.perf_counter()
+    for tour in range(1_000_000):
+        operation()
+        if tour >= 2 and time.perf_counter() - debut >= ECHAUFFEMENT_S:
+            break
+    repetitions = max(1, int(definition["repetitions"] * facteur))
+    boucle = range(definition["boucle"])
+    durees = []
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repetitions):
+            debut = time.perf_counter()
+            for _ in boucle:
+                operation()
+            durees.append((time.perf_counter() - debut) * 1e3 / len(boucle))
+    finally:
+        gc.enable()
+    return {"median_ms": statistics.median(durees), "min_ms": min(durees),
+            "moyenne_ms": statistics.fmean(durees), "repetitions": repetitions}
+
+
+def mesurer_isole(nom, facteur=1.0):
+    """``mesurer`` dans un nouveau processus Python, indépendant des bancs précédents."""
+    commande = [sys.executable, os.path.abspath(__file__), "--mesure-seule", nom, "--facteur", repr(facteur)]
+    execution = subprocess.run(commande, capture_output=True, text=True, cwd=DOSSIER)
+    if execution.returncode != 0:
+        raise RuntimeError(f"Échec du banc {nom} :\n{execution.stderr.strip()}")
+    # Dernière ligne : résultat JSON (les lignes précédentes sont d'éventuels messages des modules mesurés)
+    return json.loads(execution.stdout.strip().splitlines()[-1])
+
+
+def combiner(tours):
+    """Résultat d'un banc mesuré en plusieurs tours : meilleur minimum, médiane et moyenne des tours."""
+    return {"median_ms": statistics.median(t["median_ms"] for t in tours), "min_ms": min(t["min_ms"] for t in tours),
+            "moyenne_ms": statistics.fmean(t["moyenne_ms"] for t in tours),
+            "repetitions": sum(t["repetitions"] for t in tours), "tours": len(tours)}
+
+
+def comparer(resultats, reference, seuils, statistique="min_ms"):
+    """Ajoute à chaque résultat le rapport à la référence ; retourne la liste des bancs en régression."""
+    regressions = []
+    for nom, resultat in resultats.items():
+        precedent = reference.get("resultats", {}).get(nom)
+        if not precedent:
+            continue
+        rapport = resultat[statistique] / precedent[statistique]
+        resultat[f"reference_{statistique}"] = precedent[statistique]
+        resultat["rapport"] = rapport
+        resultat["seuil"] = seuils[nom]
+        resultat["regression"] = rapport > 1 + seuils[nom]
+        if resultat["regression"]:
+            regressions.append(nom)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bancs d'essai de performance hors ligne.")
+    parser.add_argument("bancs", nargs="*", help=f"Bancs à exécuter (défaut : tous) parmi {', '.join(BANCS)}")
+    parser.add_argument("--sortie", default=SORTIE_DEFAUT, help="Fichier JSON des résultats")
+    parser.add_argument("--reference", default=REFERENCE_DEFAUT, help="Fichier JSON de référence")
+    parser.add_argument("--seuil", type=float, default=None,
+                        help=f"Ralentissement relatif toléré pour tous les bancs (défaut : {SEUIL_DEFAUT} ou seuil du banc)")
+    parser.add_argument("--seuil-banc", action="append", default=[], metavar="NOM=SEUIL",
+                        help="Seuil propre à un banc (option répétable)")
+    parser.add_argument("--statistique", choices=["min_ms", "median_ms"], default="min_ms",
+                        help="Temps comparé à la référence (défaut : min_ms)")
+    parser.add_argument("--facteur", type=float, default=1.0, help="Multiplie le nombre de répétitions")
+    parser.add_argument("--tours", type=int, default=TOURS_DEFAUT,
+                        help=f"Processus de mesure par banc, en alternance (défaut : {TOURS_DEFAUT})")
+    parser.add_argument("--enregistrer-reference", action="store_true",
+                        help="Écrit les résultats comme nouvelle référence au lieu de comparer")
+    # Usage interne : mesure d'un seul banc dans ce processus, résultat JSON sur la sortie standard
+    parser.add_argument("--mesure-seule", metavar="NOM", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.mesure_seule:
+        print(json.dumps(mesurer(args.mesure_seule, args.facteur)))
+        return 0
+
+    noms = args.bancs or list(BANCS)
+    inconnus = [n for n in noms if n not in BANCS]
+    if inconnus:
+        parser.error(f"bancs inconnus : {', '.join(inconnus)}")
+    seuils = {nom: args.seuil if args.seuil is not None else BANCS[nom]["seuil"] for nom in noms}
+    for option in args.seuil_banc:
+        nom, _, valeur = option.partition("=")
+        seuils[nom] = float(valeur)
+
+    tours = {nom: [] for nom in noms}
+    for _ in range(max(1, args.tours)):
+        for nom in noms:
+            tours[nom].append(mesurer_isole(nom, args.facteur))
+    resultats = {}
+    for nom in noms:
+        resultats[nom] = combiner(tours[nom])
+        print(f"{nom:<22} médiane {resultats[nom]['median_ms']:10.3f} ms   min {resultats[nom]['min_ms']:10.3f} ms",
+              flush=True)
+
+    regressions = []
+    if not args.enregistrer_reference and os.path.exists(args.reference):
+        with open(args.reference, encoding="utf-8") as f:
+            regressions = comparer(resultats, json.load(f), seuils, args.statistique)
+        for nom, resultat in resultats.items():
+            if "rapport" in resultat:
+                etat = "RÉGRESSION" if resultat["regression"] else "ok"
+                print(f"{nom:<22} x{resultat['rapport']:.2f} par rapport à la référence (seuil +{resultat['seuil']:.0%}) {etat}")
+
+    document = {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "processeurs": os.cpu_count(),
+        "resultats": resultats,
+        "regressions": regressions,
+    }
+    chemin = args.reference if args.enregistrer_reference else args.sortie
+    with open(chemin, "w", encoding="utf-8") as f:
+        json.dump(document, f, ensure_ascii=False, indent=2)
+    print(f"Résultats écrits dans {chemin}.")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
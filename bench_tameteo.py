@@ -0,0 +1,102 @@
+"""Banc d'essai de l'analyse Tameteo sur une page enregistrée (``donnees/fixtures/tameteo_alger.html``).
+
+Compare l'ancienne analyse (page entière décodée, ``splitlines`` et neuf
+``startswith`` par ligne) à la lecture en flux avec arrêt anticipé, sans
+réseau : la réponse HTTP est simulée à partir des octets du fichier.
+
+    python bench_tameteo.py [--repetitions 200]
+"""
+import argparse
+import io
+import os
+import time
+
+import requests
+
+import tameteo
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "donnees", "fixtures", "tameteo_alger.html")
+DEBUTS_JOURS = ("* Aujourd'", "* Demain", "* Lundi", "* Mardi", "* Mercredi", "* Jeudi",
+                "* Vendredi", "* Samedi", "* Dimanche")
+
+
+def analyse_ligne_a_ligne(html):
+    """Ancienne analyse : toutes les lignes de la page, puis découpage manuel des mots."""
+    days_data = []
+    for line in html.splitlines():
+        segment = line.strip().replace("´", "'")
+        if segment.startswith(DEBUTS_JOURS):
+            days_data.append(segment)
+        if len(days_data) >= tameteo.JOURS:
+            break
+    previsions = []
+    for entry in days_data[:tameteo.JOURS]:
+        parts = entry.split()
+        temps = [p for p in parts if "°" in p and "/" in p]
+        max_temp = min_temp = None
+        if temps:
+            try:
+                max_temp = float(temps[0].replace("°", "").replace(",", "."))
+            except ValueError:
+                max_temp = None
+        jour_str = " ".join(parts[1:4]) if parts[0] == "*" else " ".join(parts[0:3])
+        previsions.append((jour_str, max_temp, min_temp))
+    return previsions
+
+
+class FluxCompte(io.BytesIO):
+    """Corps de réponse simulé qui compte les octets effectivement lus."""
+
+    lus = 0
+
+    def read(self, n=-1):
+        morceau = super().read(n)
+        self.lus += len(morceau)
+        return morceau
+
+
+def reponse_simulee(contenu):
+    reponse = requests.Response()
+    reponse.status_code = 200
+    reponse.raw = FluxCompte(contenu)
+    return reponse
+
+
+def chronometrer(fonction, repetitions):
+    debut = time.perf_counter()
+    for _ in range(repetitions):
+        resultat = fonction()
+    return (time.perf_counter() - debut) / repetitions, resultat
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Banc d'essai de l'analyse des prévisions Tameteo.")
+    parser.add_argument("--repetitions", type=int, default=200)
+    args = parser.parse_args(argv)
+    with open(FIXTURE, "rb") as f:
+        contenu = f.read()
+
+    # Ancien chemin : page entière téléchargée et décodée avant l'analyse
+    ancien, _ = chronometrer(lambda: analyse_ligne_a_ligne(contenu.decode("utf-8")), args.repetitions)
+    reponses = []
+
+    def en_flux():
+        reponses.append(reponse_simulee(contenu))
+        return tameteo.lire(reponses[-1])
+
+    nouveau, previsions = chronometrer(en_flux, args.repetitions)
+    cache = tameteo.CachePrevisions()
+    cache.obtenir("Alger", lambda: previsions)
+    memorise, _ = chronometrer(lambda: cache.obtenir("Alger", en_flux), args.repetitions)
+
+    print(f"Page enregistrée : {len(contenu) / 1024:.0f} Kio, {len(previsions)} jours trouvés")
+    print(f"Analyse ligne à ligne (page entière) : {ancien * 1e3:8.3f} ms")
+    print(f"Analyse en flux (arrêt anticipé)     : {nouveau * 1e3:8.3f} ms  "
+          f"({ancien / nouveau:.1f}x, {reponses[0].raw.lus / 1024:.0f} Kio lus)")
+    print(f"Analyse mémorisée (ville, date)      : {memorise * 1e6:8.3f} µs")
+    for jour in previsions:
+        print(f"  {jour['date']:<24} max {jour['max']:>5} min {jour['min']:>5}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Cache persistant des données météo, partagé entre sessions et processus (SQLite).
+
+Les entrées sont indexées par (fournisseur, latitude, longitude, date de
+prévision) et ont une durée de vie (TTL) configurable. Le nombre d'entrées est
+borné : les plus anciennes sont évincées. Quand le fournisseur en amont est
+indisponible, une entrée périmée est servie plutôt que rien. Les compteurs de
+succès/échecs sont stockés dans la même base pour être lisibles par tous les
+processus.
+
+Configuration par variables d'environnement :
+
+- ``CACHE_METEO_CHEMIN`` : fichier SQLite (défaut : répertoire temporaire) ;
+- ``CACHE_METEO_TTL`` : durée de vie d'une entrée en secondes (défaut : 3 h) ;
+- ``CACHE_METEO_MAX_ENTREES`` : nombre maximal d'entrées (défaut : 1000).
+"""
+import contextlib
+import datetime
+import json
+import os
+import sqlite3
+import tempfile
+import time
+
+import traces
+
+CHEMIN_DEFAUT = os.path.join(tempfile.gettempdir(), "climatiseur_meteo.sqlite")
+TTL_DEFAUT = 3 * 3600
+MAX_ENTREES_DEFAUT = 1000
+# Au-delà de cet âge, une entrée périmée n'est même plus servie en secours
+AGE_MAX_SECOURS = 7 * 24 * 3600
+
+COMPTEURS = ("succes", "echecs", "perimes_servis", "erreurs_amont", "evictions")
+
+
+class CacheMeteo:
+    """Cache clé/valeur JSON à durée de vie limitée, stocké dans une base SQLite."""
+
+    def __init__(self, chemin=None, ttl=None, max_entrees=None):
+        self.chemin = chemin or os.environ.get("CACHE_METEO_CHEMIN", CHEMIN_DEFAUT)
+        self.ttl = float(ttl if ttl is not None else os.environ.get("CACHE_METEO_TTL", TTL_DEFAUT))
+        self.max_entrees = int(max_entrees if max_entrees is not None
+                               else os.environ.get("CACHE_METEO_MAX_ENTREES", MAX_ENTREES_DEFAUT))
+        with self._connexion() as cnx:
+            cnx.execute("PRAGMA journal_mode=WAL")
+            cnx.execute(
+                "CREATE TABLE IF NOT EXISTS meteo ("
+                " fournisseur TEXT, lat REAL, lon REAL, date_prevision TEXT,"
+                " valeur TEXT, cree_le REAL,"
+                " PRIMARY KEY (fournisseur, lat, lon, date_prevision))")
+            cnx.execute("CREATE INDEX IF NOT EXISTS meteo_cree_le ON meteo (cree_le)")
+            cnx.execute("CREATE TABLE IF NOT EXISTS compteurs (nom TEXT PRIMARY KEY, valeur INTEGER)")
+            cnx.executemany("INSERT OR IGNORE INTO compteurs VALUES (?, 0)", [(c,) for c in COMPTEURS])
+
+    @contextlib.contextmanager
+    def _connexion(self):
+        # Une connexion par opération : sûr entre threads (sessions Streamlit) et processus
+        cnx = sqlite3.connect(self.chemin, timeout=10)
+        try:
+            with cnx:
+                yield cnx
+        finally:
+            cnx.close()
+
+    @staticmethod
+    def cle(fournisseur, lat, lon, date_prevision=None):
+        """Clé normalisée ; la date de prévision par défaut est celle du jour."""
+        date_prevision = date_prevision or datetime.date.today()
+        return (fournisseur, round(float(lat), 3), round(float(lon), 3), str(date_prevision))
+
+    def _incrementer(self, cnx, nom, n=1):
+        cnx.execute("UPDATE compteurs SET valeur = valeur + ? WHERE nom = ?", (n, nom))
+
+    def lire(self, cle):
+        """Retourne ``(valeur, age_en_secondes)`` ou ``(None, None)`` si la clé est absente."""
+        with self._connexion() as cnx:
+            ligne = cnx.execute(
+                "SELECT valeur, cree_le FROM meteo"
+                " WHERE fournisseur = ? AND lat = ? AND lon = ? AND date_prevision = ?", cle).fetchone()
+        if ligne is None:
+            return None, None
+        return json.loads(ligne[0]), time.time() - ligne[1]
+
+    def ecrire(self, cle, valeur):
+        with self._connexion() as cnx:
+            cnx.execute("INSERT OR REPLACE INTO meteo VALUES (?, ?, ?, ?, ?, ?)",
+                        (*cle, json.dumps(valeur), time.time()))
+            # Éviction : entrées trop vieilles, puis les plus anciennes au-delà de la taille maximale
+            n = cnx.execute("DELETE FROM meteo WHERE cree_le < ?", (time.time() - AGE_MAX_SECOURS,)).rowcount
+            n += cnx.execute(
+                "DELETE FROM meteo WHERE rowid IN (SELECT rowid FROM meteo ORDER BY cree_le DESC"
+                " LIMIT -1 OFFSET ?)", (self.max_entrees,)).rowcount
+            if n:
+                self._incrementer(cnx, "evictions", n)
+
+    def obtenir(self, cle, charger, ttl=None):
+        """Valeur en cache si elle est fraîche, sinon ``charger()`` (mise en cache si non vide).
+
+        ``ttl`` remplace ponctuellement la durée de vie configurée (ex. météo actuelle).
+
+        Si ``charger`` échoue (exception ou résultat vide), l'entrée périmée est
+        servie si elle existe ; sinon l'exception est propagée (ou ``None`` retourné).
+        """
+        with traces.span("cache_meteo", fournisseur=str(cle[0]) if cle else "") as s:
+            valeur, age = self.lire(cle)
+            if valeur is not None and age <= (self.ttl if ttl is None else ttl):
+                s["cache"] = "succes"
+                with self._connexion() as cnx:
+                    self._incrementer(cnx, "succes")
+                return valeur
+            s["cache"] = "echec"
+            with self._connexion() as cnx:
+                self._incrementer(cnx, "echecs")
+            try:
+                nouvelle = charger()
+            except Exception:
+                nouvelle = None
+                if valeur is None:
+                    with self._connexion() as cnx:
+                        self._incrementer(cnx, "erreurs_amont")
+                    raise
+            if nouvelle:
+                self.ecrire(cle, nouvelle)
+                return nouvelle
+            with self._connexion() as cnx:
+                self._incrementer(cnx, "erreurs_amont")
+                if valeur is not None:
+                    s["cache"] = "perime"
+                    self._incrementer(cnx, "perimes_servis")
+            return valeur
+
+    def statistiques(self):
+        """Compteurs cumulés et nombre d'entrées, sous forme de dictionnaire."""
+        with self._connexion() as cnx:
+            stats = dict(cnx.execute("SELECT nom, valeur FROM compteurs").fetchall())
+            stats["entrees"] = cnx.execute("SELECT COUNT(*) FROM meteo").fetchone()[0]
+        return stats
+
+    def exposition_prometheus(self):
+        """Compteurs au format texte Prometheus (pour un collecteur de métriques)."""
+        lignes = []
+        for nom, valeur in self.statistiques().items():
+            type_metrique = "gauge" if nom == "entrees" else "counter"
+            lignes.append(f"# TYPE cache_meteo_{nom} {type_metrique}")
+            lignes.append(f"cache_meteo_{nom} {valeur}")
+        return "\n".join(lignes) + "\n"
@@ -0,0 +1,85 @@
+"""Cache des rapports générés par l'IA DeepSeek.
+
+Un rapport est indexé par l'empreinte (SHA-256) du prompt et des paramètres de
+génération : une simulation inchangée retrouve son rapport sans nouvel appel
+facturé. Deux niveaux : un LRU en mémoire partagé par le processus et, si
+``CACHE_RAPPORTS_DOSSIER`` est défini (ou ``dossier`` passé), un fichier JSON
+par rapport sur disque, qui survit aux redémarrages. Un dossier inaccessible
+ne fait que désactiver (ou manquer) l'écriture sur disque : le rapport reste
+dans le niveau mémoire.
+"""
+import collections
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+TAILLE_MAX_DEFAUT = 256
+
+
+class CacheRapports:
+    """LRU de textes thread-safe, avec niveau disque optionnel."""
+
+    def __init__(self, taille_max=TAILLE_MAX_DEFAUT, dossier=None):
+        self.taille_max = taille_max
+        self.dossier = dossier or os.environ.get("CACHE_RAPPORTS_DOSSIER")
+        if self.dossier:
+            try:
+                os.makedirs(self.dossier, exist_ok=True)
+            except OSError:
+                self.dossier = None
+        self._entrees = collections.OrderedDict()
+        self._verrou = threading.Lock()
+
+    @staticmethod
+    def cle(prompt, **parametres):
+        """Empreinte du prompt et des paramètres de génération (modèle, température...)."""
+        contenu = json.dumps({"prompt": prompt, **parametres}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(contenu.encode("utf-8")).hexdigest()
+
+    def _chemin(self, cle):
+        return os.path.join(self.dossier, f"{cle}.json")
+
+    def lire(self, cle):
+        """Texte du rapport, ou ``None`` s'il n'est dans aucun niveau du cache."""
+        with self._verrou:
+            if cle in self._entrees:
+                self._entrees.move_to_end(cle)
+                return self._entrees[cle]
+        if not self.dossier:
+            return None
+        try:
+            with open(self._chemin(cle), encoding="utf-8") as f:
+                texte = json.load(f)["texte"]
+        except (OSError, ValueError, KeyError):
+            return None
+        self._memoriser(cle, texte)
+        return texte
+
+    def ecrire(self, cle, texte):
+        self._memoriser(cle, texte)
+        if not self.dossier:
+            return
+        temporaire = None
+        try:
+            # Fichier temporaire propre à chaque écrivain (sessions, processus), dans le même dossier
+            with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=self.dossier, prefix=f"{cle}.",
+                                             suffix=".tmp", delete=False) as f:
+                temporaire = f.name
+                json.dump({"texte": texte}, f, ensure_ascii=False)
+            # Remplacement atomique : un lecteur concurrent ne voit jamais un fichier partiel
+            os.replace(temporaire, self._chemin(cle))
+        except OSError:
+            # Dossier inaccessible ou disque plein : le rapport reste dans le niveau mémoire
+            if temporaire:
+                with contextlib.suppress(OSError):
+                    os.remove(temporaire)
+
+    def _memoriser(self, cle, texte):
+        with self._verrou:
+            self._entrees[cle] = texte
+            self._entrees.move_to_end(cle)
+            while len(self._entrees) > self.taille_max:
+                self._entrees.popitem(last=False)
@@ -0,0 +1,257 @@
+"""Import de relevés horaires mesurés et calibration du modèle de consommation sur ces relevés.
+
+Les relevés d'un client (consommation horaire du compteur, température
+extérieure, éventuellement humidité et température intérieure) couvrent
+souvent des mois. Le fichier (CSV ou classeur Excel) est lu en flux, par
+blocs de lignes : ``pd.read_csv`` par morceaux, ou lignes de la première
+feuille en lecture seule avec openpyxl. Seules les colonnes utiles sont
+gardées, en tableaux ``float64`` compacts, et les relevés plus fins que
+l'heure (ex. 15 min) sont regroupés par heure.
+
+La calibration ajuste par moindres carrés trois coefficients du modèle de
+``simulation.py`` aux consommations mesurées :
+
+- ``ecart_pleine_charge`` : écart de température (°C) qui demande la pleine puissance ;
+- ``coefficient_humidite`` : surcharge par point d'humidité au-delà de 50% ;
+- ``facteur_appareil`` : facteur de technologie, d'âge et d'entretien du climatiseur.
+
+L'âge et l'entretien d'un même climatiseur ne sont pas séparables sur ses
+seules mesures : ils sont ajustés ensemble dans ``facteur_appareil``, dont on
+déduit le coefficient d'âge à entretien inchangé. De même, sans heure à
+pleine charge, seul le rapport ``facteur_appareil / ecart_pleine_charge``
+est déterminé. Une grille grossière de candidats est évaluée d'un bloc
+(tableaux ``(candidats, heures)``), puis le meilleur est affiné par
+Levenberg-Marquardt (jacobien par différences finies, évalué dans le même
+calcul vectorisé).
+"""
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from simulation import COEFFICIENT_HUMIDITE, ECART_PLEINE_CHARGE, HEURES, HUMIDITE_DEFAUT, SEUIL_HUMIDITE, preparer
+
+# Lignes du fichier lues par bloc
+LIGNES_PAR_BLOC = 50_000
+COEFFICIENTS = ("ecart_pleine_charge", "coefficient_humidite", "facteur_appareil")
+LIBELLES = {
+    "ecart_pleine_charge": "Écart de pleine charge (°C)",
+    "coefficient_humidite": "Surcharge par point d'humidité",
+    "facteur_appareil": "Facteur appareil (technologie, âge, entretien)",
+}
+# Bornes de chaque coefficient (mêmes indices que COEFFICIENTS) et candidats de la grille grossière
+BORNES = np.array([(2.0, 30.0), (0.0, 0.02), (0.3, 2.0)])
+POINTS_GRILLE = (16, 9, 16)
+# Nombre d'éléments (candidats x heures) évalués par bloc lors de la recherche sur grille
+ELEMENTS_PAR_BLOC = 4_000_000
+ITERATIONS_MAX = 50
+# Rappel vers les coefficients actuels (fraction de la somme des carrés mesurés par étendue de borne au carré) :
+# négligeable devant l'erreur d'ajustement, il départage les coefficients que les mesures ne déterminent pas
+RAPPEL = 1e-4
+
+
+def _blocs_classeur(source, taille_bloc):
+    # Première feuille lue ligne à ligne : en lecture seule, le classeur n'est jamais chargé en entier
+    import openpyxl
+
+    classeur = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    try:
+        lignes = classeur.worksheets[0].iter_rows(values_only=True)
+        entete = [str(nom).strip() if nom is not None else f"colonne_{i}" for i, nom in enumerate(next(lignes, ()))]
+        n = len(entete)
+        while True:
+            bloc = [tuple(ligne[:n]) + (None,) * (n - len(ligne)) for ligne in itertools.islice(lignes, taille_bloc)]
+            if not bloc:
+                break
+            yield pd.DataFrame.from_records(bloc, columns=entete)
+    finally:
+        classeur.close()
+
+
+def blocs_tableau(source, taille_bloc=LIGNES_PAR_BLOC):
+    """Itère sur les lignes d'un fichier CSV ou Excel (.xlsx) par DataFrames d'au plus ``taille_bloc`` lignes."""
+    nom = getattr(source, "name", source)
+    if isinstance(nom, str) and nom.lower().endswith((".xlsx", ".xlsm")):
+        yield from _blocs_classeur(source, taille_bloc)
+    else:
+        with pd.read_csv(source, chunksize=taille_bloc) as lecteur:
+            yield from lecteur
+
+
+def lire_mesures(source, taille_bloc=LIGNES_PAR_BLOC, colonne_date="date_heure", colonne_consommation="consommation",
+                 colonne_temperature="temperature", colonne_humidite="humidite",
+                 colonne_interieure="temperature_interieure"):
+    """Relevés horaires d'un fichier CSV ou Excel, lus par blocs de ``taille_bloc`` lignes.
+
+    Retourne un dictionnaire de tableaux ``(heures,)`` triés : « heure »
+    (``datetime64[h]``), « consommation » (kWh), « temperature », « humidite »
+    (``HUMIDITE_DEFAUT`` si absente) et « temperature_interieure » (NaN si
+    absente). Les relevés d'une même heure sont regroupés (consommations
+    sommées, températures et humidité moyennées) ; les lignes sans date,
+    consommation ou température extérieure sont ignorées.
+    """
+    morceaux = []
+    for bloc in blocs_tableau(source, taille_bloc):
+        for colonne in (colonne_date, colonne_consommation, colonne_temperature):
+            if colonne not in bloc:
+                raise ValueError(f"Colonne « {colonne} » absente du fichier de relevés.")
+
+        def numerique(colonne):
+            if colonne not in bloc:
+                return np.full(len(bloc), np.nan)
+            return pd.to_numeric(bloc[colonne], errors="coerce").to_numpy(dtype=np.float64)
+
+        heure = pd.to_datetime(bloc[colonne_date], errors="coerce").to_numpy().astype("datetime64[h]")
+        valeurs = np.stack([numerique(colonne_consommation), numerique(colonne_temperature),
+                            numerique(colonne_humidite), numerique(colonne_interieure)])
+        valides = ~np.isnat(heure) & ~np.isnan(valeurs[:2]).any(axis=0)
+        morceaux.append((heure[valides], valeurs[:, valides]))
+    if not morceaux or not sum(len(heure) for heure, _ in morceaux):
+        raise ValueError("Aucun relevé exploitable (date, consommation et température) dans le fichier.")
+
+    heures, indices = np.unique(np.concatenate([heure for heure, _ in morceaux]), return_inverse=True)
+    consommation, temperature, humidite, interieure = np.concatenate([v for _, v in morceaux], axis=1)
+
+    def moyenne(valeurs, defaut):
+        # Moyenne par heure des valeurs renseignées, ``defaut`` pour une heure sans valeur
+        valides = ~np.isnan(valeurs)
+        total = np.bincount(indices, np.where(valides, valeurs, 0.0), len(heures))
+        nombre = np.bincount(indices, valides, len(heures))
+        return np.divide(total, nombre, out=np.full(len(heures), defaut), where=nombre > 0)
+
+    return {
+        "heure": heures,
+        "consommation": np.bincount(indices, consommation, len(heures)),
+        "temperature": moyenne(temperature, np.nan),
+        "humidite": moyenne(humidite, HUMIDITE_DEFAUT),
+        "temperature_interieure": moyenne(interieure, np.nan),
+    }
+
+
+def _consommation(coefficients, ecart, exces_humidite, puissance):
+    """Consommations horaires (kWh) ``(candidats, heures)`` pour des coefficients ``(candidats, 3)``.
+
+    Même calcul que ``simulation.simuler_prepare`` sur les heures d'utilisation,
+    ``ecart`` étant l'écart au confort déjà multiplié par le facteur de charge.
+    """
+    pleine_charge, humidite, appareil = (coefficients[:, i, None] for i in range(3))
+    consommation = exces_humidite * humidite
+    consommation += 1.0
+    consommation *= ecart
+    consommation /= pleine_charge
+    np.minimum(consommation, 1.0, out=consommation)
+    consommation *= appareil
+    np.minimum(consommation, 1.0, out=consommation)
+    consommation *= puissance
+    return consommation
+
+
+def _erreurs(coefficients, ecart, exces_humidite, puissance, mesure, a_priori, poids):
+    # Somme des carrés des écarts (et rappel vers ``a_priori``) pour chaque candidat, par blocs de taille bornée
+    erreurs = ((coefficients - a_priori) ** 2 * poids).sum(axis=1)
+    taille = max(1, ELEMENTS_PAR_BLOC // max(1, len(mesure)))
+    for debut in range(0, len(coefficients), taille):
+        residus = _consommation(coefficients[debut:debut + taille], ecart, exces_humidite, puissance)
+        residus -= mesure
+        erreurs[debut:debut + taille] += np.einsum("ij,ij->i", residus, residus)
+    return erreurs
+
+
+def _affiner(depart, ecart, exces_humidite, puissance, mesure, a_priori, poids):
+    """Levenberg-Marquardt borné depuis ``depart`` ; jacobien par différences finies."""
+    coefficients = depart.copy()
+    pas_derivee = 1e-4 * (BORNES[:, 1] - BORNES[:, 0])
+    variables = (ecart, exces_humidite, puissance, mesure, a_priori, poids)
+    erreur = _erreurs(coefficients[None], *variables)[0]
+    amortissement = 1e-3
+    for _ in range(ITERATIONS_MAX):
+        # Point courant et trois points décalés évalués d'un bloc
+        evaluations = _consommation(np.vstack([coefficients, coefficients + np.diag(pas_derivee)]),
+                                    ecart, exces_humidite, puissance)
+        residus = evaluations[0] - mesure
+        jacobien = (evaluations[1:] - evaluations[0]) / pas_derivee[:, None]
+        normale = jacobien @ jacobien.T + np.diag(poids)
+        gradient = jacobien @ residus + poids * (coefficients - a_priori)
+        diagonale = np.diag(np.maximum(np.diag(normale), 1e-12))
+        while amortissement < 1e10:
+            pas = np.linalg.lstsq(normale + amortissement * diagonale, -gradient, rcond=None)[0]
+            essai = np.clip(coefficients + pas, BORNES[:, 0], BORNES[:, 1])
+            erreur_essai = _erreurs(essai[None], *variables)[0]
+            if erreur_essai < erreur:
+                amortissement = max(amortissement / 10, 1e-9)
+                break
+            amortissement *= 10
+        else:
+            break  # aucun pas n'améliore l'ajustement
+        gain = erreur - erreur_essai
+        coefficients, erreur = essai, erreur_essai
+        if gain <= 1e-10 * max(erreur, 1e-12):
+            break
+    return coefficients
+
+
+def indicateurs(prevue, mesuree):
+    """Erreur horaire d'un modèle : RMSE et biais (kWh), R², écart relatif sur le total (%)."""
+    erreur = prevue - mesuree
+    dispersion = np.sum((mesuree - mesuree.mean()) ** 2)
+    total = mesuree.sum()
+    return {
+        "rmse_kwh": float(np.sqrt(np.mean(erreur ** 2))),
+        "biais_kwh": float(erreur.mean()),
+        "r2": float(1 - np.sum(erreur ** 2) / dispersion) if dispersion > 0 else np.nan,
+        "ecart_total_pourcent": float(100 * erreur.sum() / total) if total > 0 else np.nan,
+    }
+
+
+def calibrer(mesures, **parametres):
+    """Coefficients du modèle ajustés aux consommations horaires ``mesures`` (cf. ``lire_mesures``).
+
+    ``parametres`` sont les paramètres scalaires de ``simulation.simuler_horaire``
+    du climatiseur et de la pièce mesurés. La température intérieure mesurée,
+    si elle est renseignée, remplace la température de confort. Retourne un
+    dictionnaire : « coefficients » calibrés et « defaut » (ceux du modèle),
+    indicateurs d'erreur horaire « erreur_defaut » et « erreur_calibree »,
+    « coefficient_age » déduit (``None`` pour un climatiseur neuf), « heures »
+    mesurées et « comparaison » (DataFrame horaire mesure / modèles, en kW).
+    """
+    facteurs = preparer(**parametres)
+    heure = mesures["heure"]
+    heure_du_jour = (heure - heure.astype("datetime64[D]")).astype(np.int64)
+    interieure = mesures["temperature_interieure"]
+    confort = np.where(np.isnan(interieure), float(facteurs["confort"].ravel()[0]), interieure)
+    ecart = np.maximum(mesures["temperature"] - confort, 0.0) * facteurs["charge"].reshape(HEURES)[heure_du_jour]
+    exces_humidite = np.maximum(mesures["humidite"] - SEUIL_HUMIDITE, 0.0)
+    puissance = float(facteurs["puissance"].ravel()[0])
+    mesure = mesures["consommation"]
+    # Hors utilisation ou sans écart au confort, le modèle prévoit 0 quels que soient les coefficients
+    actives = facteurs["masque"].reshape(HEURES)[heure_du_jour] & (ecart > 0)
+    defaut = np.array([ECART_PLEINE_CHARGE, COEFFICIENT_HUMIDITE, float(facteurs["appareil"].ravel()[0])])
+    poids = RAPPEL * np.sum(mesure ** 2) / (BORNES[:, 1] - BORNES[:, 0]) ** 2
+    variables = (ecart[actives], exces_humidite[actives], puissance, mesure[actives], defaut, poids)
+    axes = (np.geomspace(*BORNES[0], POINTS_GRILLE[0]), np.linspace(*BORNES[1], POINTS_GRILLE[1]),
+            np.linspace(*BORNES[2], POINTS_GRILLE[2]))
+    grille = np.vstack([defaut, np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1).reshape(-1, 3)])
+    coefficients = _affiner(grille[np.argmin(_erreurs(grille, *variables))], *variables)
+
+    def prevoir(valeurs):
+        prevue = np.zeros(len(mesure))
+        prevue[actives] = _consommation(valeurs[None], *variables[:3])[0]
+        return prevue
+
+    prevue_defaut, prevue_calibree = prevoir(defaut), prevoir(coefficients)
+    # facteur_appareil = technologie x entretien x (1 + coefficient x âge plafonné à 20 ans)
+    age = min(float(parametres.get("age", 5)), 20)
+    base = float(preparer(**{**parametres, "age": 0})["appareil"].ravel()[0])
+    return {
+        "coefficients": dict(zip(COEFFICIENTS, coefficients.tolist())),
+        "defaut": dict(zip(COEFFICIENTS, defaut.tolist())),
+        "coefficient_age": float((coefficients[2] / base - 1) / age) if age > 0 else None,
+        "erreur_defaut": indicateurs(prevue_defaut, mesure),
+        "erreur_calibree": indicateurs(prevue_calibree, mesure),
+        "heures": len(mesure),
+        "comparaison": pd.DataFrame({
+            "Consommation mesurée (kW)": mesure,
+            "Modèle actuel (kW)": prevue_defaut,
+            "Modèle calibré (kW)": prevue_calibree,
+        }, index=pd.DatetimeIndex(heure, name="Heure")),
+    }
@@ -0,0 +1,180 @@
+"""Catalogue local des caractéristiques techniques de climatiseurs.
+
+Le catalogue (SQLite) est alimenté par les recherches DeepSeek réussies et peut
+être importé depuis un CSV (colonnes ``modele``, ``consommation_kw``,
+``puissance_frigorifique_kw``, ``inverter``). Les références sont normalisées
+(majuscules, sans accents ni ponctuation) et indexées en mémoire :
+
+- correspondance exacte par dictionnaire ;
+- correspondance approchée par trigrammes (index inversé, comptage vectorisé
+  avec NumPy) puis vérification par distance d'édition. Une correspondance
+  approchée exige les mêmes nombres que la requête, car ils codent en général
+  la puissance du modèle.
+
+Import en ligne de commande ::
+
+    python catalogue_climatiseurs.py importer modeles.csv
+"""
+import argparse
+import array
+import csv
+import difflib
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+
+import numpy as np
+
+CHEMIN_DEFAUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalogue_climatiseurs.sqlite")
+# Similarité minimale (0-1) pour accepter une correspondance approchée
+SEUIL_SIMILARITE = 0.85
+# Nombre de candidats (par trigrammes communs) vérifiés par distance d'édition
+NB_CANDIDATS = 20
+# Bornes de validation (identiques aux champs de saisie de la section 1)
+BORNES_CONSOMMATION = (0.1, 10.0)
+BORNES_FROID = (0.1, 20.0)
+
+
+def normaliser(reference):
+    """Référence normalisée : majuscules sans accents, lettres et chiffres uniquement."""
+    texte = unicodedata.normalize("NFKD", reference or "").encode("ascii", "ignore").decode()
+    return re.sub(r"[^A-Z0-9]", "", texte.upper())
+
+
+def trigrammes(cle):
+    cle = f"^{cle}$"
+    return {cle[i:i + 3] for i in range(len(cle) - 2)}
+
+
+def fiche_valide(consommation_kw, puissance_frigo_kw, inverter):
+    """Vrai si les caractéristiques sont complètes et plausibles."""
+    return (consommation_kw is not None and puissance_frigo_kw is not None and inverter is not None
+            and BORNES_CONSOMMATION[0] <= consommation_kw <= BORNES_CONSOMMATION[1]
+            and BORNES_FROID[0] <= puissance_frigo_kw <= BORNES_FROID[1])
+
+
+class CatalogueClimatiseurs:
+    """Catalogue persistant avec index exact et approché en mémoire."""
+
+    def __init__(self, chemin=None):
+        self.chemin = chemin or os.environ.get("CATALOGUE_CLIMATISEURS_CHEMIN", CHEMIN_DEFAUT)
+        self._verrou = threading.Lock()
+        self._cles = []        # identifiant interne -> clé normalisée
+        self._fiches = {}      # clé normalisée -> fiche
+        self._index = {}       # trigramme -> identifiants (array d'entiers)
+        with sqlite3.connect(self.chemin) as cnx:
+            cnx.execute(
+                "CREATE TABLE IF NOT EXISTS modeles ("
+                " cle TEXT PRIMARY KEY, modele TEXT, consommation_kw REAL,"
+                " puissance_frigorifique_kw REAL, inverter INTEGER, source TEXT)")
+            lignes = cnx.execute("SELECT modele, consommation_kw, puissance_frigorifique_kw, inverter, source"
+                                 " FROM modeles").fetchall()
+        for modele, conso, froid, inverter, source in lignes:
+            self._indexer(modele, conso, froid, bool(inverter), source)
+
+    def __len__(self):
+        return len(self._fiches)
+
+    def _indexer(self, modele, consommation_kw, puissance_frigo_kw, inverter, source):
+        cle = normaliser(modele)
+        if not cle:
+            return None
+        fiche = {"modele": modele, "consommation_kw": consommation_kw,
+                 "puissance_frigorifique_kw": puissance_frigo_kw, "inverter": inverter, "source": source}
+        if cle not in self._fiches:
+            identifiant = len(self._cles)
+            self._cles.append(cle)
+            for tri in trigrammes(cle):
+                self._index.setdefault(tri, array.array("i")).append(identifiant)
+        self._fiches[cle] = fiche
+        return cle
+
+    def ajouter(self, modele, consommation_kw, puissance_frigo_kw, inverter, source="deepseek"):
+        """Ajoute (ou remplace) un modèle si ses caractéristiques sont valides. Retourne vrai si ajouté."""
+        if not fiche_valide(consommation_kw, puissance_frigo_kw, inverter):
+            return False
+        self.ajouter_plusieurs([(modele, consommation_kw, puissance_frigo_kw, inverter)], source)
+        return True
+
+    def ajouter_plusieurs(self, lignes, source="import"):
+        """Ajoute en une transaction des tuples ``(modele, consommation_kw, puissance_frigo_kw, inverter)``."""
+        valides = []
+        with self._verrou:
+            for modele, conso, froid, inverter in lignes:
+                if fiche_valide(conso, froid, inverter):
+                    cle = self._indexer(modele, conso, froid, bool(inverter), source)
+                    if cle:
+                        valides.append((cle, modele, conso, froid, int(bool(inverter)), source))
+        with sqlite3.connect(self.chemin) as cnx:
+            cnx.executemany("INSERT OR REPLACE INTO modeles VALUES (?, ?, ?, ?, ?, ?)", valides)
+        return len(valides)
+
+    def importer_csv(self, chemin):
+        """Importe un fichier CSV de modèles ; retourne le nombre de modèles valides importés."""
+        def booleen(valeur):
+            return str(valeur).strip().lower() not in {"non", "non-inverter", "non inverter", "false", "faux", "0", "no", ""}
+
+        def nombre(valeur):
+            try:
+                return float(str(valeur).replace(",", "."))
+            except ValueError:
+                return None
+
+        with open(chemin, newline="", encoding="utf-8") as f:
+            lignes = [(ligne["modele"], nombre(ligne["consommation_kw"]),
+                       nombre(ligne["puissance_frigorifique_kw"]), booleen(ligne["inverter"]))
+                      for ligne in csv.DictReader(f)]
+        return self.ajouter_plusieurs(lignes, source="import")
+
+    def rechercher(self, modele):
+        """Fiche du modèle (avec ``similarite`` de 0 à 1), ou ``None`` si rien d'assez proche."""
+        cle = normaliser(modele)
+        if not cle:
+            return None
+        with self._verrou:
+            if cle in self._fiches:
+                return {**self._fiches[cle], "similarite": 1.0}
+            postings = [np.frombuffer(self._index[tri], dtype=np.int32)
+                        for tri in trigrammes(cle) if tri in self._index]
+            if not postings:
+                return None
+            # Nombre de trigrammes communs avec chaque modèle du catalogue, en un seul comptage
+            communs = np.bincount(np.concatenate(postings), minlength=len(self._cles))
+            # Libère les vues sur les index avant qu'un ajout concurrent ne les agrandisse
+            del postings
+            k = min(NB_CANDIDATS, len(communs))
+            candidats = np.argpartition(-communs, k - 1)[:k]
+            nombres = re.findall(r"\d+", cle)
+            meilleur, meilleure_similarite = None, SEUIL_SIMILARITE
+            for identifiant in candidats[np.argsort(-communs[candidats])]:
+                candidat = self._cles[identifiant]
+                if communs[identifiant] == 0 or re.findall(r"\d+", candidat) != nombres:
+                    continue
+                similarite = difflib.SequenceMatcher(None, cle, candidat).ratio()
+                if similarite >= meilleure_similarite:
+                    meilleur, meilleure_similarite = candidat, similarite
+            if meilleur is None:
+                return None
+            return {**self._fiches[meilleur], "similarite": meilleure_similarite}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gestion du catalogue local de climatiseurs.")
+    sous = parser.add_subparsers(dest="commande", required=True)
+    importer = sous.add_parser("importer", help="Importer un fichier CSV de modèles")
+    importer.add_argument("fichier")
+    chercher = sous.add_parser("rechercher", help="Rechercher un modèle")
+    chercher.add_argument("modele")
+    parser.add_argument("--catalogue", default=None, help="Chemin du catalogue SQLite")
+    args = parser.parse_args(argv)
+    catalogue = CatalogueClimatiseurs(args.catalogue)
+    if args.commande == "importer":
+        print(f"{catalogue.importer_csv(args.fichier)} modèles importés ({len(catalogue)} au total).")
+    else:
+        print(catalogue.rechercher(args.modele) or "Modèle introuvable dans le catalogue.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Construction du jeu de normales climatiques horaires embarqué (``donnees/``).
+
+Produit, pour chaque ville de ``meteo.VILLES``, la température (°C, float16)
+et l'humidité relative (%, uint8) normales par jour de l'année (366 jours,
+année bissextile de référence) et par heure, dans deux fichiers ``.npy``
+colonnaires de forme ``(villes, 366, 24)`` lus ensuite en mémoire projetée
+par ``normales.py``.
+
+Deux sources possibles :
+
+- par défaut, la table ``CLIMAT_MENSUEL`` ci-dessous : moyennes mensuelles
+  approximatives (arrondies au degré / à 5 % près) des températures minimales et
+  maximales et de l'humidité relative, interpolées jour par jour puis
+  réparties sur 24 h par un profil diurne (minimum vers 6 h, maximum vers 15 h) ;
+- ``--epw DOSSIER`` : un fichier d'année type ``<Ville>.epw`` par ville, dont
+  les valeurs horaires sont moyennées par jour de l'année et par heure. C'est
+  la source à privilégier dès que des fichiers TMY sont disponibles.
+
+    python construire_normales.py [--epw DOSSIER] [--sortie donnees]
+"""
+import argparse
+import datetime
+import json
+import os
+
+import numpy as np
+
+from meteo import VILLES
+from simulation import HEURES
+from simulation_longue import blocs_meteo
+
+JOURS_AN = 366
+ANNEE_REFERENCE = 2000  # bissextile : le 29 février a sa place dans l'index
+DOSSIER_DEFAUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "donnees")
+
+# Ville -> (max mensuels °C, min mensuels °C, humidité relative mensuelle %), de janvier à décembre.
+# Ordres de grandeur climatologiques, à remplacer par des années types (--epw) dès que possible.
+CLIMAT_MENSUEL = {
+    "Adrar": ((20, 23, 27, 32, 37, 42, 45, 44, 40, 33, 26, 21), (5, 7, 11, 16, 21, 26, 29, 28, 25, 18, 11, 6),
+              (35, 30, 25, 20, 18, 15, 14, 16, 20, 26, 33, 37)),
+    "Alger": ((17, 17, 19, 21, 24, 28, 31, 32, 29, 26, 21, 18), (6, 6, 8, 10, 13, 17, 20, 21, 19, 15, 11, 8),
+              (75, 74, 73, 72, 73, 71, 70, 70, 71, 72, 74, 75)),
+    "Annaba": ((16, 17, 19, 21, 24, 28, 31, 32, 29, 26, 21, 17), (7, 7, 8, 10, 14, 17, 20, 21, 19, 16, 11, 8),
+               (76, 75, 75, 74, 74, 72, 70, 70, 72, 73, 75, 76)),
+    "Batna": ((11, 13, 16, 20, 25, 31, 35, 34, 28, 22, 16, 12), (0, 1, 3, 6, 10, 15, 18, 18, 14, 10, 5, 1),
+              (70, 66, 62, 58, 52, 43, 37, 40, 52, 60, 68, 72)),
+    "Béchar": ((16, 19, 23, 27, 31, 37, 41, 40, 34, 27, 21, 17), (3, 5, 9, 12, 17, 22, 25, 25, 20, 14, 8, 4),
+               (48, 42, 36, 31, 27, 22, 20, 22, 30, 38, 46, 50)),
+    "Béjaïa": ((17, 17, 19, 21, 23, 27, 30, 31, 29, 26, 21, 18), (7, 7, 9, 11, 14, 18, 21, 21, 19, 16, 12, 9),
+               (76, 75, 75, 74, 75, 73, 72, 72, 73, 74, 75, 76)),
+    "Biskra": ((17, 19, 23, 27, 32, 38, 41, 40, 35, 29, 22, 18), (6, 8, 11, 15, 20, 25, 28, 28, 23, 18, 12, 7),
+               (58, 50, 44, 40, 35, 29, 26, 28, 38, 46, 55, 60)),
+    "Constantine": ((12, 13, 16, 19, 24, 30, 34, 34, 28, 23, 17, 13), (2, 3, 5, 7, 11, 15, 18, 19, 15, 11, 6, 3),
+                    (76, 73, 70, 68, 63, 54, 48, 50, 60, 67, 73, 77)),
+    "Ghardaïa": ((17, 19, 23, 27, 32, 37, 41, 40, 34, 28, 22, 17), (5, 7, 10, 14, 19, 24, 27, 26, 22, 16, 10, 6),
+                 (52, 45, 39, 34, 30, 25, 22, 24, 33, 41, 50, 55)),
+    "Laghouat": ((13, 15, 19, 23, 28, 34, 38, 37, 31, 25, 18, 14), (1, 3, 6, 9, 14, 19, 22, 22, 17, 12, 6, 2),
+                 (63, 57, 50, 45, 40, 33, 28, 31, 42, 51, 60, 65)),
+    "Oran": ((17, 18, 20, 22, 25, 28, 31, 32, 29, 26, 21, 18), (6, 7, 9, 11, 14, 18, 21, 22, 19, 15, 11, 8),
+             (73, 72, 71, 70, 71, 71, 71, 71, 71, 72, 73, 74)),
+    "Ouargla": ((19, 22, 26, 31, 36, 41, 44, 43, 38, 32, 24, 19), (5, 7, 11, 15, 20, 25, 28, 27, 23, 17, 10, 6),
+                (50, 43, 36, 30, 26, 22, 19, 22, 30, 38, 47, 52)),
+    "Sétif": ((9, 11, 14, 17, 23, 29, 33, 33, 27, 21, 14, 10), (0, 0, 3, 5, 9, 14, 17, 17, 13, 9, 4, 1),
+              (77, 74, 70, 67, 62, 52, 44, 46, 58, 66, 74, 78)),
+    "Tamanrasset": ((20, 23, 26, 30, 33, 35, 35, 34, 33, 30, 25, 21), (4, 6, 10, 14, 18, 21, 22, 21, 20, 15, 9, 5),
+                    (30, 25, 20, 18, 19, 20, 23, 27, 26, 24, 27, 30)),
+    "Tizi Ouzou": ((16, 17, 20, 22, 26, 32, 35, 36, 31, 27, 21, 17), (5, 6, 8, 10, 13, 17, 20, 21, 18, 14, 10, 7),
+                   (78, 76, 74, 72, 70, 64, 60, 60, 66, 71, 76, 78)),
+    "Tlemcen": ((15, 16, 18, 20, 24, 28, 32, 32, 28, 24, 19, 16), (5, 6, 7, 9, 12, 16, 19, 20, 17, 13, 9, 6),
+                (72, 70, 68, 66, 64, 60, 56, 57, 62, 67, 71, 73)),
+}
+# Amplitude (±, en points) de la variation diurne de l'humidité relative
+AMPLITUDE_HUMIDITE = 12
+
+
+def profil_diurne():
+    """Poids ``(24,)`` entre 0 (minimum vers 6 h) et 1 (maximum vers 15 h), en demi-cosinus."""
+    h = np.arange(HEURES, dtype=np.float64)
+    montee = 0.5 - 0.5 * np.cos(np.pi * (h - 6) / 9)
+    descente = 0.5 + 0.5 * np.cos(np.pi * (h - 15) / 15)
+    return np.where(h < 6, 0.5 + 0.5 * np.cos(np.pi * (h + 9) / 15), np.where(h <= 15, montee, descente))
+
+
+def interpoler_mensuel(valeurs):
+    """Valeurs journalières ``(366,)`` interpolées (périodiquement) entre les milieux de mois."""
+    milieux = np.array([(datetime.date(ANNEE_REFERENCE, m, 15) - datetime.date(ANNEE_REFERENCE, 1, 1)).days
+                        for m in range(1, 13)], dtype=np.float64)
+    return np.interp(np.arange(JOURS_AN), milieux, np.asarray(valeurs, dtype=np.float64), period=JOURS_AN)
+
+
+def normales_depuis_table():
+    """Tableaux ``(villes, 366, 24)`` de température et d'humidité depuis ``CLIMAT_MENSUEL``."""
+    profil = profil_diurne()
+    temperature = np.empty((len(VILLES), JOURS_AN, HEURES))
+    humidite = np.empty((len(VILLES), JOURS_AN, HEURES))
+    for i, ville in enumerate(VILLES):
+        t_max, t_min, hum = (interpoler_mensuel(v) for v in CLIMAT_MENSUEL[ville])
+        temperature[i] = t_min[:, None] + (t_max - t_min)[:, None] * profil
+        # L'humidité relative baisse quand la température monte
+        humidite[i] = hum[:, None] + AMPLITUDE_HUMIDITE * (1 - 2 * profil)
+    return temperature, np.clip(humidite, 5, 100)
+
+
+def normales_depuis_epw(dossier):
+    """Tableaux ``(villes, 366, 24)`` moyennés depuis un fichier ``<Ville>.epw`` par ville."""
+    temperature = np.zeros((len(VILLES), JOURS_AN, HEURES))
+    humidite = np.zeros((len(VILLES), JOURS_AN, HEURES))
+    for i, ville in enumerate(VILLES):
+        somme_t = np.zeros((JOURS_AN, HEURES))
+        somme_h = np.zeros((JOURS_AN, HEURES))
+        compte = np.zeros(JOURS_AN)
+        for dates, t, h in blocs_meteo(os.path.join(dossier, f"{ville}.epw")):
+            jours = np.array([d.replace(year=ANNEE_REFERENCE).timetuple().tm_yday - 1 for d in dates])
+            np.add.at(somme_t, jours, t)
+            np.add.at(somme_h, jours, h)
+            np.add.at(compte, jours, 1)
+        # Le 29 février absent des années non bissextiles reprend la moyenne du 28 et du 1er mars
+        manquants = compte == 0
+        compte = np.maximum(compte, 1)[:, None]
+        temperature[i], humidite[i] = somme_t / compte, somme_h / compte
+        for j in np.flatnonzero(manquants):
+            temperature[i, j] = (temperature[i, j - 1] + temperature[i, (j + 1) % JOURS_AN]) / 2
+            humidite[i, j] = (humidite[i, j - 1] + humidite[i, (j + 1) % JOURS_AN]) / 2
+    return temperature, np.clip(humidite, 0, 100)
+
+
+def ecrire(temperature, humidite, dossier, source):
+    os.makedirs(dossier, exist_ok=True)
+    np.save(os.path.join(dossier, "normales_temperature.npy"), temperature.astype(np.float16))
+    np.save(os.path.join(dossier, "normales_humidite.npy"), np.rint(humidite).astype(np.uint8))
+    with open(os.path.join(dossier, "normales_villes.json"), "w", encoding="utf-8") as f:
+        json.dump({"villes": list(VILLES), "annee_reference": ANNEE_REFERENCE, "source": source},
+                  f, ensure_ascii=False, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Construit les normales climatiques horaires embarquées.")
+    parser.add_argument("--epw", default=None, help="Dossier contenant un fichier <Ville>.epw par ville")
+    parser.add_argument("--sortie", default=DOSSIER_DEFAUT, help="Dossier de sortie (défaut : donnees/)")
+    args = parser.parse_args(argv)
+    if args.epw:
+        temperature, humidite = normales_depuis_epw(args.epw)
+        source = f"Moyennes horaires d'années types EPW ({os.path.basename(os.path.normpath(args.epw))})"
+    else:
+        temperature, humidite = normales_depuis_table()
+        source = "Moyennes mensuelles approximatives (construire_normales.CLIMAT_MENSUEL) et profil diurne"
+    ecrire(temperature, humidite, args.sortie, source)
+    print(f"Normales écrites dans {args.sortie} ({len(VILLES)} villes).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""Simulation fine (pas d'une minute par défaut) du fonctionnement du compresseur.
+
+Le modèle horaire (``simulation.py``) résume chaque heure par un facteur
+d'utilisation. Ici, la température intérieure évolue pas à pas (modèle
+thermique du premier ordre, constante de temps ``constante_temps_min``) et un
+thermostat à hystérésis autour de ``temp_confort`` commande le climatiseur :
+
+- non-inverter (tout ou rien) : le compresseur démarre au-dessus de
+  ``confort + hysteresis / 2`` et s'arrête en dessous de
+  ``confort - hysteresis / 2``, à pleine puissance ; chaque démarrage coûte
+  une surintensité (``facteur_demarrage``) sur le pas du démarrage ;
+- inverter : la puissance est modulée (charge de l'heure plus correction
+  proportionnelle à l'écart au confort) sans descendre sous
+  ``vitesse_min_inverter`` ; en dessous de ce seuil il cycle aussi.
+
+Les charges thermiques sont celles du modèle horaire : en régime établi,
+l'inverter consomme la même énergie que le scénario optimisé horaire.
+Les scénarios (dimensions de tête des paramètres) sont simulés ensemble :
+seule la boucle sur les pas des heures d'utilisation reste en Python, sur des
+tableaux ``(scénarios,)`` préalloués. Les heures où aucun scénario n'est en
+marche sont calculées d'un bloc (relaxation exponentielle), et les
+statistiques (démarrages, cycles courts, puissance) heure par heure sur les
+états ``(pas, scénarios)`` de l'heure.
+"""
+import numpy as np
+
+from simulation import ECART_PLEINE_CHARGE, HEURES, HUMIDITE_DEFAUT, courbe_temperature, facteur_humidite, preparer
+
+PAS_MIN_DEFAUT = 1
+HYSTERESIS_DEFAUT = 1.0  # largeur de la bande du thermostat (°C)
+CONSTANTE_TEMPS_DEFAUT = 45.0  # constante de temps thermique de la pièce (min)
+FACTEUR_DEMARRAGE_DEFAUT = 1.5  # puissance moyenne du pas de démarrage / puissance nominale
+VITESSE_MIN_INVERTER = 0.3
+BANDE_PROPORTIONNELLE = 2.0  # écart au confort (°C) qui fait varier la puissance inverter de 100%
+# Cycle de marche plus court que cette durée (min) : cycle court
+DUREE_CYCLE_COURT = 10
+
+
+def temperature_equivalente(t_ext, humid, facteurs):
+    """Température extérieure équivalente ``(..., jours, 24)``, charges de la pièce incluses.
+
+    Climatiseur arrêté, la pièce tend vers cette température ; à pleine
+    puissance, vers cette température moins ``capacite_refroidissement``.
+    ``humid`` est le facteur d'humidité (``simulation.facteur_humidite``).
+    """
+    diff = np.maximum(0.0, t_ext - facteurs["confort"]) * facteurs["charge"] * humid
+    return np.where(t_ext > facteurs["confort"], facteurs["confort"] + diff, t_ext)
+
+
+def capacite_refroidissement(facteurs):
+    """Écart de température (°C) tenu à pleine puissance, réduit par l'âge et l'entretien."""
+    return ECART_PLEINE_CHARGE / facteurs["appareil"]
+
+
+def simuler_cycles(temp_jour, humid_jour=HUMIDITE_DEFAUT, pas_min=PAS_MIN_DEFAUT, hysteresis=HYSTERESIS_DEFAUT,
+                   constante_temps_min=CONSTANTE_TEMPS_DEFAUT, facteur_demarrage=FACTEUR_DEMARRAGE_DEFAUT,
+                   vitesse_min_inverter=VITESSE_MIN_INVERTER, profils=True, **parametres):
+    """Simule le thermostat et le compresseur pas à pas sur les jours de ``temp_jour``.
+
+    ``temp_jour`` et ``humid_jour`` ont la forme ``(jours,)`` (météo commune) ;
+    ``parametres`` sont ceux de ``simulation.simuler_horaire``, scalaires ou
+    tableaux de forme ``(...)`` (scénarios). ``pas_min`` doit diviser 60.
+
+    Retourne un dictionnaire de tableaux ``(...)`` : énergie (kWh), démarrages,
+    cycles courts, pointe (kW), minutes d'inconfort (pièce occupée au-dessus
+    de la bande), énergie journalière ``(..., jours)`` et, si ``profils``, la
+    puissance (kW) et la température intérieure (°C) à chaque pas
+    ``(..., jours * 24 * 60 / pas_min)``.
+    """
+    if pas_min <= 0 or 60 % pas_min:
+        raise ValueError("Le pas de temps doit diviser 60 minutes.")
+    pas_par_heure = 60 // pas_min
+    temp_jour = np.asarray(temp_jour, dtype=np.float64)
+    humid = facteur_humidite(np.asarray(humid_jour, dtype=np.float64))[..., None]
+    t_ext = courbe_temperature(temp_jour)  # (jours, 24)
+    jours = t_ext.shape[0]
+
+    facteurs = preparer(**parametres)
+    forme = np.broadcast_shapes(*(np.shape(v)[:-2] for v in facteurs.values()),
+                                np.shape(parametres.get("est_inverter", True)))
+    n = int(np.prod(forme))
+
+    def scenarios(valeur, axes=()):
+        # Aplatit les dimensions de tête en un axe de scénarios
+        valeur = np.asarray(valeur)
+        return np.broadcast_to(valeur, forme + valeur.shape[valeur.ndim - len(axes):]).reshape((n,) + axes)
+
+    confort = scenarios(facteurs["confort"][..., 0, 0])
+    capacite = scenarios(capacite_refroidissement(facteurs)[..., 0, 0])
+    puissance_nominale = scenarios(facteurs["puissance"][..., 0, 0])
+    inverter = scenarios(np.asarray(parametres.get("est_inverter", True), dtype=bool))
+    # Charge de chaque heure (fraction de la pleine puissance qui maintient le confort)
+    t_equivalente = temperature_equivalente(t_ext, humid, facteurs)
+    t_equivalente = scenarios(t_equivalente, (jours, HEURES)).reshape(n, -1).T.copy()  # (heures, n)
+    charge = np.minimum(t_equivalente - confort, capacite) / capacite
+    np.maximum(charge, 0.0, out=charge)
+    occupe = scenarios(facteurs["masque"][..., 0, :], (HEURES,))
+    occupe = np.tile(occupe, (1, jours)).T.copy()  # (heures, n)
+
+    haut = confort + hysteresis / 2
+    bas = confort - hysteresis / 2
+    # Évolution exacte sur un pas à entrées constantes : T' = a T + (1 - a) (T_eq_arrêt - u capacité)
+    a = np.exp(-pas_min / constante_temps_min)
+    gain_refroidissement = -(1 - a) * capacite
+    derive = (1 - a) * t_equivalente  # (heures, n)
+    # Commande inverter : u = charge + (T - confort) / bande, bornée à [vitesse min, 1] ;
+    # un plancher de 1 donne la pleine puissance des non-inverter
+    base_inverter = charge - confort / BANDE_PROPORTIONNELLE  # (heures, n)
+    plancher = np.where(inverter, vitesse_min_inverter, 1.0)
+    # Seuil de démarrage par heure, infini hors des heures d'utilisation (arrêt forcé) ;
+    # un compresseur en marche ne s'arrête que sous le seuil abaissé de l'hystérésis
+    seuil_demarrage = np.where(occupe, haut, np.inf)  # (heures, n)
+    surcout_demarrage = np.where(inverter, 0.0, (facteur_demarrage - 1.0) * puissance_nominale)
+    kwh_par_pas = pas_min / 60
+    seuil_cycle_court = DUREE_CYCLE_COURT / pas_min
+
+    nb_pas = jours * HEURES * pas_par_heure
+    puissance_pas = np.empty((nb_pas, n), dtype=np.float32) if profils else None
+    temperature_pas = np.empty((nb_pas, n), dtype=np.float32) if profils else None
+    # États d'une heure (pas, n), exploités heure par heure après la boucle sur les pas
+    marche = np.empty((pas_par_heure, n), dtype=bool)
+    commande = np.empty((pas_par_heure, n))
+    temperature = np.empty((pas_par_heure, n))
+    seuil = np.empty(n)
+    tampon = np.empty(n)
+
+    t_int = np.where(occupe[0], confort, t_equivalente[0])
+    precedent = np.zeros(n, dtype=bool)
+    dernier_demarrage = np.zeros(n, dtype=np.int64)
+    demarrages = np.zeros(n, dtype=np.int64)
+    cycles_courts = np.zeros(n, dtype=np.int64)
+    inconfort = np.zeros(n, dtype=np.int64)
+    pointe = np.zeros(n)
+    energie_horaire = np.empty((jours * HEURES, n))
+    pas_heure = np.arange(pas_par_heure)[:, None]
+    occupe_une = occupe.any(axis=1)
+    relaxation = a ** (pas_heure + 1.0)  # facteur d'amortissement après chaque pas de l'heure
+
+    for h in range(jours * HEURES):
+        if occupe_une[h]:
+            seuil_h, base_h, derive_h = seuil_demarrage[h], base_inverter[h], derive[h]
+            etat = precedent
+            for k in range(pas_par_heure):
+                # Thermostat à hystérésis puis commande (pleine puissance, ou modulée pour l'inverter)
+                en_marche, u = marche[k], commande[k]
+                np.multiply(etat, -hysteresis, out=seuil)
+                seuil += seuil_h
+                np.greater(t_int, seuil, out=en_marche)
+                np.multiply(t_int, 1.0 / BANDE_PROPORTIONNELLE, out=u)
+                u += base_h
+                np.minimum(u, 1.0, out=u)
+                np.maximum(u, plancher, out=u)
+                u *= en_marche
+                # Évolution exacte de la température sur le pas
+                np.multiply(u, gain_refroidissement, out=tampon)
+                tampon += derive_h
+                t_int = np.multiply(t_int, a, out=temperature[k])
+                t_int += tampon
+                etat = en_marche
+        else:
+            # Aucun scénario en marche : relaxation exponentielle de toute l'heure d'un bloc
+            marche[:] = False
+            commande[:] = 0.0
+            np.subtract(t_int, t_equivalente[h], out=tampon)
+            np.multiply(relaxation, tampon, out=temperature)
+            temperature += t_equivalente[h]
+
+        # Statistiques de l'heure : démarrages, durée des cycles, puissance, inconfort
+        demarre = np.empty_like(marche)
+        demarre[0] = marche[0] & ~precedent
+        np.greater(marche[1:], marche[:-1], out=demarre[1:])
+        arrete = np.empty_like(marche)
+        arrete[0] = precedent & ~marche[0]
+        np.greater(marche[:-1], marche[1:], out=arrete[1:])
+        indice = h * pas_par_heure + pas_heure
+        debut_cycle = np.maximum.accumulate(
+            np.vstack([dernier_demarrage[None], np.where(demarre, indice, -1)]), axis=0)
+        cycles_courts += (arrete & (indice - debut_cycle[:-1] < seuil_cycle_court)).sum(axis=0)
+        dernier_demarrage = debut_cycle[-1]
+        demarrages += demarre.sum(axis=0)
+        puissance = commande * puissance_nominale + demarre * surcout_demarrage
+        np.maximum(pointe, puissance.max(axis=0), out=pointe)
+        energie_horaire[h] = puissance.sum(axis=0) * kwh_par_pas
+        inconfort += ((temperature > haut) & occupe[h]).sum(axis=0)
+        if profils:
+            puissance_pas[h * pas_par_heure:(h + 1) * pas_par_heure] = puissance
+            temperature_pas[h * pas_par_heure:(h + 1) * pas_par_heure] = temperature
+        precedent = marche[-1].copy()
+        t_int = temperature[-1].copy()
+
+    journaliere = energie_horaire.reshape(jours, HEURES, n).sum(axis=1).T.reshape(forme + (jours,))
+    resultats = {
+        "energie_kwh": journaliere.sum(axis=-1),
+        "journaliere": journaliere,
+        "demarrages": demarrages.reshape(forme),
+        "cycles_courts": cycles_courts.reshape(forme),
+        "pointe_kw": pointe.reshape(forme),
+        "minutes_inconfort": (inconfort * pas_min).reshape(forme),
+        "pas_min": pas_min,
+    }
+    if profils:
+        resultats["puissance"] = puissance_pas.T.reshape(forme + (nb_pas,))
+        resultats["temperature_interieure"] = temperature_pas.T.reshape(forme + (nb_pas,))
+    return resultats
@@ -0,0 +1,52 @@
+"""Construction des tableaux et graphiques de résultats de la section 3."""
+import altair as alt
+import pandas as pd
+
+
+def donnees_quotidiennes(jours, normale, optimisee):
+    """Tableau long (deux lignes par jour, normal et optimisé) pour le graphique en barres groupées."""
+    data_chart = []
+    for j, jour_label in enumerate(jours):
+        val_norm = normale[j] if j < len(normale) else 0.0
+        val_opti = optimisee[j] if j < len(optimisee) else 0.0
+        data_chart.append({"Jour": jour_label, "Scénario": "Normal", "Consommation (kWh)": val_norm})
+        data_chart.append({"Jour": jour_label, "Scénario": "Optimisé", "Consommation (kWh)": val_opti})
+    return pd.DataFrame(data_chart)
+
+
+def bandes_quotidiennes(jours, bas, haut, scenario="Optimisé"):
+    """Tableau des bandes de confiance (une ligne par jour) d'un scénario du graphique quotidien."""
+    return pd.DataFrame({"Jour": list(jours), "Scénario": scenario, "Bas (kWh)": bas, "Haut (kWh)": haut})
+
+
+def graphique_quotidien(df_chart, df_bandes=None):
+    """Graphique Altair en barres groupées de la consommation quotidienne par scénario.
+
+    ``df_bandes`` (cf. ``bandes_quotidiennes``) ajoute une barre d'erreur par jour.
+    """
+    barres = alt.Chart(df_chart).mark_bar().encode(
+        x=alt.X("Jour:N", title="Jour"),
+        y=alt.Y("Consommation (kWh):Q", title="Consommation (kWh)"),
+        color="Scénario:N",
+        xOffset="Scénario:N"
+    )
+    if df_bandes is not None:
+        # Même domaine de décalage que les barres, pour aligner chaque bande sur la barre de son scénario
+        decalage = alt.XOffset("Scénario:N", scale=alt.Scale(domain=sorted(df_chart["Scénario"].unique())))
+        bandes = alt.Chart(df_bandes).mark_errorbar(ticks=True, color="black").encode(
+            x=alt.X("Jour:N", title="Jour"),
+            y=alt.Y("Bas (kWh):Q", title="Consommation (kWh)"),
+            y2="Haut (kWh):Q",
+            xOffset=decalage
+        )
+        barres = alt.layer(barres, bandes)
+    return barres.properties(width=600)
+
+
+def profil_horaire(normale, optimisee):
+    """Tableau indexé par heure des consommations horaires (kW) d'un jour."""
+    return pd.DataFrame({
+        "Heure": list(range(len(normale))),
+        "Consommation normale (kW)": normale,
+        "Consommation optimisée (kW)": optimisee
+    }).set_index("Heure")
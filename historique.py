@@ -0,0 +1,163 @@
+"""Historique persistant des simulations sur 7 jours (SQLite), partagé entre sessions et processus.
+
+Chaque exécution est enregistrée avec toutes ses entrées (météo journalière
+et paramètres du climatiseur et de la pièce) et ses consommations horaires
+normale et optimisée. Elle est indexée par l'empreinte de ses entrées (une
+configuration identique est resservie sans nouveau calcul), par ville et par
+date. Les consommations horaires sont stockées en colonnes binaires
+(``float64``) et ne sont lues qu'à la demande : les listes et tableaux de
+synthèse (totaux, économies, paramètres) ne lisent que les colonnes
+scalaires et restent rapides sur des milliers d'exécutions.
+
+Configuration par variable d'environnement : ``HISTORIQUE_CHEMIN`` (fichier
+SQLite, défaut : répertoire temporaire).
+"""
+import contextlib
+import datetime
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+
+from simulation import HEURES, TARIF_ELECTRICITE
+
+CHEMIN_DEFAUT = os.path.join(tempfile.gettempdir(), "climatiseur_historique.sqlite")
+# À incrémenter quand le modèle de simulation change : les anciennes empreintes ne sont plus resservies
+VERSION_MODELE = 1
+
+
+def _json(valeur):
+    # Scalaires NumPy (paramètres lus dans des tableaux) convertis en types Python
+    return json.dumps(valeur, sort_keys=True, ensure_ascii=False, default=lambda v: v.item())
+
+
+class HistoriqueSimulations:
+    """Exécutions de la simulation sur 7 jours, stockées dans une base SQLite."""
+
+    def __init__(self, chemin=None):
+        self.chemin = chemin or os.environ.get("HISTORIQUE_CHEMIN", CHEMIN_DEFAUT)
+        with self._connexion() as cnx:
+            cnx.execute("PRAGMA journal_mode=WAL")
+            cnx.execute(
+                "CREATE TABLE IF NOT EXISTS executions ("
+                " id INTEGER PRIMARY KEY, empreinte TEXT UNIQUE, ville TEXT, date_simulation TEXT,"
+                " cree_le REAL, jours TEXT, entrees TEXT,"
+                " total_normale_kwh REAL, total_optimisee_kwh REAL, economie_kwh REAL, economie_cout REAL,"
+                " horaire_normale BLOB, horaire_optimisee BLOB)")
+            cnx.execute("CREATE INDEX IF NOT EXISTS executions_ville_date ON executions (ville, date_simulation)")
+            cnx.execute("CREATE INDEX IF NOT EXISTS executions_date ON executions (date_simulation)")
+
+    @contextlib.contextmanager
+    def _connexion(self):
+        # Une connexion par opération : sûr entre threads (sessions Streamlit) et processus
+        cnx = sqlite3.connect(self.chemin, timeout=10)
+        try:
+            with cnx:
+                yield cnx
+        finally:
+            cnx.close()
+
+    @staticmethod
+    def empreinte(temp_jour, humid_jour, **parametres):
+        """Empreinte (SHA-256) des entrées d'une simulation et de la version du modèle."""
+        contenu = _json({
+            "version": VERSION_MODELE,
+            "temp_jour": np.round(np.asarray(temp_jour, dtype=np.float64), 3).tolist(),
+            "humid_jour": np.round(np.asarray(humid_jour, dtype=np.float64), 3).tolist(),
+            "parametres": parametres,
+        })
+        return hashlib.sha256(contenu.encode("utf-8")).hexdigest()
+
+    def enregistrer(self, temp_jour, humid_jour, parametres, resultats, ville=None, jours=None,
+                    date_simulation=None, tarif=TARIF_ELECTRICITE):
+        """Enregistre une exécution (``resultats`` de ``simulation.simuler``) ; retourne son empreinte.
+
+        Une exécution de même empreinte déjà enregistrée est conservée telle quelle.
+        """
+        empreinte = self.empreinte(temp_jour, humid_jour, **parametres)
+        horaire_normale = np.ascontiguousarray(resultats["horaire_normale"], dtype=np.float64)
+        horaire_optimisee = np.ascontiguousarray(resultats["horaire_optimisee"], dtype=np.float64)
+        total_normale, total_optimisee = float(horaire_normale.sum()), float(horaire_optimisee.sum())
+        entrees = {"temp_jour": np.asarray(temp_jour, dtype=np.float64).tolist(),
+                   "humid_jour": np.asarray(humid_jour, dtype=np.float64).tolist(), "parametres": parametres}
+        with self._connexion() as cnx:
+            cnx.execute(
+                "INSERT OR IGNORE INTO executions (empreinte, ville, date_simulation, cree_le, jours, entrees,"
+                " total_normale_kwh, total_optimisee_kwh, economie_kwh, economie_cout,"
+                " horaire_normale, horaire_optimisee) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (empreinte, ville, str(date_simulation or datetime.date.today()), time.time(),
+                 _json(list(jours) if jours is not None else None), _json(entrees),
+                 total_normale, total_optimisee, total_normale - total_optimisee,
+                 (total_normale - total_optimisee) * tarif,
+                 horaire_normale.tobytes(), horaire_optimisee.tobytes()))
+        return empreinte
+
+    @staticmethod
+    def _execution(ligne):
+        identifiant, empreinte, ville, date_simulation, cree_le, jours, entrees, normale, optimisee = ligne
+        horaire_normale = np.frombuffer(normale, dtype=np.float64).reshape(-1, HEURES)
+        horaire_optimisee = np.frombuffer(optimisee, dtype=np.float64).reshape(-1, HEURES)
+        return {
+            "id": identifiant, "empreinte": empreinte, "ville": ville, "date_simulation": date_simulation,
+            "cree_le": cree_le, "jours": json.loads(jours), **json.loads(entrees),
+            "horaire_normale": horaire_normale,
+            "horaire_optimisee": horaire_optimisee,
+            "journaliere_normale": horaire_normale.sum(axis=-1),
+            "journaliere_optimisee": horaire_optimisee.sum(axis=-1),
+        }
+
+    _COLONNES = ("id, empreinte, ville, date_simulation, cree_le, jours, entrees,"
+                 " horaire_normale, horaire_optimisee")
+
+    def lire(self, empreinte):
+        """Exécution complète (entrées et consommations) d'empreinte donnée, ou ``None``."""
+        with self._connexion() as cnx:
+            ligne = cnx.execute(f"SELECT {self._COLONNES} FROM executions WHERE empreinte = ?",
+                                (empreinte,)).fetchone()
+        return None if ligne is None else self._execution(ligne)
+
+    def charger(self, identifiants):
+        """Exécutions complètes d'identifiants donnés, dans l'ordre demandé (absentes ignorées)."""
+        identifiants = [int(i) for i in identifiants]
+        if not identifiants:
+            return []
+        with self._connexion() as cnx:
+            lignes = cnx.execute(f"SELECT {self._COLONNES} FROM executions WHERE id IN"
+                                 f" ({', '.join('?' * len(identifiants))})", identifiants).fetchall()
+        executions = {ligne[0]: self._execution(ligne) for ligne in lignes}
+        return [executions[i] for i in identifiants if i in executions]
+
+    def tableau(self, ville=None, depuis=None, jusqu_a=None, limite=None):
+        """Synthèse des exécutions (plus récentes d'abord) : DataFrame sans les consommations horaires.
+
+        Une colonne par paramètre de simulation, pour filtrer et comparer des
+        milliers d'exécutions ; ``depuis`` et ``jusqu_a`` bornent (inclus) la date de simulation.
+        """
+        import pandas as pd
+
+        conditions, valeurs = [], []
+        for condition, valeur in (("ville = ?", ville), ("date_simulation >= ?", depuis),
+                                  ("date_simulation <= ?", jusqu_a)):
+            if valeur is not None:
+                conditions.append(condition)
+                valeurs.append(str(valeur))
+        requete = ("SELECT id, ville, date_simulation, cree_le, total_normale_kwh, total_optimisee_kwh,"
+                   " economie_kwh, economie_cout, json_extract(entrees, '$.parametres') FROM executions"
+                   + (" WHERE " + " AND ".join(conditions) if conditions else "")
+                   + " ORDER BY cree_le DESC" + (" LIMIT ?" if limite else ""))
+        with self._connexion() as cnx:
+            lignes = cnx.execute(requete, valeurs + ([int(limite)] if limite else [])).fetchall()
+        colonnes = ["id", "ville", "date_simulation", "cree_le", "total_normale_kwh", "total_optimisee_kwh",
+                    "economie_kwh", "economie_cout"]
+        synthese = pd.DataFrame([ligne[:-1] for ligne in lignes], columns=colonnes)
+        parametres = pd.DataFrame([json.loads(ligne[-1]) for ligne in lignes], index=synthese.index)
+        synthese["cree_le"] = pd.to_datetime(synthese["cree_le"], unit="s")
+        return pd.concat([synthese, parametres], axis=1)
+
+    def nombre(self):
+        with self._connexion() as cnx:
+            return cnx.execute("SELECT COUNT(*) FROM executions").fetchone()[0]
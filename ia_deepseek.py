@@ -0,0 +1,136 @@
+"""Appels à l'IA DeepSeek (API compatible OpenAI) et lecture de ses réponses.
+
+Les complétions en flux (streaming) produisent le texte morceau par morceau
+pour être affiché au fil de la génération (``st.write_stream``). Chaque appel
+renseigne un dictionnaire de mesures : délai avant le premier jeton (latence
+perçue) et durée totale.
+
+Les demandes identiques simultanées (ex. fiche d'un modèle courant demandée
+par plusieurs sessions) partagent un seul appel, et tous les appels
+respectent les limites de concurrence et de débit de DeepSeek (cf.
+``appels_partages.py``). Chaque appel porte un délai (``DELAI_REQUETE``) :
+une API bloquée ne retient pas les sessions indéfiniment. Le module ``openai`` (long à importer) n'est chargé
+qu'au premier appel.
+"""
+import json
+import re
+import time
+
+import appels_partages
+import traces
+
+URL_API = "https://api.deepseek.com/v1"
+# Délais de l'API (connexion, lecture) en secondes ; en flux, la lecture porte sur chaque morceau
+DELAI_REQUETE = (5.0, 60.0)
+
+# Motifs d'extraction des caractéristiques techniques dans la réponse texte de l'IA
+MOTIF_CONSOMMATION = re.compile(r'consommation.*?([\d\.]+)\s*kW', re.IGNORECASE)
+MOTIF_FROID_KW = re.compile(r'puissance frigorifique.*?([\d\.]+)\s*kW', re.IGNORECASE)
+MOTIF_FROID_BTU = re.compile(r'puissance frigorifique.*?([\d,]+)\s*BTU', re.IGNORECASE)
+MOTIF_INVERTER = re.compile(r'inverter', re.IGNORECASE)
+MOTIF_NON_INVERTER = re.compile(r'non inverter|pas inverter', re.IGNORECASE)
+# Conversion BTU/h vers kW (1 BTU/h ≈ 0.00029307107 kW)
+KW_PAR_BTU = 0.00029307107
+
+
+def generer_en_flux(mesure, **parametres):
+    """Générateur des morceaux de texte d'une complétion DeepSeek.
+
+    ``parametres`` est transmis à ``openai.ChatCompletion.create`` (modèle,
+    messages, température...). ``mesure`` reçoit ``premier_jeton_s``,
+    ``total_s``, ``caracteres`` et ``jetons`` une fois le flux consommé
+    (``jetons`` : usage déclaré par l'API, sinon nombre de morceaux reçus).
+    """
+    import openai
+
+    debut_ns = time.time_ns()
+    debut = time.perf_counter()
+    caracteres = morceaux = 0
+    usage = None
+    reponse = openai.ChatCompletion.create(stream=True, **parametres)
+    for morceau in reponse:
+        choix = morceau["choices"][0] if morceau["choices"] else {}
+        texte = choix.get("delta", {}).get("content")
+        if texte:
+            if "premier_jeton_s" not in mesure:
+                mesure["premier_jeton_s"] = time.perf_counter() - debut
+            caracteres += len(texte)
+            morceaux += 1
+            yield texte
+        else:
+            # L'usage n'est déclaré que dans le dernier morceau, sans texte
+            usage = morceau.get("usage") or usage
+    mesure["total_s"] = time.perf_counter() - debut
+    mesure["caracteres"] = caracteres
+    mesure["jetons"] = usage["completion_tokens"] if usage else morceaux
+    attributs = {"modele": parametres.get("model", ""), "caracteres": caracteres, "jetons": mesure["jetons"],
+                 "premier_jeton_ms": round(mesure.get("premier_jeton_s", 0.0) * 1e3, 1)}
+    if usage:
+        attributs["jetons_prompt"] = usage["prompt_tokens"]
+    traces.enregistrer("deepseek.flux", debut_ns, time.time_ns(), **attributs)
+
+
+class ClientDeepSeek:
+    """Accès à l'API DeepSeek (clé et adresse fixées une fois), partageable entre sessions.
+
+    Les identifiants sont passés à chaque appel plutôt que par les variables
+    globales ``openai.api_key`` / ``openai.api_base``.
+    """
+
+    def __init__(self, cle, adresse=URL_API):
+        self._identifiants = {"api_key": cle, "api_base": adresse}
+
+    def completer(self, **parametres):
+        """Réponse complète (non diffusée) de ``openai.ChatCompletion.create``, partagée entre demandes identiques."""
+        import openai
+        parametres.setdefault("request_timeout", DELAI_REQUETE)
+        cle = (*self._identifiants.values(), json.dumps(parametres, sort_keys=True, ensure_ascii=False, default=str))
+        return appels_partages.fournisseur("deepseek").appeler(
+            cle, lambda: openai.ChatCompletion.create(**self._identifiants, **parametres))
+
+    def en_flux(self, mesure, **parametres):
+        """Générateur des morceaux de texte (cf. ``generer_en_flux``), non partagé mais limité."""
+        parametres.setdefault("request_timeout", DELAI_REQUETE)
+        with appels_partages.fournisseur("deepseek").emission():
+            yield from generer_en_flux(mesure, **self._identifiants, **parametres)
+
+
+def resume_mesure(mesure):
+    """Libellé court des temps de génération d'un appel."""
+    premier = mesure.get("premier_jeton_s")
+    total = mesure.get("total_s")
+    if premier is None or total is None:
+        return ""
+    return f"Premier jeton après {premier:.2f} s, génération complète en {total:.2f} s."
+
+
+def extraire_caracteristiques(texte):
+    """Consommation (kW), puissance frigorifique (kW) et technologie inverter depuis la réponse de l'IA.
+
+    Chaque valeur vaut ``None`` si elle n'a pas été trouvée.
+    """
+    conso_val = froid_val = inverter_val = None
+    match_conso = MOTIF_CONSOMMATION.search(texte)
+    if match_conso:
+        try:
+            conso_val = float(match_conso.group(1))
+        except ValueError:
+            conso_val = None
+    # Puissance frigorifique en kW, ou en BTU (convertie en kW)
+    match_froid = MOTIF_FROID_KW.search(texte)
+    if match_froid:
+        try:
+            froid_val = float(match_froid.group(1))
+        except ValueError:
+            froid_val = None
+    else:
+        match_froid_btu = MOTIF_FROID_BTU.search(texte)
+        if match_froid_btu:
+            try:
+                froid_val = round(float(match_froid_btu.group(1).replace(',', '')) * KW_PAR_BTU, 2)
+            except ValueError:
+                froid_val = None
+    # Mention de "inverter" ou "non inverter"
+    if MOTIF_INVERTER.search(texte):
+        inverter_val = not MOTIF_NON_INVERTER.search(texte)
+    return conso_val, froid_val, inverter_val
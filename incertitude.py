@@ -0,0 +1,85 @@
+"""Mode incertitude : simulation Monte Carlo autour des prévisions météo.
+
+Une prévision sur 7 jours n'est qu'une estimation : les économies calculées
+sur la seule prévision ont une précision trompeuse. Ici, des milliers de
+trajectoires de température et d'humidité moyennes sont tirées autour de la
+prévision. L'erreur de chaque jour est gaussienne, d'écart-type croissant
+avec l'échéance, et corrélée d'un jour au suivant (processus AR(1)). Tous les
+tirages sont simulés en un seul appel vectorisé de ``simulation.simuler``
+(tableaux ``(tirages, jours, 24)``), puis résumés par quantiles (P10, P50,
+P90 par défaut).
+
+Le scénario normal (pleine puissance sur la plage d'utilisation) ne dépend
+pas de la météo : seules la consommation optimisée et les économies varient
+d'un tirage à l'autre.
+"""
+import numpy as np
+
+from simulation import TARIF_ELECTRICITE, simuler
+
+NB_TIRAGES = 2000
+GRAINE = 0  # tirages reproductibles : mêmes bandes à chaque réexécution
+# Écart-type de l'erreur de prévision (jour 1, augmentation par jour d'échéance)
+ECART_TEMPERATURE = (1.0, 0.5)  # °C
+ECART_HUMIDITE = (5.0, 2.0)  # points d'humidité
+CORRELATION_JOURS = 0.6  # corrélation des erreurs de deux jours consécutifs
+QUANTILES = (10, 50, 90)
+
+
+def erreurs_correlees(generateur, tirages, jours, correlation=CORRELATION_JOURS):
+    """Erreurs ``(tirages, jours)`` de variance 1, corrélées d'un jour au suivant (AR(1))."""
+    bruit = generateur.standard_normal((tirages, jours))
+    innovation = np.sqrt(1 - correlation ** 2)
+    for j in range(1, jours):
+        bruit[:, j] *= innovation
+        bruit[:, j] += correlation * bruit[:, j - 1]
+    return bruit
+
+
+def tirer_meteo(temp_jour, humid_jour, nb_tirages=NB_TIRAGES, graine=GRAINE, ecart_temperature=ECART_TEMPERATURE,
+                ecart_humidite=ECART_HUMIDITE, correlation=CORRELATION_JOURS):
+    """Trajectoires perturbées ``(tirages, jours)`` de température et d'humidité moyennes autour de la prévision."""
+    temp_jour = np.asarray(temp_jour, dtype=np.float64)
+    humid_jour = np.asarray(humid_jour, dtype=np.float64)
+    jours = temp_jour.shape[-1]
+    echeance = np.arange(jours)
+    generateur = np.random.default_rng(graine)
+    temp = erreurs_correlees(generateur, nb_tirages, jours, correlation)
+    temp *= ecart_temperature[0] + ecart_temperature[1] * echeance
+    temp += temp_jour
+    humid = erreurs_correlees(generateur, nb_tirages, jours, correlation)
+    humid *= ecart_humidite[0] + ecart_humidite[1] * echeance
+    humid += humid_jour
+    np.clip(humid, 0.0, 100.0, out=humid)
+    return temp, humid
+
+
+def simuler_incertitude(temp_jour, humid_jour, nb_tirages=NB_TIRAGES, graine=GRAINE, quantiles=QUANTILES,
+                        tarif=TARIF_ELECTRICITE, **parametres):
+    """Quantiles des consommations et des économies pour la prévision ``(jours,)`` et ses incertitudes.
+
+    ``parametres`` sont ceux de ``simulation.simuler`` (scalaires). Retourne
+    un dictionnaire de tableaux ``(quantiles, jours)`` (consommations
+    journalières et économies journalières, kWh) et ``(quantiles,)``
+    (économie totale en kWh, en DZD et en pourcentage). Les quantiles des
+    totaux sont calculés sur les totaux de chaque tirage.
+    """
+    temp, humid = tirer_meteo(temp_jour, humid_jour, nb_tirages, graine)
+    resultats = simuler(temp, humid, **parametres)
+    normale = resultats["journaliere_normale"]
+    optimisee = resultats["journaliere_optimisee"]
+    economie = normale - optimisee  # (tirages, jours)
+    economie_totale = economie.sum(axis=-1)
+    total_normal = normale.sum(axis=-1)
+    pourcent = np.divide(economie_totale * 100, total_normal, out=np.zeros_like(economie_totale),
+                         where=total_normal > 0)
+    return {
+        "quantiles": tuple(quantiles),
+        "nb_tirages": nb_tirages,
+        "journaliere_normale": np.percentile(normale, quantiles, axis=0),
+        "journaliere_optimisee": np.percentile(optimisee, quantiles, axis=0),
+        "economie_journaliere": np.percentile(economie, quantiles, axis=0),
+        "economie_kwh": np.percentile(economie_totale, quantiles),
+        "economie_cout": np.percentile(economie_totale, quantiles) * tarif,
+        "economie_pourcent": np.percentile(pourcent, quantiles),
+    }
@@ -0,0 +1,237 @@
+"""Récupération des données météo en ligne (OpenWeatherMap, Tameteo en secours).
+
+Les appels passent par une session HTTP partagée (connexions réutilisées) avec
+des délais maximaux stricts. La météo actuelle et les prévisions OneCall sont
+demandées en parallèle ; si les prévisions OpenWeatherMap ne sont pas arrivées
+après ``delai_relance`` secondes (ou ont échoué), une requête Tameteo est lancée
+en concurrence et la première prévision valide sur 7 jours est retenue. Le temps
+d'attente total est donc borné par l'appel le plus lent et non par la somme des
+trois appels. La page Tameteo est lue en flux et son analyse mémorisée par
+ville et par date (cf. ``tameteo.py``). Les requêtes identiques de sessions
+simultanées sont regroupées en un seul appel, dans les limites de
+concurrence et de débit de chaque fournisseur (cf. ``appels_partages.py``).
+"""
+import concurrent.futures
+import datetime
+import threading
+import time
+import urllib.parse
+
+import appels_partages
+import tameteo
+import traces
+
+JOURS = 7
+# Délais HTTP (connexion, lecture) en secondes
+TIMEOUT = (3.05, 6)
+# Délai avant de lancer la requête Tameteo en concurrence d'OpenWeatherMap
+DELAI_RELANCE = 1.5
+# Temps d'attente maximal de l'ensemble des appels météo
+ECHEANCE = 8.0
+
+URL_OWM_ACTUELLE = ("http://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lon}"
+                    "&units=metric&lang=fr&appid={cle}")
+URL_OWM_ONECALL = ("http://api.openweathermap.org/data/2.5/onecall?lat={lat}&lon={lon}"
+                   "&exclude=minutely,hourly,alerts&units=metric&lang=fr&appid={cle}")
+
+# Liste prédéfinie de villes algériennes avec leurs coordonnées (latitude, longitude)
+VILLES = {
+    "Adrar": (27.867, -0.283),
+    "Alger": (36.753, 3.058),
+    "Annaba": (36.90, 7.766),
+    "Batna": (35.556, 6.174),
+    "Béchar": (31.617, -2.217),
+    "Béjaïa": (36.756, 5.084),
+    "Biskra": (34.850, 5.730),
+    "Constantine": (36.365, 6.615),
+    "Ghardaïa": (32.490, 3.670),
+    "Laghouat": (33.800, 2.865),
+    "Oran": (35.699, -0.636),
+    "Ouargla": (31.949, 5.325),
+    "Sétif": (36.191, 5.414),
+    "Tamanrasset": (22.785, 5.525),
+    "Tizi Ouzou": (36.717, 4.050),
+    "Tlemcen": (34.882, -1.314)
+}
+
+# Dictionnaire de correspondance ville -> ID Tameteo connu (extrait manuellement)
+TAMETEO_IDS = {
+    "Adrar": 8861,
+    "Alger": 8842,
+    "Annaba": 8849,
+    "Batna": 8853,
+    "Béchar": 8860,
+    "Béjaïa": 8840,
+    "Biskra": 8862,
+    "Constantine": 8850,
+    "Oran": 8859,
+    "Tlemcen": 8858
+}
+
+_session = None
+_verrou_session = threading.Lock()
+_executeur = concurrent.futures.ThreadPoolExecutor(max_workers=16, thread_name_prefix="meteo")
+_analyses_tameteo = tameteo.CachePrevisions()
+
+
+def session():
+    """Session HTTP partagée par le processus (pool de connexions, nouvelle tentative unique)."""
+    global _session
+    with _verrou_session:
+        if _session is None:
+            # Import différé : inutile tant qu'aucune donnée en ligne n'est demandée
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+
+            _session = requests.Session()
+            reessai = Retry(total=1, backoff_factor=0.2, status_forcelist=(502, 503, 504),
+                            allowed_methods=frozenset(["GET"]))
+            adaptateur = HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=reessai)
+            _session.mount("http://", adaptateur)
+            _session.mount("https://", adaptateur)
+        return _session
+
+
+def charger_json(url, timeout=TIMEOUT, fournisseur="owm"):
+    """Réponse JSON de l'API, ou dictionnaire vide si le statut HTTP n'est pas 200.
+
+    Les appels simultanés à la même adresse partagent une seule requête.
+    """
+    def charger():
+        # Seuls l'hôte et le chemin sont tracés : la requête contient la clé d'API
+        adresse = urllib.parse.urlsplit(url)
+        with traces.span("http.get", hote=adresse.netloc, chemin=adresse.path) as s:
+            res = session().get(url, timeout=timeout)
+            s["statut"] = res.status_code
+            s["octets"] = len(res.content)
+            return res.json() if res.status_code == 200 else {}
+    return appels_partages.fournisseur(fournisseur).appeler(url, charger)
+
+
+def url_tameteo(ville):
+    tameteo_id = TAMETEO_IDS.get(ville)
+    if not tameteo_id:
+        return None
+    return (f"https://www.tameteo.com/meteo_{ville.replace(' ', '+')}"
+            f"-Afrique-Algerie-Provincia+de+{ville.replace(' ', '+')}-1-{tameteo_id}.html")
+
+
+def previsions_owm(data_onecall):
+    """Lignes de prévision (format du tableau de l'application) depuis la réponse OneCall."""
+    previsions = []
+    for i, day in enumerate(data_onecall.get("daily", [])[:JOURS]):
+        dt_ts = day.get("dt", None)
+        if dt_ts:
+            # Conversion timestamp en date locale, ex: "28 Mar"
+            date_str = datetime.datetime.fromtimestamp(dt_ts).strftime("%d %b")
+        else:
+            date_str = f"Jour {i+1}"
+        # Moyenne des températures min et max du jour, sinon température de journée
+        temp_min = day.get("temp", {}).get("min")
+        temp_max = day.get("temp", {}).get("max")
+        if temp_min is not None and temp_max is not None:
+            temp_val = (temp_min + temp_max) / 2.0
+        else:
+            temp_val = day.get("temp", {}).get("day", None) or day.get("temp", None)
+        humid_val = day.get("humidity", None)
+        previsions.append({
+            "Date": date_str,
+            "Température (°C)": f"{temp_val:.1f}" if temp_val is not None else "",
+            "Humidité (%)": f"{humid_val:.0f}" if humid_val is not None else ""
+        })
+    return previsions
+
+
+def previsions_tameteo(html):
+    """Lignes de prévision extraites d'une page Tameteo déjà téléchargée."""
+    return tameteo.lignes_previsions(tameteo.analyser(html.splitlines(), JOURS))
+
+
+def charger_tameteo(ville, timeout=TIMEOUT):
+    """Prévisions Tameteo de la ville, lues en flux et mémorisées pour la journée."""
+    url = url_tameteo(ville)
+    with traces.span("meteo.tameteo", ville=ville) as s:
+        s["cache"] = "succes"
+
+        def charger():
+            s["cache"] = "echec"
+            return appels_partages.fournisseur("tameteo").appeler(
+                url, lambda: tameteo.lire(session().get(url, timeout=timeout, stream=True), JOURS))
+        jours = _analyses_tameteo.obtenir(ville, charger)
+        return tameteo.lignes_previsions(jours)
+
+
+def recuperer_meteo(ville, lat, lon, cle_owm, cache=None, ttl_actuelle=None,
+                    delai_relance=DELAI_RELANCE, echeance=ECHEANCE, timeout=TIMEOUT):
+    """Météo actuelle et prévisions sur 7 jours pour une ville.
+
+    ``cache`` (optionnel) est un ``cache_meteo.CacheMeteo`` consulté avant tout
+    appel réseau. Retourne un dictionnaire ``{"actuelle", "previsions", "source",
+    "erreurs"}`` ; ``erreurs`` liste les fournisseurs en échec.
+    """
+    def via_cache(fournisseur, charger, ttl=None):
+        if cache is None:
+            return charger()
+        return cache.obtenir(cache.cle(fournisseur, lat, lon), charger, ttl=ttl)
+
+    url_actuelle = URL_OWM_ACTUELLE.format(lat=lat, lon=lon, cle=cle_owm)
+    url_onecall = URL_OWM_ONECALL.format(lat=lat, lon=lon, cle=cle_owm)
+    url_secours = url_tameteo(ville)
+
+    with traces.span("meteo.recuperer", ville=ville) as s:
+        resultat = _recuperer(via_cache, ville, url_actuelle, url_onecall, url_secours, ttl_actuelle,
+                              delai_relance, echeance, timeout)
+        s["source"] = resultat["source"] or ""
+        s["erreurs"] = ",".join(resultat["erreurs"])
+        return resultat
+
+
+def _recuperer(via_cache, ville, url_actuelle, url_onecall, url_secours, ttl_actuelle,
+               delai_relance, echeance, timeout):
+    debut = time.monotonic()
+    f_actuelle = traces.soumettre(_executeur, via_cache, "owm_actuelle",
+                                  lambda: charger_json(url_actuelle, timeout), ttl_actuelle)
+    f_onecall = traces.soumettre(
+        _executeur,
+        lambda: previsions_owm(via_cache("owm_onecall", lambda: charger_json(url_onecall, timeout)) or {}))
+    sources = {f_onecall: "owm"}
+    en_cours = {f_onecall}
+    f_tameteo = None
+    previsions, source, erreurs = [], None, []
+
+    while en_cours:
+        reste = echeance - (time.monotonic() - debut)
+        if reste <= 0:
+            break
+        attente = reste
+        if f_tameteo is None and url_secours:
+            attente = max(0.0, min(reste, delai_relance - (time.monotonic() - debut)))
+        termines, en_cours = concurrent.futures.wait(en_cours, timeout=attente,
+                                                     return_when=concurrent.futures.FIRST_COMPLETED)
+        for f in termines:
+            try:
+                resultat = f.result()
+            except Exception:
+                resultat = []
+            if not resultat:
+                erreurs.append(sources[f])
+            # Une prévision complète l'emporte ; une prévision partielle n'est gardée qu'à défaut
+            if len(resultat) > len(previsions):
+                previsions, source = resultat, sources[f]
+        if len(previsions) >= JOURS:
+            break
+        # Relance Tameteo : délai écoulé ou OpenWeatherMap déjà en échec
+        if f_tameteo is None and url_secours and (f_onecall.done() or time.monotonic() - debut >= delai_relance):
+            f_tameteo = traces.soumettre(_executeur, via_cache, "tameteo", lambda: charger_tameteo(ville, timeout))
+            sources[f_tameteo] = "tameteo"
+            en_cours = en_cours | {f_tameteo}
+    for f in en_cours:
+        erreurs.append(sources[f])
+
+    # La météo actuelle a tourné en parallèle : on ne l'attend que pendant le temps restant
+    try:
+        actuelle = f_actuelle.result(timeout=max(0.0, echeance - (time.monotonic() - debut))) or {}
+    except Exception:
+        actuelle = {}
+    return {"actuelle": actuelle, "previsions": previsions, "source": source, "erreurs": erreurs}
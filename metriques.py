@@ -0,0 +1,63 @@
+"""Métriques du processus au format texte Prometheus, servies sur ``GET /metriques``.
+
+Regroupe les compteurs du cache météo (``cache_meteo.py``, stockés dans sa
+base SQLite donc communs à tous les processus) et ceux des appels sortants
+partagés de ce processus (``appels_partages.py``). Le service de simulation
+les expose sur sa route ``/metriques`` ; l'application Streamlit, qui n'a pas
+de route HTTP propre, peut les exposer sur un petit serveur dédié si
+``METRIQUES_PORT`` est défini.
+
+Exemple de configuration Prometheus ::
+
+    scrape_configs:
+      - job_name: climatiseur
+        metrics_path: /metriques
+        static_configs: [{targets: ["localhost:9108"]}]
+"""
+import http.server
+import os
+import sqlite3
+import threading
+
+import appels_partages
+
+TYPE_CONTENU = "text/plain; version=0.0.4; charset=utf-8"
+CHEMIN = "/metriques"
+
+
+def exposition(cache=None):
+    """Texte Prometheus du cache météo ``cache`` (s'il est lisible) et des appels partagés du processus."""
+    parties = []
+    if cache is not None:
+        try:
+            parties.append(cache.exposition_prometheus())
+        except (OSError, sqlite3.Error):
+            pass  # base du cache indisponible : les autres métriques restent servies
+    parties.append(appels_partages.exposition_prometheus())
+    return "".join(parties)
+
+
+def demarrer_serveur(port=None, hote="127.0.0.1", cache=None):
+    """Serveur HTTP de ``GET /metriques`` dans un thread de fond ; None si aucun port n'est configuré."""
+    port = port or os.environ.get("METRIQUES_PORT")
+    if not port:
+        return None
+
+    class Gestionnaire(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != CHEMIN:
+                self.send_error(404)
+                return
+            corps = exposition(cache).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", TYPE_CONTENU)
+            self.send_header("Content-Length", str(len(corps)))
+            self.end_headers()
+            self.wfile.write(corps)
+
+        def log_message(self, format, *args):
+            pass  # une ligne par collecte n'apporte rien aux journaux de l'application
+
+    serveur = http.server.ThreadingHTTPServer((hote, int(port)), Gestionnaire)
+    threading.Thread(target=serveur.serve_forever, name="metriques", daemon=True).start()
+    return serveur
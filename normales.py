@@ -0,0 +1,85 @@
+"""Normales climatiques horaires embarquées : source météo hors ligne.
+
+Les fichiers de ``donnees/`` (produits par ``construire_normales.py``) rangent
+la température (float16) et l'humidité (uint8) par ville, jour de l'année et
+heure, dans des tableaux ``(villes, 366, 24)``. Ils sont ouverts en mémoire
+projetée (``mmap``) au premier accès : seules les pages lues sont chargées,
+et une tranche de quelques jours pour une ville est une simple vue contiguë.
+"""
+import datetime
+import json
+import os
+import threading
+
+import numpy as np
+
+from simulation import HEURES
+
+DOSSIER = os.environ.get("NORMALES_DOSSIER",
+                         os.path.join(os.path.dirname(os.path.abspath(__file__)), "donnees"))
+JOURS_AN = 366
+ANNEE_REFERENCE = 2000
+
+_donnees = None
+_verrou = threading.Lock()
+
+
+def donnees():
+    """``(temperature, humidite, description)`` ouverts une seule fois par processus."""
+    global _donnees
+    with _verrou:
+        if _donnees is None:
+            with open(os.path.join(DOSSIER, "normales_villes.json"), encoding="utf-8") as f:
+                description = json.load(f)
+            description["indices"] = {ville: i for i, ville in enumerate(description["villes"])}
+            _donnees = (np.load(os.path.join(DOSSIER, "normales_temperature.npy"), mmap_mode="r"),
+                        np.load(os.path.join(DOSSIER, "normales_humidite.npy"), mmap_mode="r"),
+                        description)
+        return _donnees
+
+
+def disponible(ville):
+    """Vrai si des normales existent pour la ville."""
+    try:
+        return ville in donnees()[2]["indices"]
+    except OSError:
+        return False
+
+
+def source():
+    """Description de l'origine des normales embarquées."""
+    return donnees()[2]["source"]
+
+
+def jour_de_l_annee(date):
+    """Indice (0-365) de la date dans l'année de référence bissextile."""
+    return date.replace(year=ANNEE_REFERENCE).timetuple().tm_yday - 1
+
+
+def tranche(ville, debut, jours=7):
+    """Température et humidité ``(jours, 24)`` normales de ``ville`` à partir de la date ``debut``.
+
+    Retourne des vues sur les fichiers projetés ; une copie n'est faite que si
+    la période chevauche le 31 décembre (ou saute le 29 février d'une année non
+    bissextile). ``KeyError`` si la ville est inconnue.
+    """
+    temperature, humidite, description = donnees()
+    i = description["indices"][ville]
+    indices = np.array([jour_de_l_annee(debut + datetime.timedelta(days=k)) for k in range(jours)])
+    j = indices[0]
+    if (indices == np.arange(j, j + jours)).all():
+        return temperature[i, j:j + jours], humidite[i, j:j + jours]
+    return temperature[i, indices], humidite[i, indices]
+
+
+def previsions_normales(ville, debut=None, jours=7):
+    """Lignes de prévision (format du tableau de l'application) tirées des normales."""
+    debut = debut or datetime.date.today()
+    temperature, humidite = tranche(ville, debut, jours)
+    moyennes_t = temperature.astype(np.float32).sum(axis=1) / HEURES
+    moyennes_h = humidite.astype(np.float32).sum(axis=1) / HEURES
+    return [{
+        "Date": (debut + datetime.timedelta(days=k)).strftime("%d %b"),
+        "Température (°C)": f"{t:.1f}",
+        "Humidité (%)": f"{h:.0f}",
+    } for k, (t, h) in enumerate(zip(moyennes_t, moyennes_h))]
@@ -0,0 +1,197 @@
+"""Planning horaire de coût minimal (arrêt ou consigne) sous tarif horaire ou par tranches.
+
+Le scénario « optimisé » de ``simulation.py`` garde une plage d'utilisation
+fixe centrée sur 15 h. Ici, chaque heure reçoit une action (arrêt, ou
+consigne de température) choisie pour minimiser le coût de l'électricité
+plus une pénalité d'inconfort pendant les heures d'utilisation : il peut par
+exemple pré-refroidir la pièce en heures creuses avant une heure de pointe.
+
+La pièce suit le modèle thermique de ``cyclage.py`` au pas horaire. Le
+planning est obtenu par programmation dynamique sur les états (heure,
+température intérieure) : la fonction de valeur est calculée à rebours sur
+une grille de températures (interpolation linéaire entre les points), pour
+toutes les températures et toutes les actions d'une heure en un seul calcul
+vectorisé, puis le planning est déroulé depuis la température initiale.
+L'horizon entier (ex. 168 heures) est optimisé d'un bloc : les jours sont
+couplés par la température de la pièce.
+
+Les tarifs par tranches (prix selon la consommation cumulée de la période
+de facturation) sont traités par leur prix marginal, constant dans une
+tranche : le planning est recalculé si la consommation optimisée change de
+tranche.
+"""
+import numpy as np
+
+from cyclage import capacite_refroidissement, temperature_equivalente
+from simulation import HEURES, HUMIDITE_DEFAUT, TARIF_ELECTRICITE, courbe_temperature, facteur_humidite, preparer
+
+# Consignes possibles, en écart à la température de confort (°C)
+ECARTS_CONSIGNE = (-4.0, -3.0, -2.0, -1.0, -0.5, 0.0, 0.5, 1.0)
+TOLERANCE_DEFAUT = 0.5  # dépassement du confort toléré sans pénalité (°C)
+PENALITE_INCONFORT = 100.0  # DZD par °C.h au-delà de la tolérance, heures d'utilisation
+PAS_GRILLE = 0.1  # pas de la grille de températures (°C)
+# Inertie de la pièce à l'échelle horaire (murs, mobilier), plus lente que celle de l'air (cf. cyclage.py)
+CONSTANTE_TEMPS_PLANNING = 180.0  # min
+
+
+def prix_par_periodes(periodes, prix_defaut):
+    """Prix horaires ``(24,)`` depuis des périodes ``(heure_debut, heure_fin_exclue, prix)``.
+
+    Une période peut passer minuit (ex. ``(22, 6, prix)``).
+    """
+    prix = np.full(HEURES, float(prix_defaut))
+    h = np.arange(HEURES)
+    for debut, fin, valeur in periodes:
+        prix[(h >= debut) & (h < fin) if debut < fin else (h >= debut) | (h < fin)] = valeur
+    return prix
+
+
+# Tarifs horaires (DZD/kWh pour chaque heure) ; hors tarif unique, ce sont des exemples modifiables
+TARIFS_HORAIRES = {
+    "Tarif unique": np.full(HEURES, float(TARIF_ELECTRICITE)),
+    "Heures creuses / pleines / pointe (exemple)": prix_par_periodes([(22, 6, 2.5), (17, 21, 10.0)], 5.0),
+}
+# Tarif progressif (exemple trimestriel) : (plafond de la tranche en kWh, prix DZD/kWh)
+TRANCHES_EXEMPLE = ((125.0, 1.78), (250.0, 4.18), (1000.0, 4.81), (np.inf, 5.48))
+
+
+def cout_tranches(kwh, tranches=TRANCHES_EXEMPLE):
+    """Coût (DZD) d'une consommation totale (ou d'un tableau de consommations) sur la période de facturation."""
+    cout, plancher = 0.0, 0.0
+    for plafond, prix in tranches:
+        cout += np.maximum(0.0, np.minimum(kwh, plafond) - plancher) * prix
+        plancher = plafond
+    return cout
+
+
+def prix_marginal(kwh, tranches=TRANCHES_EXEMPLE):
+    """Prix (DZD/kWh) du kWh suivant une consommation ``kwh`` déjà facturée."""
+    for plafond, prix in tranches:
+        if kwh < plafond:
+            return prix
+    return tranches[-1][1]
+
+
+def optimiser_planning(temp_jour, humid_jour=HUMIDITE_DEFAUT, prix=TARIFS_HORAIRES["Tarif unique"],
+                       tolerance=TOLERANCE_DEFAUT, penalite_inconfort=PENALITE_INCONFORT,
+                       ecarts_consigne=ECARTS_CONSIGNE, constante_temps_min=CONSTANTE_TEMPS_PLANNING,
+                       pas_grille=PAS_GRILLE, **parametres):
+    """Planning de coût minimal pour les jours de ``temp_jour`` (une pièce).
+
+    ``prix`` (DZD/kWh) est diffusable vers ``(jours, 24)`` ; ``parametres``
+    sont les paramètres scalaires de ``simulation.simuler_horaire``. Chaque
+    heure, l'action est l'arrêt ou une consigne ``temp_confort + écart`` :
+    le climatiseur fournit alors la puissance (au plus la pleine puissance)
+    qui amène la pièce à la consigne en fin d'heure. La pénalité porte sur la
+    température moyenne de chaque heure d'utilisation au-delà de
+    ``temp_confort + tolerance``.
+
+    Retourne un dictionnaire de tableaux ``(jours, 24)`` : consigne (°C, NaN
+    à l'arrêt), commande (fraction de la pleine puissance), consommation
+    (kWh), coût (DZD), température intérieure en fin d'heure, ainsi que les
+    totaux journaliers et de l'horizon. La clé « reference » contient les
+    mêmes résultats pour la plage d'utilisation fixe (consigne au confort
+    pendant les heures d'utilisation, arrêt sinon) avec le même modèle.
+    """
+    facteurs = preparer(**parametres)
+    t_ext = courbe_temperature(temp_jour)  # (jours, 24)
+    humid = facteur_humidite(np.asarray(humid_jour, dtype=np.float64))[..., None]
+    jours = t_ext.shape[0]
+    confort = float(facteurs["confort"][0, 0])
+    capacite = float(capacite_refroidissement(facteurs)[0, 0])
+    puissance = float(facteurs["puissance"][0, 0])
+    t_eq = np.broadcast_to(temperature_equivalente(t_ext, humid, facteurs), (jours, HEURES)).ravel()
+    occupe = np.broadcast_to(facteurs["masque"][0], (jours, HEURES)).ravel()
+    prix = np.broadcast_to(np.asarray(prix, dtype=np.float64), (jours, HEURES)).ravel()
+    nb_heures = jours * HEURES
+
+    # T_fin = a T + (1 - a) (T_eq - u capacité), u dans [0, 1]
+    a = np.exp(-60.0 / constante_temps_min)
+    consignes = confort + np.asarray(ecarts_consigne, dtype=np.float64)
+    limite = confort + tolerance
+    t_initiale = confort if occupe[0] else t_eq[0]
+    grille = np.arange(min(consignes.min(), t_eq.min()) - 1.0, max(t_eq.max(), t_initiale) + 1.0 + pas_grille,
+                       pas_grille)
+
+    def transitions(h, t):
+        # Commande, coût et température de fin d'heure pour chaque température ``t`` et chaque action
+        libre = a * t[..., None] + (1 - a) * t_eq[h]  # évolution climatiseur arrêté
+        u = np.clip((libre - consignes) / ((1 - a) * capacite), 0.0, 1.0)
+        u = np.concatenate([np.zeros(u.shape[:-1] + (1,)), u], axis=-1)  # action 0 : arrêt
+        t_fin = libre - (1 - a) * capacite * u
+        cout = u * (puissance * prix[h])
+        if occupe[h]:
+            cout += penalite_inconfort * np.maximum(0.0, (t[..., None] + t_fin) / 2 - limite)
+        return u, cout, t_fin
+
+    # Programmation dynamique à rebours : valeurs[h] = coût minimal de l'heure h à la fin de l'horizon
+    valeurs = np.zeros((nb_heures + 1, grille.size))
+    for h in range(nb_heures - 1, -1, -1):
+        _, cout, t_fin = transitions(h, grille)
+        cout += np.interp(t_fin, grille, valeurs[h + 1])
+        np.min(cout, axis=1, out=valeurs[h])
+
+    forme = (jours, HEURES)
+
+    def derouler(choisir):
+        # Simule le planning heure par heure depuis la température initiale
+        commande = np.empty(nb_heures)
+        action = np.empty(nb_heures, dtype=np.int64)
+        temperature = np.empty(nb_heures)
+        inconfort = 0.0
+        t = np.float64(t_initiale)
+        for h in range(nb_heures):
+            u, cout, t_fin = transitions(h, t)
+            action[h] = choisir(h, cout, t_fin)
+            commande[h], t_debut, t = u[action[h]], t, t_fin[action[h]]
+            temperature[h] = t
+            if occupe[h]:
+                inconfort += max(0.0, (t_debut + t) / 2 - limite)
+        horaire = commande * puissance
+        cout_horaire = horaire * prix
+        return {
+            "consigne": np.where(action > 0, consignes[np.maximum(action - 1, 0)], np.nan).reshape(forme),
+            "commande": commande.reshape(forme),
+            "horaire": horaire.reshape(forme),
+            "cout_horaire": cout_horaire.reshape(forme),
+            "temperature_interieure": temperature.reshape(forme),
+            "journaliere": horaire.reshape(forme).sum(axis=1),
+            "cout_journalier": cout_horaire.reshape(forme).sum(axis=1),
+            "energie_kwh": float(horaire.sum()),
+            "cout": float(cout_horaire.sum()),
+            "inconfort_degres_heures": inconfort,
+        }
+
+    # Action de coût total minimal, évaluée sur la température exacte (hors grille)
+    resultats = derouler(lambda h, cout, t_fin: np.argmin(cout + np.interp(t_fin, grille, valeurs[h + 1])))
+    consigne_confort = 1 + int(np.argmin(np.abs(consignes - confort)))
+    resultats["reference"] = derouler(lambda h, cout, t_fin: consigne_confort if occupe[h] else 0)
+    return resultats
+
+
+def optimiser_planning_tranches(temp_jour, humid_jour=HUMIDITE_DEFAUT, consommation_facturee=0.0,
+                                tranches=TRANCHES_EXEMPLE, **options):
+    """``optimiser_planning`` sous tarif par tranches, ``consommation_facturee`` kWh déjà consommés sur la période.
+
+    Le planning est optimisé au prix marginal de la tranche atteinte en fin
+    d'horizon (recalculé tant que la tranche change, au plus une fois par
+    tranche) ; « cout », « cout_journalier » et « cout_horaire » sont les
+    coûts réels des tranches traversées, heure après heure (consommation
+    cumulée depuis ``consommation_facturee``), pour le planning et pour la
+    référence. « prix_marginal » donne le prix retenu.
+    """
+    prix = prix_marginal(consommation_facturee, tranches)
+    for _ in tranches:
+        resultats = optimiser_planning(temp_jour, humid_jour, prix=prix, **options)
+        prix_fin = prix_marginal(consommation_facturee + resultats["energie_kwh"], tranches)
+        if prix_fin == prix:
+            break
+        prix = prix_fin
+    for r in (resultats, resultats["reference"]):
+        cumul = consommation_facturee + np.concatenate([[0.0], np.cumsum(r["horaire"])])
+        cout_horaire = np.diff(cout_tranches(cumul, tranches)).reshape(r["horaire"].shape)
+        r["cout_horaire"] = cout_horaire
+        r["cout_journalier"] = cout_horaire.sum(axis=1)
+        r["cout"] = float(cout_horaire.sum())
+    resultats["prix_marginal"] = prix
+    return resultats
@@ -0,0 +1,80 @@
+"""Rapport du démarrage à froid de l'application : imports et première exécution.
+
+Chaque mesure lance un interpréteur neuf (``python -X importtime``) qui
+exécute ``script3.py`` une fois dans le harnais de test Streamlit, sans
+secrets ni réseau (normales climatiques). Le rapport donne la durée de la
+première exécution et le temps d'import cumulé des paquets lourds chargés
+(ou « non chargé » s'ils ont été différés).
+
+    python rapport_imports.py [--repetitions 3] [--json rapport.json]
+
+À lancer sur l'image de conteneur cible, avant et après une modification.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+DOSSIER = os.path.dirname(os.path.abspath(__file__))
+PAQUETS_LOURDS = ("openai", "pandas", "altair", "pyarrow", "requests", "numpy")
+LIGNE_IMPORTTIME = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+PROGRAMME = """
+import json, sys, time
+debut = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+harnais = time.perf_counter()
+application = AppTest.from_file(sys.argv[1], default_timeout=300)
+application.secrets["DEEPSEEK_KEY"] = ""
+application.run()
+fin = time.perf_counter()
+print(json.dumps({"harnais_s": harnais - debut, "execution_s": fin - harnais,
+                  "exception": bool(application.exception)}))
+"""
+
+
+def mesurer():
+    """Une exécution à froid : durées et temps d'import cumulé (µs) des paquets lourds."""
+    processus = subprocess.run([sys.executable, "-X", "importtime", "-c", PROGRAMME,
+                                os.path.join(DOSSIER, "script3.py")],
+                               capture_output=True, text=True, cwd=DOSSIER, check=True)
+    resultat = json.loads(processus.stdout.strip().splitlines()[-1])
+    imports = {}
+    for ligne in processus.stderr.splitlines():
+        correspondance = LIGNE_IMPORTTIME.match(ligne)
+        # Seul le premier import d'un paquet est mesuré : les suivants le trouvent déjà chargé
+        if correspondance and correspondance[4] in PAQUETS_LOURDS and correspondance[4] not in imports:
+            imports[correspondance[4]] = int(correspondance[2])
+    resultat["imports_us"] = imports
+    return resultat
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rapport du démarrage à froid de l'application.")
+    parser.add_argument("--repetitions", type=int, default=3)
+    parser.add_argument("--json", help="Fichier où écrire le rapport")
+    args = parser.parse_args(argv)
+
+    mesures = [mesurer() for _ in range(args.repetitions)]
+    if any(m["exception"] for m in mesures):
+        print("Attention : l'exécution de script3.py a levé une exception.")
+    rapport = {
+        "python": sys.version.split()[0],
+        "execution_s": statistics.median(m["execution_s"] for m in mesures),
+        "imports_ms": {p: statistics.median(m["imports_us"][p] for m in mesures) / 1e3
+                       for p in PAQUETS_LOURDS if all(p in m["imports_us"] for m in mesures)},
+    }
+    print(f"Première exécution de script3.py (médiane sur {args.repetitions}) : {rapport['execution_s'] * 1e3:.0f} ms")
+    for paquet in PAQUETS_LOURDS:
+        temps = rapport["imports_ms"].get(paquet)
+        print(f"  {paquet:<10} {'non chargé' if temps is None else f'{temps:8.0f} ms'}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rapport, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,121 @@
 import streamlit as st
-import requests
+import collections
 import datetime
-import math
-import openai
-import pandas as pd
-import altair as alt
-
-# Clés API (doivent être configurées dans les secrets de l'application Streamlit)
-DEEPSEEK_API_KEY = st.secrets["DEEPSEEK_KEY"]
-#DEEPSEEK_API_KEY = st.secrets.get("DEEPSEEK_KEY", None)
-OWM_API_KEY = st.secrets.get("OWMAPI_KEY", None)
-
-# Tarif de l'électricité (DZD par kWh) - constant
-TARIF_ELECTRICITE = 5  # 5 DZD/kWh
-
-# Liste prédéfinie de villes algériennes avec leurs coordonnées (latitude, longitude)
-VILLES = {
-    "Adrar": (27.867, -0.283),
-    "Alger": (36.753, 3.058),
-    "Annaba": (36.90, 7.766),
-    "Batna": (35.556, 6.174),
-    "Béchar": (31.617, -2.217),
-    "Béjaïa": (36.756, 5.084),
-    "Biskra": (34.850, 5.730),
-    "Constantine": (36.365, 6.615),
-    "Ghardaïa": (32.490, 3.670),
-    "Laghouat": (33.800, 2.865),
-    "Oran": (35.699, -0.636),
-    "Ouargla": (31.949, 5.325),
-    "Sétif": (36.191, 5.414),
-    "Tamanrasset": (22.785, 5.525),
-    "Tizi Ouzou": (36.717, 4.050),
-    "Tlemcen": (34.882, -1.314)
-}
+import functools
+
+# Modules lourds (openai, pandas, altair, requests) importés à la première section qui en a besoin
+from cache_meteo import CacheMeteo
+from cache_rapports import CacheRapports
+from catalogue_climatiseurs import CatalogueClimatiseurs
+from historique import HistoriqueSimulations
+from ia_deepseek import ClientDeepSeek, extraire_caracteristiques, resume_mesure
+from meteo import VILLES, recuperer_meteo, url_tameteo
+from normales import previsions_normales
+from simulation import TARIF_ELECTRICITE, meteo_depuis_previsions
+from simulation_incrementale import SimulationIncrementale
+import appels_partages
+import metriques
+import traces
+
+
+def secret(nom):
+    # Clé API lue dans les secrets de l'application Streamlit ; None si absente (ou sans fichier de secrets)
+    try:
+        return st.secrets.get(nom, None)
+    except FileNotFoundError:
+        return None
+
+
+OWM_API_KEY = secret("OWMAPI_KEY")
+
+# Nombre d'exécutions listées dans l'historique des simulations
+LIMITE_HISTORIQUE = 200
+# Durée de vie en cache de la météo actuelle (s) ; les prévisions utilisent le TTL du cache
+TTL_METEO_ACTUELLE = 15 * 60
+
+# Chaque panneau (climatiseur, météo, simulation, historique, planning, balayage, simulation annuelle, calibration,
+# bâtiment, cycles, rapport, chat) est un fragment Streamlit : un widget d'un panneau ne réexécute que ce panneau. Les
+# panneaux échangent leurs données par l'état de session (caractéristiques "ac_*", "previsions_jours",
+# "resultats_simulation").
+# Seuls les paramètres de la pièce, communs à tous les panneaux, réexécutent toute l'application.
+
+
+@st.cache_resource
+def catalogue_climatiseurs():
+    # Catalogue local des modèles, chargé et indexé une seule fois par processus
+    return CatalogueClimatiseurs()
+
+
+@st.cache_resource
+def cache_rapports():
+    # Cache des rapports IA partagé par toutes les sessions du processus
+    return CacheRapports()
+
+
+@st.cache_resource
+def cache_meteo():
+    # Cache météo persistant, créé une seule fois par processus et partagé par toutes les sessions
+    return CacheMeteo()
+
+
+@st.cache_resource
+def serveur_metriques():
+    # Compteurs du cache météo et des appels sortants sur GET /metriques, si METRIQUES_PORT est défini
+    return metriques.demarrer_serveur(cache=cache_meteo())
+
+
+@st.cache_resource
+def historique_simulations():
+    # Historique persistant des simulations, partagé par toutes les sessions du processus
+    return HistoriqueSimulations()
+
+
+@st.cache_resource
+def client_deepseek():
+    # Client DeepSeek configuré une seule fois par processus ; None si la clé n'est pas configurée
+    cle = secret("DEEPSEEK_KEY")
+    return ClientDeepSeek(cle) if cle else None
+
+
+def conserver_trace(trace):
+    # Dernières traces de la session, affichées par le panneau de diagnostic
+    st.session_state.setdefault("traces", collections.deque(maxlen=20)).append(trace)
+
+
+def instrumenter(nom):
+    # Span par panneau ; la réexécution seule d'un fragment produit sa propre trace
+    def decorer(panneau):
+        @functools.wraps(panneau)
+        def panneau_instrumente(*args, **kwargs):
+            if not DIAGNOSTIC:
+                return panneau(*args, **kwargs)
+            with traces.execution(f"section.{nom}", collecter=conserver_trace):
+                return panneau(*args, **kwargs)
+        return panneau_instrumente
+    return decorer
+
+
+# Diagnostic (spans par exécution, panneau latéral) : variable TRACES_ACTIVES ou paramètre d'URL ?diagnostic=1
+if "diagnostic" in st.query_params:
+    st.session_state["diagnostic"] = st.query_params["diagnostic"] == "1"
+DIAGNOSTIC = st.session_state.get("diagnostic", traces.ACTIVES_PAR_DEFAUT)
+if DIAGNOSTIC:
+    # Une exécution interrompue (st.rerun, st.stop) n'atteint pas la fin du script : sa trace est close ici
+    trace_interrompue = st.session_state.pop("trace_en_cours", None)
+    if trace_interrompue is not None and traces.terminer(trace_interrompue) is not None:
+        conserver_trace(trace_interrompue)
+    st.session_state["trace_en_cours"] = traces.demarrer("rerun")
+
+
+def parametres_climatiseur():
+    # Caractéristiques du climatiseur renseignées en section 1 (lues au moment du calcul)
+    return {
+        "consommation_kw": st.session_state.get("ac_conso", 1.0) or 1.0,
+        "est_inverter": st.session_state.get("ac_inverter", True),
+    }
+
+
+serveur_metriques()
 
 # Titre de l'application
 st.title("Simulation de consommation énergétique d'un climatiseur (7 jours)")
@@ -40,103 +123,89 @@ st.title("Simulation de consommation énergétique d'un climatiseur (7 jours)")
 # Section 1: Caractéristiques du climatiseur (IA DeepSeek ou saisie manuelle)
 st.header("1. Données du climatiseur (via IA DeepSeek ou saisie manuelle)")
 
-# Champ de texte pour entrer le modèle du climatiseur
-modele = st.text_input("Modèle du climatiseur :", value="", 
-                       help="Entrez la référence exacte du climatiseur (ex: Marque Modèle 1234)")
-
-# Bouton pour interroger l'API DeepSeek avec le modèle saisi
-deepseek_result = None
-if st.button("Obtenir les données techniques via l'IA DeepSeek"):
-    if DEEPSEEK_API_KEY:
-        # Configuration de l'API DeepSeek (compatible OpenAI)
-        import openai
-        openai.api_base = "https://api.deepseek.com/v1"
-        openai.api_key = DEEPSEEK_API_KEY
-        # Préparation de la requête (on demande consommation, puissance frigorifique, type inverter)
-        prompt = (f"Fournis les caractéristiques techniques du climatiseur {modele} : "
-                  f"consommation électrique (en kW), puissance frigorifique (en kW) et préciser s'il s'agit d'un modèle inverter ou non.")
-        try:
-            response = openai.ChatCompletion.create(
-                model="deepseek-chat",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.2
-            )
-            deepseek_text = response["choices"][0]["message"]["content"]
-            # Extraction des données depuis la réponse texte de l'IA
-            import re
-            conso_val = None
-            froid_val = None
-            inverter_val = None
-            # Rechercher un nombre pour la consommation électrique (kW)
-            match_conso = re.search(r'consommation.*?([\d\.]+)\s*kW', deepseek_text, re.IGNORECASE)
-            if match_conso:
-                conso_val = float(match_conso.group(1))
-            # Rechercher puissance frigorifique en kW ou en BTU (convertir BTU -> kW si trouvé)
-            match_froid = re.search(r'puissance frigorifique.*?([\d\.]+)\s*kW', deepseek_text, re.IGNORECASE)
-            if match_froid:
-                froid_val = float(match_froid.group(1))
-            else:
-                match_froid_btu = re.search(r'puissance frigorifique.*?([\d,]+)\s*BTU', deepseek_text, re.IGNORECASE)
-                if match_froid_btu:
-                    try:
-                        btu_val = float(match_froid_btu.group(1).replace(',', ''))
-                        # Conversion BTU/h vers kW (1 BTU/h ≈ 0.00029307107 kW)
-                        froid_val = round(btu_val * 0.00029307107, 2)
-                    except:
-                        froid_val = None
-            # Rechercher mention de "inverter" ou "non-inverter"
-            if re.search(r'inverter', deepseek_text, re.IGNORECASE):
-                if re.search(r'non inverter', deepseek_text, re.IGNORECASE) or re.search(r"pas inverter", deepseek_text, re.IGNORECASE):
-                    inverter_val = False
-                else:
-                    inverter_val = True
-            # Stocker les résultats dans l'état de session pour réutilisation
+
+@st.fragment
+@instrumenter("climatiseur")
+def panneau_climatiseur():
+    # Champ de texte pour entrer le modèle du climatiseur
+    modele = st.text_input("Modèle du climatiseur :", value="",
+                           help="Entrez la référence exacte du climatiseur (ex: Marque Modèle 1234)")
+
+    # Bouton pour interroger le catalogue local puis, à défaut, l'API DeepSeek avec le modèle saisi
+    deepseek_result = None
+    if st.button("Obtenir les données techniques via l'IA DeepSeek"):
+        # Recherche d'abord dans le catalogue local (correspondance exacte ou approchée)
+        with traces.span("catalogue.recherche") as s:
+            fiche = catalogue_climatiseurs().rechercher(modele)
+            s["trouve"] = fiche is not None
+        if fiche:
             st.session_state["ac_modele"] = modele
-            st.session_state["ac_conso"] = conso_val
-            st.session_state["ac_froid"] = froid_val
-            st.session_state["ac_inverter"] = inverter_val
-            # Vérifier si on a bien obtenu toutes les infos
-            if conso_val and froid_val and inverter_val is not None:
-                st.session_state["ac_data_ok"] = True
-            else:
+            st.session_state["ac_conso"] = fiche["consommation_kw"]
+            st.session_state["ac_froid"] = fiche["puissance_frigorifique_kw"]
+            st.session_state["ac_inverter"] = fiche["inverter"]
+            st.session_state["ac_data_ok"] = True
+            st.info(f"Données trouvées dans le catalogue local ({fiche['modele']}, "
+                    f"similarité {fiche['similarite']:.0%}).")
+        elif client_deepseek() is not None:
+            # Préparation de la requête (on demande consommation, puissance frigorifique, type inverter)
+            prompt = (f"Fournis les caractéristiques techniques du climatiseur {modele} : "
+                      f"consommation électrique (en kW), puissance frigorifique (en kW) et préciser s'il s'agit d'un modèle inverter ou non.")
+            try:
+                response = client_deepseek().completer(
+                    model="deepseek-chat",
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=0.2
+                )
+                deepseek_text = response["choices"][0]["message"]["content"]
+                # Extraction des données depuis la réponse texte de l'IA
+                conso_val, froid_val, inverter_val = extraire_caracteristiques(deepseek_text)
+                # Stocker les résultats dans l'état de session pour réutilisation
+                st.session_state["ac_modele"] = modele
+                st.session_state["ac_conso"] = conso_val
+                st.session_state["ac_froid"] = froid_val
+                st.session_state["ac_inverter"] = inverter_val
+                # Vérifier si on a bien obtenu toutes les infos
+                if conso_val and froid_val and inverter_val is not None:
+                    st.session_state["ac_data_ok"] = True
+                    # Les résultats valides enrichissent le catalogue pour les prochaines recherches
+                    catalogue_climatiseurs().ajouter(modele, conso_val, froid_val, inverter_val)
+                else:
+                    st.session_state["ac_data_ok"] = False
+            except Exception as e:
+                st.error("Échec de la récupération via l'API DeepSeek.")
                 st.session_state["ac_data_ok"] = False
-        except Exception as e:
-            st.error("Échec de la récupération via l'API DeepSeek.")
+        else:
+            st.warning("Clé API DeepSeek non configurée. Veuillez entrer les données manuellement.")
             st.session_state["ac_data_ok"] = False
-    else:
-        st.warning("Clé API DeepSeek non configurée. Veuillez entrer les données manuellement.")
-        st.session_state["ac_data_ok"] = False
-
-# Formulaire de secours pour entrer manuellement les données du climatiseur si DeepSeek a échoué ou n'a pas fourni toutes les infos
-if not st.session_state.get("ac_data_ok", False):
-    st.write("**Veuillez renseigner manuellement les caractéristiques du climatiseur :**")
-    # Valeurs par défaut (éventuellement pré-remplies par ce qui a pu être partiellement extrait via l'IA)
-    conso_def = st.session_state.get("ac_conso", 1.0) or 1.0  # kW (1.0 par défaut)
-    froid_def = st.session_state.get("ac_froid", 2.0) or 2.0  # kW (2.0 par défaut)
-    inverter_def = st.session_state.get("ac_inverter", True)
-    # Champs de saisie manuelle
-    consommation_kw = st.number_input("Consommation électrique du climatiseur (kW) :", min_value=0.1, max_value=10.0, value=conso_def, step=0.1)
-    puissance_frigo_kw = st.number_input("Puissance frigorifique (kW) :", min_value=0.1, max_value=20.0, value=froid_def, step=0.1)
-    type_inverter = st.selectbox("Technologie :", options=["Inverter", "Non-inverter"], index=(0 if inverter_def else 1))
-    est_inverter = (type_inverter == "Inverter")
-    # On stocke ces valeurs saisies manuellement également
-    st.session_state["ac_modele"] = modele or "Modèle inconnu"
-    st.session_state["ac_conso"] = consommation_kw
-    st.session_state["ac_froid"] = puissance_frigo_kw
-    st.session_state["ac_inverter"] = est_inverter
-    st.session_state["ac_data_ok"] = True
-else:
-    # Si DeepSeek a réussi à obtenir les données, on les récupère de l'état
-    consommation_kw = st.session_state.get("ac_conso", 1.0) or 1.0
-    puissance_frigo_kw = st.session_state.get("ac_froid", 2.0) or 2.0
-    est_inverter = st.session_state.get("ac_inverter", True)
+
+    # Formulaire de secours pour entrer manuellement les données du climatiseur si DeepSeek a échoué ou n'a pas fourni toutes les infos
+    if not st.session_state.get("ac_data_ok", False):
+        st.write("**Veuillez renseigner manuellement les caractéristiques du climatiseur :**")
+        # Valeurs par défaut (éventuellement pré-remplies par ce qui a pu être partiellement extrait via l'IA)
+        conso_def = st.session_state.get("ac_conso", 1.0) or 1.0  # kW (1.0 par défaut)
+        froid_def = st.session_state.get("ac_froid", 2.0) or 2.0  # kW (2.0 par défaut)
+        inverter_def = st.session_state.get("ac_inverter", True)
+        # Champs de saisie manuelle
+        consommation_kw = st.number_input("Consommation électrique du climatiseur (kW) :", min_value=0.1, max_value=10.0, value=conso_def, step=0.1)
+        puissance_frigo_kw = st.number_input("Puissance frigorifique (kW) :", min_value=0.1, max_value=20.0, value=froid_def, step=0.1)
+        type_inverter = st.selectbox("Technologie :", options=["Inverter", "Non-inverter"], index=(0 if inverter_def else 1))
+        est_inverter = (type_inverter == "Inverter")
+        # On stocke ces valeurs saisies manuellement également
+        st.session_state["ac_modele"] = modele or "Modèle inconnu"
+        st.session_state["ac_conso"] = consommation_kw
+        st.session_state["ac_froid"] = puissance_frigo_kw
+        st.session_state["ac_inverter"] = est_inverter
+        st.session_state["ac_data_ok"] = True
+
+
+panneau_climatiseur()
 
 # Champs supplémentaires liés au climatiseur
 # Âge du climatiseur (années) et fréquence d'entretien
-age = st.number_input("Âge du climatiseur (en années) :", min_value=0, max_value=50, value=5, step=1, 
+age = st.number_input("Âge du climatiseur (en années) :", min_value=0, max_value=50, value=5, step=1,
                       help="Âge approximatif du climatiseur en années")
-frequence_entretien = st.selectbox("Fréquence d'entretien :", 
-                                   options=["Annuel", "Tous les 2 ans", "Plus rare (> 2 ans)"], 
+frequence_entretien = st.selectbox("Fréquence d'entretien :",
+                                   options=["Annuel", "Tous les 2 ans", "Plus rare (> 2 ans)"],
                                    index=0, help="Fréquence à laquelle le climatiseur est entretenu (nettoyage des filtres, révision, etc.)")
 # Section 2: Paramètres d'utilisation et conditions météo
 st.header("2. Paramètres d'utilisation et conditions météo")
@@ -147,7 +216,7 @@ ville_index_defaut = liste_villes.index("Tlemcen") if "Tlemcen" in liste_villes
 ville_choisie = st.selectbox("Ville :", options=liste_villes, index=ville_index_defaut)
 
 # Paramètres d'utilisation de la climatisation
-heures_utilisation = st.number_input("Nombre d'heures d'utilisation quotidienne :", 
+heures_utilisation = st.number_input("Nombre d'heures d'utilisation quotidienne :",
                                      min_value=1, max_value=24, value=8, step=1)
 surface = st.number_input("Surface de la pièce (en m²) :", min_value=5, max_value=500, value=20, step=1)
 hauteur = st.number_input("Hauteur sous plafond (en m) :", min_value=2.0, max_value=5.0, value=2.5, step=0.1)
@@ -155,550 +224,907 @@ type_piece = st.selectbox("Type de pièce :", options=["Salon/Séjour", "Chambre
 presence_appareils = st.selectbox("Appareils électriques générant de la chaleur :", options=["Aucun", "Oui, quelques-uns", "Oui, plusieurs"], index=0)
 type_vitrage = st.selectbox("Type de vitrage des fenêtres :", options=["Double vitrage", "Simple vitrage"], index=0)
 orientation = st.selectbox("Orientation principale de la pièce :", options=["Nord", "Est", "Sud", "Ouest"], index=2)
-nbr_personnes = st.number_input("Nombre de personnes habituellement présentes dans la pièce :", 
+nbr_personnes = st.number_input("Nombre de personnes habituellement présentes dans la pièce :",
                                 min_value=0, max_value=20, value=1, step=1)
-temp_confort = st.number_input("Température de confort souhaitée (°C) :", 
+temp_confort = st.number_input("Température de confort souhaitée (°C) :",
                                min_value=16, max_value=30, value=24, step=1)
 
-# Choix de la source des données météo (API ou saisie manuelle)
-choix_source_meteo = st.radio("Source des données météo sur 7 jours :", 
-                              options=["Données en ligne (OpenWeatherMap/Tameteo)", "Saisie manuelle"], index=0)
-
-# Préparation des structures pour stocker les prévisions sur 7 jours (températures et humidité)
-previsions_jours = []  # liste de dict pour 7 jours: {"Date":..., "Température (°C)":..., "Humidité (%)": ...}
-
-# Si l'utilisateur choisit les données en ligne, on tente l'API OpenWeatherMap puis Tameteo en secours
-if choix_source_meteo == "Données en ligne (OpenWeatherMap/Tameteo)":
-    lat, lon = VILLES[ville_choisie]
-    if OWM_API_KEY:
-        # Appel de l'API OpenWeatherMap pour obtenir la météo actuelle et les prévisions quotidiennes
-        try:
-            # Météo actuelle
-            url_current = (f"http://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lon}"
-                           f"&units=metric&lang=fr&appid={OWM_API_KEY}")
-            res_current = requests.get(url_current)
-            data_current = res_current.json() if res_current.status_code == 200 else {}
-            # Prévisions quotidiennes sur 7 jours (OneCall API)
-            url_onecall = (f"http://api.openweathermap.org/data/2.5/onecall?lat={lat}&lon={lon}"
-                           f"&exclude=minutely,hourly,alerts&units=metric&lang=fr&appid={OWM_API_KEY}")
-            res_onecall = requests.get(url_onecall)
-            data_onecall = res_onecall.json() if res_onecall.status_code == 200 else {}
-        except Exception as e:
-            st.error("Échec de la récupération des données météo via OpenWeatherMap.")
-            data_current = {}
-            data_onecall = {}
-
-        # Traiter les données actuelles (affichage informatif)
-        if data_current.get("weather"):
-            desc = data_current["weather"][0]["description"].capitalize()
-            temp_now = data_current["main"]["temp"]
-            humid_now = data_current["main"].get("humidity")
-            meteo_actuelle = f"{desc}, {temp_now:.1f} °C"
-            if humid_now is not None:
-                meteo_actuelle += f", Humidité {humid_now}%"
-            st.write(f"**Météo actuelle à {ville_choisie} :** {meteo_actuelle}")
-        else:
-            st.write("Météo actuelle non disponible.")
+# Paramètres de la pièce et de l'utilisation, transmis aux panneaux de calcul
+parametres_piece = {
+    "age": age,
+    "frequence_entretien": frequence_entretien,
+    "heures_utilisation": min(int(heures_utilisation), 24),
+    "hauteur": hauteur,
+    "type_vitrage": type_vitrage,
+    "orientation": orientation,
+    "presence_appareils": presence_appareils,
+    "nbr_personnes": nbr_personnes,
+    "temp_confort": temp_confort,
+    "isolation": st.session_state.get("isolation", "Moyenne"),
+}
+# Description de la pièce pour les prompts de l'IA
+contexte_piece = {"ville": ville_choisie, "type_piece": type_piece, "surface": surface}
+
+
+@st.fragment
+@instrumenter("meteo")
+def panneau_meteo(ville_choisie):
+    # Choix de la source des données météo (API ou saisie manuelle)
+    choix_source_meteo = st.radio("Source des données météo sur 7 jours :",
+                                  options=["Données en ligne (OpenWeatherMap/Tameteo)",
+                                           "Normales climatiques (hors ligne)", "Saisie manuelle"], index=0)
+
+    # Préparation des structures pour stocker les prévisions sur 7 jours (températures et humidité)
+    previsions_jours = []  # liste de dict pour 7 jours: {"Date":..., "Température (°C)":..., "Humidité (%)": ...}
 
-        # Récupération des prévisions sur 7 jours à partir des données OneCall
-        if data_onecall.get("daily"):
+    # Si l'utilisateur choisit les données en ligne, on tente l'API OpenWeatherMap puis Tameteo en secours
+    if choix_source_meteo == "Données en ligne (OpenWeatherMap/Tameteo)":
+        lat, lon = VILLES[ville_choisie]
+        if OWM_API_KEY:
+            # Météo actuelle et prévisions OpenWeatherMap demandées en parallèle (via le cache partagé),
+            # Tameteo relancé en concurrence si les prévisions tardent ou échouent (cf. meteo.py)
+            meteo_en_ligne = recuperer_meteo(ville_choisie, lat, lon, OWM_API_KEY, cache=cache_meteo(),
+                                             ttl_actuelle=TTL_METEO_ACTUELLE)
+            data_current = meteo_en_ligne["actuelle"]
+
+            # Traiter les données actuelles (affichage informatif)
+            if data_current.get("weather"):
+                desc = data_current["weather"][0]["description"].capitalize()
+                temp_now = data_current["main"]["temp"]
+                humid_now = data_current["main"].get("humidity")
+                meteo_actuelle = f"{desc}, {temp_now:.1f} °C"
+                if humid_now is not None:
+                    meteo_actuelle += f", Humidité {humid_now}%"
+                st.write(f"**Météo actuelle à {ville_choisie} :** {meteo_actuelle}")
+            else:
+                st.write("Météo actuelle non disponible.")
+
+            # Prévisions sur 7 jours : la première source valide (OpenWeatherMap ou Tameteo)
+            previsions_jours = meteo_en_ligne["previsions"]
+            if not previsions_jours:
+                if "owm" in meteo_en_ligne["erreurs"]:
+                    st.error("Échec de la récupération des données météo via OpenWeatherMap.")
+                if url_tameteo(ville_choisie) is None:
+                    st.error("Ville non prise en charge pour les prévisions Tameteo.")
+                else:
+                    st.error("Échec de la récupération des prévisions via Tameteo.")
+        else:
+            st.warning("Clé API OpenWeatherMap non fournie.")
+        if not previsions_jours:
+            # Repli hors ligne : normales climatiques de la ville pour les 7 prochains jours
+            previsions_jours = previsions_normales(ville_choisie)
+            st.info("Prévisions remplacées par les normales climatiques de la ville (hors ligne).")
+    # Normales climatiques embarquées (aucun appel réseau)
+    if choix_source_meteo == "Normales climatiques (hors ligne)":
+        previsions_jours = previsions_normales(ville_choisie)
+    # Si l'utilisateur choisit de saisir manuellement la météo sur 7 jours
+    if choix_source_meteo == "Saisie manuelle":
+        st.write("**Entrez les prévisions météo manuellement pour les 7 prochains jours :**")
+        # Suggestion : date de début = aujourd'hui
+        date_debut = datetime.date.today()
+        manuel_data = []
+        # Formulaire sous forme de colonnes pour chaque jour
+        for i in range(7):
+            jour_date = date_debut + datetime.timedelta(days=i)
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.write(jour_date.strftime("%A %d %b").capitalize())  # ex: "Vendredi 28 Mar"
+            with col2:
+                t = st.number_input(f"Temp. Jour {i+1} (°C)", value=25.0, key=f"temp_manuel_{i}")
+            with col3:
+                h = st.number_input(f"Humidité Jour {i+1} (%)", min_value=0, max_value=100, value=50, key=f"hum_manuel_{i}")
+            manuel_data.append((t, h))
+        # Proposition d'import d'un fichier Excel pour remplir ces données
+        modele_csv = "Jour,Température (°C),Humidité (%)\n" + "".join(f"Jour {j+1},25.0,50\n" for j in range(7))
+        # Permettre à l'utilisateur de télécharger un modèle d'Excel
+        st.download_button("Télécharger un modèle Excel", data=modele_csv.encode('utf-8'),
+                           file_name="modele_meteo7j.csv", mime="text/csv")
+        fichier_excel = st.file_uploader("Ou importez un fichier Excel (.xlsx) avec 7 jours de données météo :", type=["xlsx"])
+        if fichier_excel:
             try:
-                for i, day in enumerate(data_onecall["daily"][:7]):  # limiter à 7 jours
-                    # date du jour
-                    dt_ts = day.get("dt", None)
-                    if dt_ts:
-                        # Conversion timestamp en date locale
-                        date_locale = datetime.datetime.fromtimestamp(dt_ts)
-                        date_str = date_locale.strftime("%d %b")  # ex: "28 Mar"
-                    else:
-                        date_str = f"Jour {i+1}"
-                    # Température moyenne ou max du jour
-                    # On peut prendre la température max et min du jour
-                    temp_min = day.get("temp", {}).get("min")
-                    temp_max = day.get("temp", {}).get("max")
-                    if temp_min is not None and temp_max is not None:
-                        # On utilise la moyenne (ou on pourrait garder min et max séparés)
-                        temp_val = (temp_min + temp_max) / 2.0
-                    else:
-                        temp_val = day.get("temp", {}).get("day", None) or day.get("temp", None)
-                    # Humidité relative moyenne du jour
-                    humid_val = day.get("humidity", None)
-                    previsions_jours.append({
-                        "Date": date_str,
-                        "Température (°C)": f"{temp_val:.1f}" if temp_val is not None else "",
-                        "Humidité (%)": f"{humid_val:.0f}" if humid_val is not None else ""
-                    })
+                import pandas as pd
+                # Lire les 7 premières lignes du fichier Excel (on suppose qu'il contient au moins deux colonnes:
+                # Température, Humidité)
+                xl = pd.read_excel(fichier_excel, nrows=7)
+                for i in range(min(7, len(xl))):
+                    temp_val = xl.iloc[i][1] if xl.shape[1] > 1 else None
+                    hum_val = xl.iloc[i][2] if xl.shape[1] > 2 else None
+                    if pd.notna(temp_val):
+                        manuel_data[i] = (float(temp_val), manuel_data[i][1])
+                    if pd.notna(hum_val):
+                        manuel_data[i] = (manuel_data[i][0], int(hum_val))
             except Exception as e:
-                previsions_jours = []
-        else:
-            # Si l'API OneCall n'a pas fonctionné, on tentera Tameteo
-            previsions_jours = []
+                st.error("Échec de la lecture du fichier Excel. Veuillez vérifier le format.")
+        # Remplir previsions_jours à partir des données manuelles (manuel_data)
+        for i, (t, h) in enumerate(manuel_data):
+            date_label = (date_debut + datetime.timedelta(days=i)).strftime("%d %b")
+            previsions_jours.append({
+                "Date": date_label,
+                "Température (°C)": f"{t:.1f}",
+                "Humidité (%)": f"{h:.0f}"
+            })
+    # Prévisions retenues, lues par les panneaux de simulation
+    st.session_state["previsions_jours"] = previsions_jours
 
-        # Si OpenWeatherMap a échoué à fournir les prévisions, on passe au plan B (Tameteo)
-        if not previsions_jours:
-            # Dictionnaire de correspondance ville -> ID Tameteo connu (extrait manuellement)
-            tameteo_ids = {
-                "Adrar": 8861,
-                "Alger": 8842,
-                "Annaba": 8849,
-                "Batna": 8853,
-                "Béchar": 8860,
-                "Béjaïa": 8840,
-                "Biskra": 8862,
-                "Constantine": 8850,
-                "Oran": 8859,
-                "Tlemcen": 8858
-            }
-            tameteo_id = tameteo_ids.get(ville_choisie)
-            if tameteo_id:
-                tameteo_url = (f"https://www.tameteo.com/meteo_{ville_choisie.replace(' ', '+')}"
-                               f"-Afrique-Algerie-Provincia+de+{ville_choisie.replace(' ', '+')}-1-{tameteo_id}.html")
-                try:
-                    res_tameteo = requests.get(tameteo_url)
-                    res_tameteo.encoding = 'utf-8'
-                    html = res_tameteo.text
-                    # Extraire les 7 premiers jours (ligne commençant par "* " suivi du nom du jour)
-                    # On cherche des motifs du type "Aujourd'hui", "Demain", ou les noms de jours avec température
-                    days_data = []
-                    for line in html.splitlines():
-                        # Normaliser les espaces insécables et accents
-                        segment = line.strip().replace("´", "'")
-                        # Identifier les lignes de prévision journalière (commencent par une puce "* ")
-                        if segment.startswith("* Aujourd'") or segment.startswith("* Demain") or segment.startswith("* Lundi") or segment.startswith("* Mardi") or segment.startswith("* Mercredi") or segment.startswith("* Jeudi") or segment.startswith("* Vendredi") or segment.startswith("* Samedi") or segment.startswith("* Dimanche"):
-                            days_data.append(segment)
-                        if len(days_data) >= 7:
-                            break
-                    # Parser chaque entrée pour en extraire temp max/min et (humidité non fournie, on mettra une valeur par défaut)
-                    for entry in days_data[:7]:
-                        # Exemple de segment : "* Aujourd'hui 28 Mars ... 18° / 7° ... 15 - 37 km/h"
-                        parts = entry.split()
-                        # Trouver les parties contenant "°" pour les températures
-                        temps = [p for p in parts if "°" in p and "/" in p]
-                        # Extraire temp max et min si possible
-                        if temps:
-                            # ex: "18°" et "7°" entourés de "/"
-                            try:
-                                max_temp = float(temps[0].replace("°", "").replace(",", "."))
-                            except:
-                                max_temp = None
-                            try:
-                                min_temp = float(temps[2].replace("°", "").replace(",", ".")) if len(temps) > 2 else None
-                            except:
-                                min_temp = None
-                        else:
-                            max_temp = min_temp = None
-                        # Moyenne simple des deux si disponibles, sinon max_temp ou None
-                        if max_temp is not None and min_temp is not None:
-                            avg_temp = (max_temp + min_temp) / 2.0
-                        else:
-                            avg_temp = max_temp or min_temp
-                        # Utiliser une humidité par défaut (50%) car tameteo ne la fournit pas directement dans ce résumé
-                        avg_humid = 50
-                        # Récupérer le nom du jour et la date pour affichage
-                        # On prend les deux ou trois premiers mots (ex: "* Aujourd'hui 28 Mars" -> "Aujourd'hui 28 Mar")
-                        jour_str = " ".join(parts[1:4]) if parts[0] == "*" else " ".join(parts[0:3])
-                        previsions_jours.append({
-                            "Date": jour_str.strip("* "),
-                            "Température (°C)": f"{avg_temp:.1f}" if avg_temp is not None else "",
-                            "Humidité (%)": f"{avg_humid:.0f}"
-                        })
-                except Exception as e:
-                    st.error("Échec de la récupération des prévisions via Tameteo.")
-            else:
-                st.error("Ville non prise en charge pour les prévisions Tameteo.")
+    # Afficher un tableau récapitulatif des prévisions météo sur 7 jours utilisées
+    if previsions_jours:
+        st.subheader(f"Prévisions météo sur 7 jours - {ville_choisie}")
+        st.table(previsions_jours)
     else:
-        st.warning("Clé API OpenWeatherMap non fournie. Veuillez saisir la météo manuellement.")
-# Si l'utilisateur choisit de saisir manuellement la météo sur 7 jours
-if choix_source_meteo == "Saisie manuelle":
-    st.write("**Entrez les prévisions météo manuellement pour les 7 prochains jours :**")
-    # Suggestion : date de début = aujourd'hui
-    date_debut = datetime.date.today()
-    manuel_data = []
-    # Formulaire sous forme de colonnes pour chaque jour
-    for i in range(7):
-        jour_date = date_debut + datetime.timedelta(days=i)
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            st.write(jour_date.strftime("%A %d %b").capitalize())  # ex: "Vendredi 28 Mar"
-        with col2:
-            t = st.number_input(f"Temp. Jour {i+1} (°C)", value=25.0, key=f"temp_manuel_{i}")
-        with col3:
-            h = st.number_input(f"Humidité Jour {i+1} (%)", min_value=0, max_value=100, value=50, key=f"hum_manuel_{i}")
-        manuel_data.append((t, h))
-    # Proposition d'import d'un fichier Excel pour remplir ces données
-    modele_xlsx = pd.DataFrame({
-        "Jour": [f"Jour {j+1}" for j in range(7)],
-        "Température (°C)": [25.0]*7,
-        "Humidité (%)": [50]*7
-    })
-    # Permettre à l'utilisateur de télécharger un modèle d'Excel
-    st.download_button("Télécharger un modèle Excel", data=modele_xlsx.to_csv(index=False).encode('utf-8'),
-                       file_name="modele_meteo7j.csv", mime="text/csv")
-    fichier_excel = st.file_uploader("Ou importez un fichier Excel (.xlsx) avec 7 jours de données météo :", type=["xlsx"])
-    if fichier_excel:
-        try:
-            # Lire le fichier Excel (on suppose qu'il contient au moins deux colonnes: Température, Humidité)
-            xl = pd.read_excel(fichier_excel)
-            for i in range(min(7, len(xl))):
-                temp_val = xl.iloc[i][1] if xl.shape[1] > 1 else None
-                hum_val = xl.iloc[i][2] if xl.shape[1] > 2 else None
-                if pd.notna(temp_val):
-                    manuel_data[i] = (float(temp_val), manuel_data[i][1])
-                if pd.notna(hum_val):
-                    manuel_data[i] = (manuel_data[i][0], int(hum_val))
-        except Exception as e:
-            st.error("Échec de la lecture du fichier Excel. Veuillez vérifier le format.")
-    # Remplir previsions_jours à partir des données manuelles (manuel_data)
-    for i, (t, h) in enumerate(manuel_data):
-        date_label = (date_debut + datetime.timedelta(days=i)).strftime("%d %b")
-        previsions_jours.append({
-            "Date": date_label,
-            "Température (°C)": f"{t:.1f}",
-            "Humidité (%)": f"{h:.0f}"
-        })
+        st.error("Aucune donnée météo disponible. Des valeurs par défaut seront utilisées pour la simulation.")
+
+
+panneau_meteo(ville_choisie)
 
-# Afficher un tableau récapitulatif des prévisions météo sur 7 jours utilisées
-if previsions_jours:
-    st.subheader(f"Prévisions météo sur 7 jours - {ville_choisie}")
-    st.table(previsions_jours)
-else:
-    st.error("Aucune donnée météo disponible. Des valeurs par défaut seront utilisées pour la simulation.")
 # Section 3: Simulation de la consommation sur 7 jours (Scénario normal vs optimisé)
 st.header("3. Simulation de la consommation : Scénario normal vs optimisé")
 
-# Bouton pour lancer la simulation
-if st.button("Lancer la simulation"):
-    # Vérification que les caractéristiques du climatiseur sont bien renseignées
-    if not st.session_state.get("ac_data_ok", False):
-        st.error("Veuillez d'abord renseigner les caractéristiques du climatiseur en section 1.")
+
+def afficher_resultats_simulation(resultats_sim):
+    from graphiques import bandes_quotidiennes, donnees_quotidiennes, graphique_quotidien, profil_horaire
+
+    consommation_journaliere_normale = resultats_sim["journaliere_normale"]
+    consommation_journaliere_optimisee = resultats_sim["journaliere_optimisee"]
+    # Une fois les 7 jours simulés, calculer les coûts et économies
+    couts_normaux = [kwh * TARIF_ELECTRICITE for kwh in consommation_journaliere_normale]
+    couts_optimises = [kwh * TARIF_ELECTRICITE for kwh in consommation_journaliere_optimisee]
+    jours = resultats_sim["jours"]
+
+    # Affichage des résultats chiffrés pour chaque jour
+    st.subheader("Résultats de la simulation sur 7 jours :")
+    if resultats_sim.get("historique_id") is not None:
+        st.caption(f"Résultats repris de l'historique (simulation n°{resultats_sim['historique_id']} du "
+                   f"{resultats_sim['historique_date']}), sans nouveau calcul.")
     else:
-        # Récupérer les données du climatiseur depuis l'état de session
-        consommation_kw = st.session_state.get("ac_conso", 1.0)  # puissance électrique (kW)
-        puissance_frigo_kw = st.session_state.get("ac_froid", 2.0)  # puissance frigorifique (kW)
-        est_inverter = st.session_state.get("ac_inverter", True)
-
-        # Préparation des résultats sur 7 jours
-        consommation_journaliere_normale = []
-        consommation_journaliere_optimisee = []
-
-        # On définit un profil d'utilisation horaire sur 24h en fonction du nombre d'heures d'utilisation
-        heures_totales = 24
-        # Nombre d'heures d'utilisation dans la journée (X)
-        X = int(heures_utilisation)
-        if X > heures_totales:
-            X = heures_totales
-        # Plage horaire d'utilisation (par défaut, on aligne sur le milieu de journée pour usage <=12h, ou toute la journée si >12h)
-        if X <= 12:
-            # On centre la plage d'utilisation autour de 15h (pic de chaleur vers milieu d'après-midi)
-            center = 15
-            start_hour = max(0, center - math.floor(X/2))
-            end_hour = start_hour + X - 1
-            if end_hour > 23:
-                end_hour = 23
-                start_hour = end_hour - X + 1
+        st.caption(f"{resultats_sim['jours_recalcules']} jour(s) recalculé(s), "
+                   "les autres repris de la simulation précédente.")
+    for j in range(len(consommation_journaliere_normale)):
+        st.write(f"**{jours[j]}** – Consommation normale : {consommation_journaliere_normale[j]:.1f} kWh "
+                 f"(coût {couts_normaux[j]:.0f} DZD), "
+                 f"optimisée : {consommation_journaliere_optimisee[j]:.1f} kWh "
+                 f"(coût {couts_optimises[j]:.0f} DZD)")
+    st.write(f"**Économies totales sur 7 jours** : {resultats_sim['economie_kwh']:.1f} kWh économisés, soit {resultats_sim['economie_pourcent']:.0f}% de moins qu'une utilisation normale, représentant environ {resultats_sim['economie_cout']:.0f} DZD.")
+    incertitude = resultats_sim.get("incertitude")
+    if incertitude:
+        bas, median, haut = (f"P{q}" for q in incertitude["quantiles"])
+        kwh, cout, pourcent = incertitude["economie_kwh"], incertitude["economie_cout"], incertitude["economie_pourcent"]
+        st.write(f"**Avec l'incertitude des prévisions** ({incertitude['nb_tirages']} variantes de la météo) : "
+                 f"économie de {kwh[1]:.1f} kWh ({median}), entre {kwh[0]:.1f} et {kwh[2]:.1f} kWh ({bas}-{haut}), "
+                 f"soit {cout[1]:.0f} DZD (entre {cout[0]:.0f} et {cout[2]:.0f} DZD) et "
+                 f"{pourcent[1]:.0f}% ({pourcent[0]:.0f}-{pourcent[2]:.0f}%).")
+        st.dataframe({
+            "Jour": jours,
+            f"Optimisée {bas} (kWh)": incertitude["journaliere_optimisee"][0],
+            f"Optimisée {median} (kWh)": incertitude["journaliere_optimisee"][1],
+            f"Optimisée {haut} (kWh)": incertitude["journaliere_optimisee"][2],
+            f"Économie {bas} (DZD)": [kwh * TARIF_ELECTRICITE for kwh in incertitude["economie_journaliere"][0]],
+            f"Économie {median} (DZD)": [kwh * TARIF_ELECTRICITE for kwh in incertitude["economie_journaliere"][1]],
+            f"Économie {haut} (DZD)": [kwh * TARIF_ELECTRICITE for kwh in incertitude["economie_journaliere"][2]],
+        }, hide_index=True)
+
+    # Graphique 1 : Profil horaire de consommation du jour choisi
+    st.subheader("Profil horaire de consommation")
+    if consommation_journaliere_normale:
+        jour_profil = st.selectbox("Jour du profil horaire :", range(len(consommation_journaliere_normale)),
+                                   format_func=lambda j: jours[j])
+        df_horaire = profil_horaire(resultats_sim["horaire_normale"][jour_profil],
+                                    resultats_sim["horaire_optimisee"][jour_profil])
+        st.line_chart(df_horaire)
+    else:
+        st.write("Aucune donnée horaire à afficher.")
+
+    # Graphique 2 : Comparaison de la consommation quotidienne sur les 7 jours
+    st.subheader("Consommation quotidienne sur 7 jours")
+    if incertitude:
+        st.caption(f"Barres d'erreur : fourchette {bas}-{haut} de la consommation optimisée.")
+    # Deux entrées par jour (normal et optimisé) pour un graphique Altair en barres groupées
+    with traces.span("graphique.quotidien"):
+        df_chart = donnees_quotidiennes(jours, consommation_journaliere_normale, consommation_journaliere_optimisee)
+        # Mode incertitude : bande P10-P90 de la consommation optimisée
+        df_bandes = (bandes_quotidiennes(jours, incertitude["journaliere_optimisee"][0],
+                                         incertitude["journaliere_optimisee"][2]) if incertitude else None)
+        graphique = graphique_quotidien(df_chart, df_bandes)
+    st.altair_chart(graphique, use_container_width=True)
+
+
+def resultats_session(resultats, jours, heures_utilisation, jours_recalcules=0, incertitude=None, execution=None,
+                      parametres=None, contexte=None):
+    # Résultats conservés pour l'affichage et les sections 4 et 5 (qui s'exécutent aussi lors des reruns suivants),
+    # calculés ou repris de l'historique (``execution``), avec les entrées qui les ont produits : les prompts de l'IA
+    # décrivent ces entrées, pas les widgets actuels (une exécution rechargée peut venir d'une autre configuration)
+    if execution is not None:
+        parametres = execution["parametres"] if parametres is None else parametres
+        contexte = {"ville": execution["ville"]} if contexte is None else contexte
+    journaliere_normale = resultats["journaliere_normale"].tolist()
+    journaliere_optimisee = resultats["journaliere_optimisee"].tolist()
+    total_kwh_normal_sem, total_kwh_optimise_sem = sum(journaliere_normale), sum(journaliere_optimisee)
+    economie_kwh_total = total_kwh_normal_sem - total_kwh_optimise_sem
+    return {
+        "heures_utilisation": heures_utilisation,
+        "journaliere_normale": journaliere_normale,
+        "journaliere_optimisee": journaliere_optimisee,
+        # Profils horaires de chaque jour (graphique 1, jour au choix)
+        "horaire_normale": resultats["horaire_normale"].tolist(),
+        "horaire_optimisee": resultats["horaire_optimisee"].tolist(),
+        "jours": jours,
+        "jours_recalcules": jours_recalcules,
+        "economie_kwh": economie_kwh_total,
+        "economie_pourcent": (economie_kwh_total / total_kwh_normal_sem * 100) if total_kwh_normal_sem > 0 else 0.0,
+        "economie_cout": economie_kwh_total * TARIF_ELECTRICITE,
+        # Quantiles Monte Carlo (mode incertitude), None sinon
+        "incertitude": incertitude,
+        "historique_id": execution["id"] if execution else None,
+        "historique_date": execution["date_simulation"] if execution else None,
+        "parametres": dict(parametres or {}),
+        "contexte": dict(contexte or {}),
+    }
+
+
+def description_simulation(resultats_sim):
+    # Couples (libellé, valeur) des entrées de la simulation conservée, pour les prompts de l'IA ;
+    # les entrées absentes (ex. pièce d'une exécution rechargée de l'historique) sont omises
+    parametres = resultats_sim.get("parametres", {})
+    contexte = resultats_sim.get("contexte", {})
+
+    def unite(valeur, suffixe):
+        return None if valeur is None else f"{valeur}{suffixe}"
+
+    inverter = parametres.get("est_inverter")
+    champs = [
+        ("Modèle du climatiseur", contexte.get("modele")),
+        ("Inverter", None if inverter is None else ("oui" if inverter else "non")),
+        ("Puissance frigorifique", unite(contexte.get("froid"), " kW")),
+        ("Consommation électrique", unite(parametres.get("consommation_kw"), " kW")),
+        ("Âge du climatiseur", unite(parametres.get("age"), " ans")),
+        ("Entretien", parametres.get("frequence_entretien")),
+        ("Ville", contexte.get("ville")),
+        ("Type de pièce", contexte.get("type_piece")),
+        ("Surface", unite(contexte.get("surface"), " m²")),
+        ("Hauteur", unite(parametres.get("hauteur"), " m")),
+        ("Isolation", parametres.get("isolation")),
+        ("Vitrage", parametres.get("type_vitrage")),
+        ("Orientation", parametres.get("orientation")),
+        ("Appareils supplémentaires", parametres.get("presence_appareils")),
+        ("Nombre de personnes", parametres.get("nbr_personnes")),
+        ("Température de confort", unite(parametres.get("temp_confort"), " °C")),
+        ("Heures d'utilisation par jour", unite(resultats_sim["heures_utilisation"], " h")),
+    ]
+    return [(libelle, valeur) for libelle, valeur in champs if valeur is not None]
+
+
+def publier_resultats(resultats_sim):
+    st.session_state["resultats_simulation"] = resultats_sim
+    # Marquer que la simulation a été effectuée, pour débloquer le chat IA
+    st.session_state["simulation_effectuee"] = True
+    # Réinitialiser l'autorisation de chat pour cette simulation
+    st.session_state["chat_utilise"] = False
+    st.session_state["derniere_reponse_ia"] = ""
+    # Les panneaux de rapport et de chat dépendent de la simulation : réexécution complète
+    st.rerun()
+
+
+@st.fragment
+@instrumenter("simulation")
+def panneau_simulation(parametres_piece, contexte_piece):
+    mode_incertitude = st.checkbox("Mode incertitude : tenir compte de l'incertitude des prévisions",
+                                   help="Simule des milliers de variantes de la météo prévue, d'autant plus "
+                                        "incertaine que le jour est lointain, et donne une fourchette (P10-P90).")
+    # Bouton pour lancer la simulation
+    if st.button("Lancer la simulation"):
+        # Vérification que les caractéristiques du climatiseur sont bien renseignées
+        if not st.session_state.get("ac_data_ok", False):
+            st.error("Veuillez d'abord renseigner les caractéristiques du climatiseur en section 1.")
         else:
-            # Si utilisation très longue (>12h), on la fait s'étendre jusqu'à la fin de la journée
-            start_hour = max(0, heures_totales - X)
-            end_hour = 23
-
-        # Pour chaque jour de la période de 7 jours, calculer la consommation
-        for jour_index in range(7):
-            # Obtenir les conditions météo du jour (températures sur 24h)
-            # Si on a des prévisions_jours remplies, on utilise les valeurs, sinon on met des valeurs par défaut
-            if jour_index < len(previsions_jours):
-                try:
-                    # Convertir la température moyenne du jour en min et max estimés
-                    t_day = float(previsions_jours[jour_index]["Température (°C)"])
-                    # On suppose un écart jour/nuit de +/-5°C autour de cette moyenne pour simuler une courbe
-                    t_min = t_day - 5
-                    t_max = t_day + 5
-                except:
-                    # Valeurs par défaut si parsing impossible
-                    t_min = 20.0
-                    t_max = 30.0
-                try:
-                    humid_day = float(previsions_jours[jour_index]["Humidité (%)"])
-                except:
-                    humid_day = 50.0
+            previsions_jours = st.session_state.get("previsions_jours", [])
+            jours = [previsions_jours[j]["Date"] if j < len(previsions_jours) else f"Jour {j+1}" for j in range(7)]
+            parametres = {**parametres_climatiseur(), **parametres_piece}
+            # Simulation vectorisée des 7 jours (courbe de température, plage d'utilisation
+            # et facteurs de charge calculés en une seule passe, cf. simulation.py).
+            # Une configuration déjà simulée (mêmes entrées) est reprise de l'historique sans calcul ;
+            # sinon seuls les jours dont la météo a changé depuis la simulation précédente de la session
+            # sont resimulés, sauf si un paramètre global a changé (cf. simulation_incrementale.py)
+            if "simulation_incrementale" not in st.session_state:
+                st.session_state["simulation_incrementale"] = SimulationIncrementale()
+            simulation_session = st.session_state["simulation_incrementale"]
+            temp_jours, humid_jours = meteo_depuis_previsions(previsions_jours, jours=7)
+            with traces.span("simulation.calcul") as s:
+                execution = historique_simulations().lire(
+                    HistoriqueSimulations.empreinte(temp_jours, humid_jours, **parametres))
+                s["historique"] = "echec" if execution is None else "succes"
+                if execution is None:
+                    resultats = simulation_session.simuler(temp_jours, humid_jours, **parametres)
+                    s["jours_recalcules"] = len(simulation_session.jours_recalcules)
+            if execution is None:
+                with traces.span("historique.enregistrement"):
+                    historique_simulations().enregistrer(temp_jours, humid_jours, parametres, resultats,
+                                                         ville=contexte_piece["ville"], jours=jours)
+
+            incertitude = None
+            if mode_incertitude:
+                from incertitude import simuler_incertitude
+                with traces.span("simulation.incertitude") as s:
+                    quantiles = simuler_incertitude(temp_jours, humid_jours, **parametres)
+                    s["tirages"] = quantiles["nb_tirages"]
+                incertitude = {cle: (valeur.tolist() if hasattr(valeur, "tolist") else valeur)
+                               for cle, valeur in quantiles.items()}
+
+            contexte = {**contexte_piece, "modele": st.session_state.get("ac_modele"),
+                        "froid": st.session_state.get("ac_froid", 2.0) or 2.0}
+            if execution is None:
+                publier_resultats(resultats_session(resultats, jours, parametres_piece["heures_utilisation"],
+                                                    len(simulation_session.jours_recalcules), incertitude,
+                                                    parametres=parametres, contexte=contexte))
             else:
-                # Valeurs par défaut si pas de données pour ce jour
-                t_min = 20.0
-                t_max = 30.0
-                humid_day = 50.0
-
-            # Génération d'une courbe de température extérieure estimée sur 24h (simple modèle triangulaire jour/nuit)
-            outside_temps = [0.0] * heures_totales
-            for h in range(heures_totales):
-                if h < 6:
-                    # nuit tôt
-                    outside_temps[h] = t_min
-                elif 6 <= h <= 15:
-                    # montée de température le jour
-                    outside_temps[h] = t_min + (t_max - t_min) * ((h - 6) / (15 - 6))
-                else:
-                    # redescente en fin de journée
-                    outside_temps[h] = t_max - (t_max - t_min) * ((h - 15) / (24 - 15))
-
-            # Listes de consommation horaire pour ce jour, pour chaque scénario
-            conso_horaire_normale = [0.0] * heures_totales
-            conso_horaire_optimisee = [0.0] * heures_totales
-
-            for h in range(heures_totales):
-                if start_hour <= h <= end_hour:
-                    # SCÉNARIO NORMAL : climatiseur allumé en continu pendant toute la période d'occupation
-                    conso_horaire_normale[h] = consommation_kw  # consommation pleine puissance
-
-                    # SCÉNARIO OPTIMISÉ : modulation de la puissance en fonction des besoins
-                    # Calcul de l'écart de température extérieur vs confort
-                    temp_ext = outside_temps[h]
-                    diff = max(0.0, temp_ext - temp_confort)
-                    # Ajustement en fonction de l'isolation thermique (déjà pris via diff? Non, on applique sur diff)
-                    # (Niveau d'isolation initial: "Moyenne" considéré neutre, "Bonne" réduit les besoins, "Faible" les augmente)
-                    niveau_iso = isolation if 'isolation' in locals() else "Moyenne"
-                    if niveau_iso == "Bonne":
-                        diff *= 0.8
-                    elif niveau_iso == "Faible":
-                        diff *= 1.2
-                    # Ajustement en fonction du vitrage (simple vitrage = plus de pertes, double = moins)
-                    if type_vitrage == "Simple vitrage":
-                        diff *= 1.1
-                    else:
-                        # Double vitrage (on considère baseline en double, donc pas de réduction majeure, juste neutre ou légère amélioration)
-                        diff *= 0.95
-
-                    # Impact de l'orientation sur le gain solaire aux heures chaudes
-                    # On applique un facteur d'ensoleillement supplémentaire sur diff aux heures concernées selon orientation
-                    if 10 <= h <= 16:  # plage approximative de fort ensoleillement
-                        if orientation == "Sud":
-                            diff *= 1.1  # plein sud reçoit beaucoup de soleil la journée
-                        elif orientation == "Ouest":
-                            # Ouest surtout l'après-midi (mettons 12h-18h, on est dans 10-16 donc partiel)
-                            diff *= 1.1
-                        elif orientation == "Est":
-                            # Est surtout le matin (6h-12h), à 10-16h l'effet est moins fort, on peut mettre un léger facteur
-                            diff *= 1.05
-                        elif orientation == "Nord":
-                            # Nord a très peu de soleil direct, on peut même réduire un peu le diff car moins de charge solaire
-                            diff *= 0.95
-
-                    # Présence d'appareils émettant de la chaleur (TV, PC, etc.)
-                    if presence_appareils == "Oui, quelques-uns":
-                        diff *= 1.1  # quelques appareils -> +10% charge thermique
-                    elif presence_appareils == "Oui, plusieurs":
-                        diff *= 1.2  # plusieurs appareils -> +20%
-
-                    # Impact du nombre de personnes (chaleur humaine) : +5% de charge par personne supplémentaire au-delà de 1
-                    diff *= (1 + 0.05 * max(0, nbr_personnes - 1))
-
-                    # Ajustement pour hauteur sous plafond : on considère base 2.5m, si plus haut -> volume plus grand à refroidir
-                    if hauteur and hauteur > 0:
-                        diff *= (hauteur / 2.5)
-
-                    # Effet de l'humidité : au-delà de 50% d'humidité, la clim doit travailler plus (déshumidification)
-                    if humid_day and humid_day > 50:
-                        surplus_humid_factor = 1 + 0.001 * (humid_day - 50)  # +0.1% de charge par % au-dessus de 50
-                        diff *= surplus_humid_factor
-
-                    # Calcul d'un facteur de fonctionnement de la clim (0 à 1) basé sur l'écart de température modifié
-                    # Supposons qu'un écart de 10°C ou plus nécessite 100% de la puissance de la clim
-                    facteur_utilisation = diff / 10.0
-                    if facteur_utilisation > 1:
-                        facteur_utilisation = 1.0
-                    if facteur_utilisation < 0:
-                        facteur_utilisation = 0.0
-
-                    # Prise en compte de la technologie inverter : un inverter est plus efficace à charge partielle, donc consomme un peu moins
-                    if est_inverter:
-                        facteur_utilisation *= 0.95  # 5% de consommation en moins grâce à l'inverter
-                    else:
-                        facteur_utilisation *= 1.05  # non-inverter peut consommer ~5% de plus pour le même refroidissement
-
-                    # Climatiseur ancien ou mal entretenu : efficacité réduite -> consommation accrue
-                    # On applique un facteur d'inefficacité basé sur l'âge et la fréquence d'entretien
-                    inefficacite = 1.0
-                    # Par exemple, +1% de consommation par année d'âge (max +20% à 20 ans, par cap)
-                    inefficacite *= (1 + 0.01 * min(age, 20))
-                    # Fréquence d'entretien : plus c'est rare, plus la conso augmente (on majore de 5 à 10%)
-                    if frequence_entretien == "Tous les 2 ans":
-                        inefficacite *= 1.05
-                    elif frequence_entretien == "Plus rare (> 2 ans)":
-                        inefficacite *= 1.10
-                    facteur_utilisation *= inefficacite
-
-                    # Assurer que le facteur ne dépasse pas 1 (100% de la puissance max)
-                    if facteur_utilisation > 1:
-                        facteur_utilisation = 1.0
-
-                    # Consommation optimisée à cette heure (kW * fraction du temps)
-                    conso_horaire_optimisee[h] = consommation_kw * facteur_utilisation
-                else:
-                    # En dehors des heures d'utilisation, le climatiseur est éteint dans les deux scénarios
-                    conso_horaire_normale[h] = 0.0
-                    conso_horaire_optimisee[h] = 0.0
-
-            # Calcul de la consommation totale du jour (kWh)
-            total_kwh_normal = sum(conso_horaire_normale)
-            total_kwh_optimise = sum(conso_horaire_optimisee)
-            consommation_journaliere_normale.append(total_kwh_normal)
-            consommation_journaliere_optimisee.append(total_kwh_optimise)
-
-        # Une fois les 7 jours simulés, calculer les coûts et économies
-        couts_normaux = [kwh * TARIF_ELECTRICITE for kwh in consommation_journaliere_normale]
-        couts_optimises = [kwh * TARIF_ELECTRICITE for kwh in consommation_journaliere_optimisee]
-
-        # Affichage des résultats chiffrés pour chaque jour
-        st.subheader("Résultats de la simulation sur 7 jours :")
-        for j in range(len(consommation_journaliere_normale)):
-            jour_label = previsions_jours[j]["Date"] if j < len(previsions_jours) else f"Jour {j+1}"
-            st.write(f"**{jour_label}** – Consommation normale : {consommation_journaliere_normale[j]:.1f} kWh "
-                     f"(coût {couts_normaux[j]:.0f} DZD), "
-                     f"optimisée : {consommation_journaliere_optimisee[j]:.1f} kWh "
-                     f"(coût {couts_optimises[j]:.0f} DZD)")
-
-        # Calcul des économies totales sur la semaine
-        total_kwh_normal_sem = sum(consommation_journaliere_normale)
-        total_kwh_optimise_sem = sum(consommation_journaliere_optimisee)
-        economie_kwh_total = total_kwh_normal_sem - total_kwh_optimise_sem
-        economie_pourcent_total = (economie_kwh_total / total_kwh_normal_sem * 100) if total_kwh_normal_sem > 0 else 0.0
-        economie_cout_total = economie_kwh_total * TARIF_ELECTRICITE
-        st.write(f"**Économies totales sur 7 jours** : {economie_kwh_total:.1f} kWh économisés, soit {economie_pourcent_total:.0f}% de moins qu'une utilisation normale, représentant environ {economie_cout_total:.0f} DZD.")
-
-        # Graphique 1 : Profil horaire de consommation (pour le premier jour simulé à titre d'exemple)
-        st.subheader("Profil horaire de consommation (Jour 1)")
-        if consommation_journaliere_normale:
-            heures = list(range(24))
-            df_horaire = pd.DataFrame({
-                "Heure": heures,
-                "Consommation normale (kW)": conso_horaire_normale,    # du dernier jour calculé ou du jour 1? Ici c'est le dernier calculé dans boucle
-                "Consommation optimisée (kW)": conso_horaire_optimisee
-            })
-            df_horaire = df_horaire.set_index("Heure")
-            st.line_chart(df_horaire)  # affichage simple du profil 24h du dernier jour simulé
+                publier_resultats(resultats_session(execution, jours, parametres_piece["heures_utilisation"],
+                                                    incertitude=incertitude, execution=execution,
+                                                    parametres=parametres, contexte=contexte))
+    if st.session_state.get("simulation_effectuee", False):
+        afficher_resultats_simulation(st.session_state["resultats_simulation"])
+
+
+panneau_simulation(parametres_piece, contexte_piece)
+
+
+# Historique des simulations : rechargement et comparaison des exécutions enregistrées (cf. historique.py)
+@st.fragment
+@instrumenter("historique")
+def panneau_historique(contexte_piece):
+    with st.expander("Historique des simulations : recharger et comparer"):
+        import pandas as pd
+
+        toutes_villes = st.checkbox("Toutes les villes", value=False)
+        with traces.span("historique.tableau"):
+            synthese = historique_simulations().tableau(
+                ville=None if toutes_villes else contexte_piece["ville"], limite=LIMITE_HISTORIQUE)
+        if synthese.empty:
+            st.write("Aucune simulation enregistrée pour l'instant.")
+            return
+        libelles = {
+            int(ligne["id"]): f"n°{ligne['id']} - {ligne['ville']}, {ligne['date_simulation']} - "
+                              f"{ligne.get('consommation_kw', float('nan')):.1f} kW, "
+                              f"{ligne.get('heures_utilisation', '?')} h/jour, confort {ligne.get('temp_confort', '?')} °C "
+                              f"({ligne['economie_kwh']:.1f} kWh économisés)"
+            for _, ligne in synthese.iterrows()
+        }
+        st.dataframe(synthese.drop(columns=["cree_le"]).round(2), hide_index=True)
+        choix = st.multiselect("Simulations à comparer :", list(libelles), format_func=libelles.get,
+                               max_selections=8)
+        if not choix:
+            return
+        executions = historique_simulations().charger(choix)
+        index = pd.Index([f"Jour {j + 1}" for j in range(len(executions[0]["journaliere_optimisee"]))], name="Jour")
+        st.subheader("Consommation optimisée quotidienne (kWh)")
+        st.line_chart(pd.DataFrame({f"n°{e['id']}": e["journaliere_optimisee"] for e in executions}, index=index))
+        a_recharger = st.selectbox("Simulation à recharger dans la section 3 :", choix, format_func=libelles.get)
+        if st.button("Recharger cette simulation"):
+            execution = next(e for e in executions if e["id"] == a_recharger)
+            publier_resultats(resultats_session(execution, execution["jours"] or list(index),
+                                                execution["parametres"].get("heures_utilisation"),
+                                                execution=execution))
+
+
+panneau_historique(contexte_piece)
+
+
+# Planning optimal : arrêt ou consigne heure par heure selon le tarif (programmation dynamique, cf. planification.py)
+@st.fragment
+@instrumenter("planning")
+def panneau_planning(parametres_piece):
+    if not st.session_state.get("simulation_effectuee", False):
+        return
+    with st.expander("Planning optimal selon le tarif (heures creuses, pointe, tranches)"):
+        import pandas as pd
+        from planification import (TARIFS_HORAIRES, TOLERANCE_DEFAUT, TRANCHES_EXEMPLE, optimiser_planning,
+                                   optimiser_planning_tranches)
+
+        tarif_tranches = "Tarif progressif par tranches (exemple)"
+        tarif = st.selectbox("Tarif de l'électricité :", [*TARIFS_HORAIRES, tarif_tranches])
+        tolerance = st.number_input("Dépassement toléré de la température de confort (°C) :", min_value=0.0,
+                                    max_value=3.0, value=TOLERANCE_DEFAUT, step=0.5)
+        previsions_jours = st.session_state.get("previsions_jours", [])
+        temp_jours, humid_jours = meteo_depuis_previsions(previsions_jours, jours=7)
+        parametres = {**parametres_climatiseur(), **parametres_piece}
+        if tarif == tarif_tranches:
+            st.caption("Tranches trimestrielles : " + ", ".join(
+                f"{prix:.2f} DZD/kWh" + (f" jusqu'à {plafond:.0f} kWh" if plafond != float("inf") else " au-delà")
+                for plafond, prix in TRANCHES_EXEMPLE))
+            facturee = st.number_input("Consommation déjà facturée sur le trimestre (kWh) :", min_value=0.0,
+                                       value=0.0, step=10.0)
+        with traces.span("planning.optimisation", tarif=tarif):
+            if tarif == tarif_tranches:
+                planning = optimiser_planning_tranches(temp_jours, humid_jours, consommation_facturee=facturee,
+                                                       tolerance=tolerance, **parametres)
+            else:
+                planning = optimiser_planning(temp_jours, humid_jours, prix=TARIFS_HORAIRES[tarif],
+                                              tolerance=tolerance, **parametres)
+        reference = planning["reference"]
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Coût sur 7 jours (planning optimal)", f"{planning['cout']:.0f} DZD",
+                    delta=f"{planning['cout'] - reference['cout']:.0f} DZD", delta_color="inverse")
+        col2.metric("Consommation (planning optimal)", f"{planning['energie_kwh']:.1f} kWh",
+                    delta=f"{planning['energie_kwh'] - reference['energie_kwh']:.1f} kWh", delta_color="inverse")
+        col3.metric("Inconfort (°C.h au-delà de la tolérance)", f"{planning['inconfort_degres_heures']:.1f}",
+                    delta=f"{planning['inconfort_degres_heures'] - reference['inconfort_degres_heures']:.1f}",
+                    delta_color="inverse")
+        st.caption(f"Comparaison avec la plage d'utilisation fixe (consigne {parametres['temp_confort']} °C pendant "
+                   f"les heures d'utilisation) : {reference['cout']:.0f} DZD, {reference['energie_kwh']:.1f} kWh.")
+
+        jours = [previsions_jours[j]["Date"] if j < len(previsions_jours) else f"Jour {j+1}" for j in range(7)]
+        jour = st.selectbox("Jour du planning :", range(7), format_func=lambda j: jours[j])
+        heures = pd.Index([f"{h:02d}h" for h in range(24)], name="Heure")
+        st.subheader(f"Planning du {jours[jour]}")
+        st.dataframe(pd.DataFrame({
+            "Consigne (°C)": planning["consigne"][jour],
+            "Puissance moyenne (kW)": planning["horaire"][jour],
+            "Coût (DZD)": planning["cout_horaire"][jour],
+            "Température intérieure (°C)": planning["temperature_interieure"][jour],
+        }, index=heures).round(2).T, use_container_width=True)
+        st.line_chart(pd.DataFrame({
+            "Planning optimal": planning["temperature_interieure"][jour],
+            "Plage fixe": reference["temperature_interieure"][jour],
+        }, index=heures), y_label="Température intérieure (°C)")
+
+
+panneau_planning(parametres_piece)
+
+
+# Balayage de paramètres : toutes les combinaisons choisies sont évaluées en un seul calcul vectorisé
+@st.fragment
+@instrumenter("balayage")
+def panneau_balayage(parametres_piece):
+    with st.expander("Balayage de paramètres (comparaison de scénarios)"):
+        st.write("Les paramètres non balayés reprennent les valeurs saisies ci-dessus.")
+        plage_confort = st.slider("Températures de confort (°C) :", min_value=16, max_value=30, value=(22, 27))
+        plage_heures = st.slider("Heures d'utilisation quotidienne :", min_value=1, max_value=24, value=(4, 12))
+        orientations_bal = st.multiselect("Orientations :", options=["Nord", "Est", "Sud", "Ouest"],
+                                          default=["Nord", "Est", "Sud", "Ouest"])
+        vitrages_bal = st.multiselect("Types de vitrage :", options=["Double vitrage", "Simple vitrage"],
+                                      default=["Double vitrage", "Simple vitrage"])
+        technologies_bal = st.multiselect("Technologies :", options=["Inverter", "Non-inverter"],
+                                          default=["Inverter", "Non-inverter"])
+        tarifs_saisis = st.text_input("Tarifs de l'électricité à comparer (DZD/kWh, séparés par des virgules) :",
+                                      value=f"{TARIF_ELECTRICITE}, 7.5, 10")
+        if st.button("Lancer le balayage"):
+            try:
+                tarifs_bal = [float(t) for t in tarifs_saisis.replace(";", ",").split(",") if t.strip()]
+            except ValueError:
+                tarifs_bal = []
+            if not (orientations_bal and vitrages_bal and technologies_bal and tarifs_bal):
+                st.warning("Veuillez choisir au moins une valeur par paramètre et un tarif valide.")
+            else:
+                import altair as alt
+                from balayage import balayer, classement, economies_par_tarif
+
+                axes = {
+                    "temp_confort": range(plage_confort[0], plage_confort[1] + 1),
+                    "heures_utilisation": range(plage_heures[0], plage_heures[1] + 1),
+                    "orientation": orientations_bal,
+                    "type_vitrage": vitrages_bal,
+                    "est_inverter": [t == "Inverter" for t in technologies_bal],
+                }
+                fixes = {cle: valeur for cle, valeur in {**parametres_climatiseur(), **parametres_piece}.items()
+                         if cle not in axes}
+                temp_jours, humid_jours = meteo_depuis_previsions(st.session_state.get("previsions_jours", []), jours=7)
+                df_balayage = balayer(temp_jours, humid_jours, axes=axes, fixes=fixes)
+                meilleurs = classement(df_balayage, n=20)
+                st.write(f"**{len(df_balayage)} scénarios évalués.** Meilleurs scénarios (économie sur 7 jours) :")
+                st.dataframe(meilleurs)
+                df_tarifs = economies_par_tarif(meilleurs, tarifs_bal)
+                carte = alt.Chart(df_tarifs).mark_rect().encode(
+                    x=alt.X("Tarif (DZD/kWh):O", title="Tarif (DZD/kWh)"),
+                    y=alt.Y("Scénario:O", title="Rang du scénario"),
+                    color=alt.Color("Économie (DZD):Q", title="Économie (DZD)"),
+                    tooltip=["Scénario", "Tarif (DZD/kWh)", alt.Tooltip("Économie (DZD):Q", format=".0f")]
+                ).properties(width=600)
+                st.altair_chart(carte, use_container_width=True)
+
+
+panneau_balayage(parametres_piece)
+
+
+def afficher_courbe_periode(horaire):
+    # Consommation horaire d'une longue période, agrégée au pas affiché (cf. series_graphiques.py)
+    from series_graphiques import PAS, choisir_pas, serie_graphique
+
+    premier, dernier = horaire.index[0].date(), horaire.index[-1].date()
+    col1, col2 = st.columns(2)
+    periode = col1.date_input("Période affichée :", (premier, dernier), min_value=premier, max_value=dernier)
+    choix_pas = col2.selectbox("Pas du graphique :", ["Automatique", *PAS])
+    if len(periode) != 2:
+        return  # sélection de la période en cours
+    vue = horaire.loc[str(periode[0]):str(periode[1])]
+    pas = choisir_pas(vue.index) if choix_pas == "Automatique" else choix_pas
+    with traces.span("graphique.periode", heures=len(vue), pas=pas) as s:
+        serie = serie_graphique(vue, pas)
+        s["points"] = len(serie)
+    if pas != "Heure":
+        serie = serie.rename(columns=lambda colonne: colonne.replace("(kW)", f"(kWh par {pas.lower()})"))
+    st.line_chart(serie)
+    st.caption(f"Pas : {pas.lower()} ; {len(serie)} points affichés pour {len(vue)} heures simulées.")
+
+
+# Simulation longue durée (saison / année) à partir d'un fichier météo horaire (année type EPW ou CSV)
+@st.fragment
+@instrumenter("simulation_annuelle")
+def panneau_simulation_annuelle(parametres_piece):
+    with st.expander("Simulation annuelle sur fichier météo horaire"):
+        st.write("Importez une année type (.epw) ou un historique horaire (.csv avec les colonnes "
+                 "`date_heure`, `temperature` et éventuellement `humidite`). Les paramètres saisis ci-dessus sont utilisés.")
+        fichier_horaire = st.file_uploader("Fichier météo horaire :", type=["epw", "csv"])
+        parametres = {**parametres_climatiseur(), **parametres_piece}
+        # Fichier et paramètres de la simulation : des résultats calculés avec d'autres entrées ne sont pas affichés
+        entrees = (fichier_horaire.file_id, fichier_horaire.name, sorted(parametres.items())) if fichier_horaire else None
+        if fichier_horaire and st.button("Lancer la simulation annuelle"):
+            st.session_state.pop("resultats_annuels", None)
+            try:
+                from simulation_longue import simuler_periode
+                # Résultats conservés pour que le zoom du graphique ne relance pas la simulation
+                st.session_state["resultats_annuels"] = {
+                    "entrees": entrees,
+                    **simuler_periode(fichier_horaire, garder_horaire=True, **parametres),
+                }
+            except Exception as e:
+                st.error("Échec de la lecture du fichier météo horaire. Veuillez vérifier le format.")
+        resultats_annuels = st.session_state.get("resultats_annuels")
+        if resultats_annuels is not None and resultats_annuels["entrees"] != entrees:
+            st.session_state.pop("resultats_annuels")
+            resultats_annuels = None
+            if fichier_horaire:
+                st.info("Le fichier météo ou les paramètres ont changé : relancez la simulation annuelle.")
+        if resultats_annuels is not None:
+            economie_annuelle = resultats_annuels["total_normale_kwh"] - resultats_annuels["total_optimisee_kwh"]
+            st.write(f"**Sur la période** : {resultats_annuels['total_normale_kwh']:.0f} kWh en utilisation normale, "
+                     f"{resultats_annuels['total_optimisee_kwh']:.0f} kWh en utilisation optimisée, soit "
+                     f"{economie_annuelle:.0f} kWh économisés ({economie_annuelle * TARIF_ELECTRICITE:.0f} DZD).")
+            st.subheader("Totaux par saison")
+            st.dataframe(resultats_annuels["saisonnier"].round(1))
+            st.subheader("Totaux mensuels")
+            st.dataframe(resultats_annuels["mensuel"].round(1))
+            st.bar_chart(resultats_annuels["mensuel"][["Consommation normale (kWh)", "Consommation optimisée (kWh)"]])
+            st.subheader("Consommation sur la période")
+            afficher_courbe_periode(resultats_annuels["horaire"])
+
+
+panneau_simulation_annuelle(parametres_piece)
+
+
+# Calibration des coefficients du modèle sur des relevés horaires mesurés (compteur et météo)
+@st.fragment
+@instrumenter("calibration")
+def panneau_calibration(parametres_piece):
+    with st.expander("Calibration du modèle sur relevés de consommation"):
+        st.write("Importez des relevés horaires du climatiseur (.csv ou .xlsx avec les colonnes `date_heure`, "
+                 "`consommation` en kWh, `temperature` extérieure et éventuellement `humidite` et "
+                 "`temperature_interieure`). Les coefficients du modèle sont ajustés à ces mesures pour le "
+                 "climatiseur et la pièce saisis ci-dessus.")
+        fichier_releves = st.file_uploader("Relevés horaires :", type=["csv", "xlsx"])
+        if fichier_releves and st.button("Calibrer le modèle"):
+            st.session_state.pop("calibration", None)
+            try:
+                from calibration import calibrer, lire_mesures
+                with traces.span("calibration.lecture") as s:
+                    mesures = lire_mesures(fichier_releves)
+                    s["heures"] = len(mesures["heure"])
+                with traces.span("calibration.ajustement"):
+                    st.session_state["calibration"] = calibrer(mesures, **parametres_climatiseur(), **parametres_piece)
+            except ValueError as e:
+                st.warning(str(e))
+            except Exception as e:
+                st.error("Échec de la lecture des relevés. Veuillez vérifier le format.")
+        calibration = st.session_state.get("calibration")
+        if fichier_releves and calibration is not None:
+            import pandas as pd
+            from calibration import LIBELLES
+            from series_graphiques import serie_graphique
+
+            st.write(f"**{calibration['heures']} heures mesurées.**")
+            coefficients = pd.DataFrame({"Modèle actuel": calibration["defaut"],
+                                         "Calibré": calibration["coefficients"]}).rename(index=LIBELLES)
+            st.dataframe(coefficients.round(4))
+            if calibration["coefficient_age"] is not None:
+                st.caption(f"À entretien inchangé, le facteur appareil calibré correspond à "
+                           f"{100 * calibration['coefficient_age']:.1f}% de surconsommation par année d'âge "
+                           f"(1% dans le modèle actuel).")
+            erreurs = pd.DataFrame({"Modèle actuel": calibration["erreur_defaut"],
+                                    "Calibré": calibration["erreur_calibree"]}).rename(index={
+                "rmse_kwh": "Erreur quadratique horaire (kWh)", "biais_kwh": "Biais horaire (kWh)",
+                "r2": "R²", "ecart_total_pourcent": "Écart sur le total (%)"})
+            st.dataframe(erreurs.round(3))
+            st.line_chart(serie_graphique(calibration["comparaison"]))
+
+
+panneau_calibration(parametres_piece)
+
+
+# Mode bâtiment : plusieurs pièces (et leurs climatiseurs) simulées ensemble avec la même météo et le même tarif
+@st.fragment
+@instrumenter("batiment")
+def panneau_batiment(parametres_piece, contexte_piece):
+    with st.expander("Bâtiment : simulation de plusieurs pièces"):
+        import pandas as pd
+        from batiment import Batiment, courbe_appel
+
+        st.write("Une ligne par pièce climatisée. Les cellules vides reprennent les valeurs saisies ci-dessus. "
+                 "Un tableau CSV peut être importé (colonnes `piece`, `surface` et celles de la simulation en lot : "
+                 "`conso`, `inverter`, `heures`, `orientation`, `confort`...).")
+        fichier_pieces = st.file_uploader("Tableau des pièces (.csv) :", type=["csv"])
+        if fichier_pieces:
+            try:
+                pieces_initiales = pd.read_csv(fichier_pieces)
+            except Exception as e:
+                st.error("Échec de la lecture du tableau des pièces. Veuillez vérifier le format.")
+                return
         else:
-            st.write("Aucune donnée horaire à afficher.")
+            climatiseur = parametres_climatiseur()
+            pieces_initiales = pd.DataFrame({
+                "piece": ["Pièce 1", "Pièce 2", "Pièce 3"],
+                "surface": [contexte_piece["surface"]] * 3,
+                "conso": [climatiseur["consommation_kw"]] * 3,
+                "inverter": ["Inverter" if climatiseur["est_inverter"] else "Non-inverter"] * 3,
+                "heures": [parametres_piece["heures_utilisation"]] * 3,
+                "orientation": ["Nord", "Sud", "Ouest"],
+                "vitrage": [parametres_piece["type_vitrage"]] * 3,
+                "personnes": [parametres_piece["nbr_personnes"]] * 3,
+                "confort": [parametres_piece["temp_confort"]] * 3,
+            })
+        pieces = st.data_editor(pieces_initiales, num_rows="dynamic", use_container_width=True, column_config={
+            "inverter": st.column_config.SelectboxColumn(options=["Inverter", "Non-inverter"]),
+            "orientation": st.column_config.SelectboxColumn(options=["Nord", "Est", "Sud", "Ouest"]),
+            "vitrage": st.column_config.SelectboxColumn(options=["Double vitrage", "Simple vitrage"]),
+        })
+        if st.button("Simuler le bâtiment"):
+            try:
+                batiment = Batiment(pieces, communs={**parametres_climatiseur(), **parametres_piece})
+            except ValueError as e:
+                st.warning(str(e))
+                return
+            previsions_jours = st.session_state.get("previsions_jours", [])
+            temp_jours, humid_jours = meteo_depuis_previsions(previsions_jours, jours=7)
+            with traces.span("batiment.simulation", pieces=len(batiment)):
+                resultats_bat = batiment.simuler(temp_jours, humid_jours)
+            jours = [previsions_jours[j]["Date"] if j < len(previsions_jours) else f"Jour {j+1}" for j in range(7)]
+            par_piece = resultats_bat["par_piece"]
+            total_normal = par_piece["Consommation normale (kWh)"].sum()
+            total_optimise = par_piece["Consommation optimisée (kWh)"].sum()
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Pointe d'appel (normal)", f"{resultats_bat['pointe_normale']:.1f} kW")
+            col2.metric("Pointe d'appel (optimisé)", f"{resultats_bat['pointe_optimisee']:.1f} kW",
+                        delta=f"{resultats_bat['pointe_optimisee'] - resultats_bat['pointe_normale']:.1f} kW",
+                        delta_color="inverse")
+            col3.metric("Économie sur 7 jours", f"{(total_normal - total_optimise) * TARIF_ELECTRICITE:.0f} DZD")
+            st.write(f"**{len(batiment)} pièces** : {total_normal:.0f} kWh en utilisation normale, "
+                     f"{total_optimise:.0f} kWh en utilisation optimisée. Pointe optimisée le "
+                     f"{jours[resultats_bat['jour_pointe']]} à {resultats_bat['heure_pointe']} h.")
+            st.subheader("Appel de puissance du bâtiment (kW)")
+            st.line_chart(courbe_appel(resultats_bat, jours))
+            st.subheader("Détail par pièce")
+            st.dataframe(par_piece.round(2), hide_index=True)
+
+
+panneau_batiment(parametres_piece, contexte_piece)
+
 
-        # Graphique 2 : Comparaison de la consommation quotidienne sur les 7 jours
-        st.subheader("Consommation quotidienne sur 7 jours")
+# Simulation fine : cycles du compresseur à la minute, inverter et non-inverter sur la même pièce
+@st.fragment
+@instrumenter("cycles")
+def panneau_cycles(parametres_piece):
+    with st.expander("Simulation fine : cycles du compresseur"):
+        import numpy as np
+        import pandas as pd
+        from cyclage import CONSTANTE_TEMPS_DEFAUT, HYSTERESIS_DEFAUT, simuler_cycles
+        from series_graphiques import sous_echantillonner
+
+        st.write("Le thermostat démarre le compresseur au-dessus de la température de confort plus la moitié "
+                 "de l'hystérésis et l'arrête en dessous du confort moins la moitié. Un climatiseur non-inverter "
+                 "tourne à pleine puissance et cycle ; un inverter module sa puissance.")
+        col1, col2, col3 = st.columns(3)
+        pas_min = col1.selectbox("Pas de temps (min) :", [1, 2, 5, 10, 15])
+        hysteresis = col2.number_input("Hystérésis du thermostat (°C) :", min_value=0.2, max_value=4.0,
+                                       value=HYSTERESIS_DEFAUT, step=0.1)
+        constante_temps = col3.number_input("Inertie de la pièce (constante de temps, min) :", min_value=5.0,
+                                            max_value=240.0, value=CONSTANTE_TEMPS_DEFAUT, step=5.0)
+        previsions_jours = st.session_state.get("previsions_jours", [])
         jours = [previsions_jours[j]["Date"] if j < len(previsions_jours) else f"Jour {j+1}" for j in range(7)]
-        data_chart = []
-        for j, jour_label in enumerate(jours):
-            # Ajout de deux entrées par jour (normal et optimisé) pour le graphique groupé
-            val_norm = consommation_journaliere_normale[j] if j < len(consommation_journaliere_normale) else 0.0
-            val_opti = consommation_journaliere_optimisee[j] if j < len(consommation_journaliere_optimisee) else 0.0
-            data_chart.append({"Jour": jour_label, "Scénario": "Normal", "Consommation (kWh)": val_norm})
-            data_chart.append({"Jour": jour_label, "Scénario": "Optimisé", "Consommation (kWh)": val_opti})
-        df_chart = pd.DataFrame(data_chart)
-        # Création d'un graphique Altair en barres groupées
-        chart = alt.Chart(df_chart).mark_bar().encode(
-            x=alt.X("Jour:N", title="Jour"),
-            y=alt.Y("Consommation (kWh):Q", title="Consommation (kWh)"),
-            color="Scénario:N",
-            xOffset="Scénario:N"
-        ).properties(width=600)
-        st.altair_chart(chart, use_container_width=True)
-
-        # Marquer que la simulation a été effectuée, pour débloquer le chat IA
-        st.session_state["simulation_effectuee"] = True
-        # Réinitialiser l'autorisation de chat pour cette simulation
-        st.session_state["chat_utilise"] = False
-        st.session_state["derniere_reponse_ia"] = ""
+        jour_profil = st.selectbox("Jour du profil détaillé :", range(7), format_func=lambda j: jours[j])
+        if st.button("Simuler les cycles du compresseur"):
+            temp_jours, humid_jours = meteo_depuis_previsions(previsions_jours, jours=7)
+            parametres = {**parametres_climatiseur(), **parametres_piece, "est_inverter": np.array([True, False])}
+            with traces.span("cycles.simulation", pas_min=pas_min):
+                resultats_cycles = simuler_cycles(temp_jours, humid_jours, pas_min=pas_min, hysteresis=hysteresis,
+                                                  constante_temps_min=constante_temps, **parametres)
+            for colonne, i, titre in zip(st.columns(2), range(2), ["Inverter", "Non-inverter"]):
+                colonne.markdown(f"**{titre}**")
+                colonne.metric("Consommation sur 7 jours", f"{resultats_cycles['energie_kwh'][i]:.1f} kWh")
+                colonne.metric("Démarrages du compresseur", int(resultats_cycles["demarrages"][i]))
+                colonne.metric("Cycles courts (< 10 min)", int(resultats_cycles["cycles_courts"][i]))
+                colonne.metric("Pointe de puissance", f"{resultats_cycles['pointe_kw'][i]:.2f} kW")
+                colonne.metric("Inconfort (pièce occupée)", f"{resultats_cycles['minutes_inconfort'][i] / 60:.1f} h")
+            pas_par_jour = 24 * 60 // pas_min
+            tranche = slice(jour_profil * pas_par_jour, (jour_profil + 1) * pas_par_jour)
+            index = pd.Index([f"{m // 60:02d}:{m % 60:02d}" for m in range(0, 24 * 60, pas_min)], name="Heure")
+            # Jusqu'à 1440 pas par jour : sous-échantillonnage min/max (pics de démarrage conservés)
+            st.subheader(f"Puissance appelée (kW) - {jours[jour_profil]}")
+            st.line_chart(sous_echantillonner(pd.DataFrame({
+                "Inverter": resultats_cycles["puissance"][0, tranche],
+                "Non-inverter": resultats_cycles["puissance"][1, tranche]}, index=index)))
+            st.subheader(f"Température intérieure (°C) - {jours[jour_profil]}")
+            st.line_chart(sous_echantillonner(pd.DataFrame({
+                "Inverter": resultats_cycles["temperature_interieure"][0, tranche],
+                "Non-inverter": resultats_cycles["temperature_interieure"][1, tranche]}, index=index)))
+
+
+panneau_cycles(parametres_piece)
+
 # Section 4: Rapport d'analyse automatique par IA DeepSeek
 st.header("4. Rapport d'analyse par IA")
 
-if DEEPSEEK_API_KEY:
-    if st.session_state.get("simulation_effectuee", False):
-        try:
-            # Préparation de la requête à l'IA DeepSeek pour obtenir un rapport personnalisé
-            rapport_prompt = (
-                "Vous êtes un expert en efficacité énergétique. Analysez les résultats de la simulation suivants pour un climatiseur domestique et fournissez un rapport :\n"
-                f"- Modèle du climatiseur : {st.session_state.get('ac_modele', 'N/A')}\n"
-                f"- Inverter : {'oui' if est_inverter else 'non'}\n"
-                f"- Puissance frigorifique : {puissance_frigo_kw} kW\n"
-                f"- Consommation électrique : {consommation_kw} kW\n"
-                f"- Ville : {ville_choisie}\n"
-                f"- Type de pièce : {type_piece}\n"
-                f"- Surface : {surface} m², Hauteur : {hauteur} m\n"
-                f"- Isolation : {st.session_state.get('isolation', 'Moyenne')}\n"
-                f"- Vitrage : {type_vitrage}\n"
-                f"- Orientation : {orientation}\n"
-                f"- Appareils supplémentaires : {presence_appareils}\n"
-                f"- Nombre de personnes : {nbr_personnes}\n"
-                f"- Température de confort : {temp_confort} °C\n"
-                f"- Heures d'utilisation par jour : {X} h\n"
-                f"- Consommation journalière scénario normal : {consommation_journaliere_normale[0]:.1f} kWh (jour 1)\n"
-                f"- Consommation journalière scénario optimisé : {consommation_journaliere_optimisee[0]:.1f} kWh (jour 1)\n"
-                f"- Économies réalisées sur 7 jours : {economie_kwh_total:.1f} kWh, soit {economie_pourcent_total:.0f}% de réduction ({economie_cout_total:.0f} DZD économisés)\n\n"
-                "Rédigez un rapport concis commentant ces résultats, en soulignant les économies d'énergie possibles. Incluez des conseils pertinents (par ex. impact de l'isolation, de l'âge de l'appareil, de l'entretien, etc.)."
-            )
-            # Appel à l'API DeepSeek pour générer le rapport
-            rapport_response = openai.ChatCompletion.create(
-                model="deepseek-chat",
+
+@st.fragment
+@instrumenter("rapport")
+def panneau_rapport():
+    if client_deepseek() is None:
+        st.info("Clé API DeepSeek manquante. Configurez la pour obtenir un rapport d'analyse automatique.")
+        return
+    if not st.session_state.get("simulation_effectuee", False):
+        st.info("Veuillez lancer la simulation ci-dessus pour générer le rapport d'analyse.")
+        return
+    # Résultats de la dernière simulation (conservés dans l'état de session)
+    resultats_sim = st.session_state["resultats_simulation"]
+    consommation_journaliere_normale = resultats_sim["journaliere_normale"]
+    consommation_journaliere_optimisee = resultats_sim["journaliere_optimisee"]
+    economie_kwh_total = resultats_sim["economie_kwh"]
+    economie_pourcent_total = resultats_sim["economie_pourcent"]
+    economie_cout_total = resultats_sim["economie_cout"]
+    regenerer_rapport = st.button("Régénérer le rapport")
+    try:
+        # Préparation de la requête à l'IA DeepSeek pour obtenir un rapport personnalisé
+        rapport_prompt = (
+            "Vous êtes un expert en efficacité énergétique. Analysez les résultats de la simulation suivants pour un climatiseur domestique et fournissez un rapport :\n"
+            + "".join(f"- {libelle} : {valeur}\n" for libelle, valeur in description_simulation(resultats_sim)) +
+            f"- Consommation journalière scénario normal : {consommation_journaliere_normale[0]:.1f} kWh (jour 1)\n"
+            f"- Consommation journalière scénario optimisé : {consommation_journaliere_optimisee[0]:.1f} kWh (jour 1)\n"
+            f"- Économies réalisées sur 7 jours : {economie_kwh_total:.1f} kWh, soit {economie_pourcent_total:.0f}% de réduction ({economie_cout_total:.0f} DZD économisés)\n\n"
+            "Rédigez un rapport concis commentant ces résultats, en soulignant les économies d'énergie possibles. Incluez des conseils pertinents (par ex. impact de l'isolation, de l'âge de l'appareil, de l'entretien, etc.)."
+        )
+        # Rapport mis en cache par empreinte du prompt : pas de nouvel appel tant que la simulation
+        # ne change pas (session, puis cache du processus et éventuellement disque)
+        parametres_rapport = {"model": "deepseek-chat", "temperature": 0.2, "max_tokens": 1024}
+        cle_rapport = CacheRapports.cle(rapport_prompt, **parametres_rapport)
+        rapports_session = st.session_state.setdefault("rapports_ia", {})
+        rapport_texte = None
+        if not regenerer_rapport:
+            with traces.span("cache_rapports") as s:
+                rapport_texte = rapports_session.get(cle_rapport) or cache_rapports().lire(cle_rapport)
+                s["cache"] = "echec" if rapport_texte is None else "succes"
+        if rapport_texte is None:
+            # Appel à l'API DeepSeek en flux : le rapport s'affiche au fil de la génération
+            mesure = {"appel": "rapport"}
+            rapport_texte = st.write_stream(client_deepseek().en_flux(
+                mesure,
                 messages=[{"role": "user", "content": rapport_prompt}],
-                temperature=0.2,
-                max_tokens=1024
-            )
-            rapport_texte = rapport_response["choices"][0]["message"]["content"]
+                **parametres_rapport
+            ))
+            st.session_state.setdefault("mesures_ia", []).append(mesure)
+            st.caption(resume_mesure(mesure))
+            cache_rapports().ecrire(cle_rapport, rapport_texte)
+        else:
             st.write(rapport_texte)
-        except Exception as e:
-            st.error("Erreur lors de la génération du rapport par l'IA DeepSeek.")
-    else:
-        st.info("Veuillez lancer la simulation ci-dessus pour générer le rapport d'analyse.")
-else:
-    st.info("Clé API DeepSeek manquante. Configurez la pour obtenir un rapport d'analyse automatique.")
+        rapports_session[cle_rapport] = rapport_texte
+    except Exception as e:
+        st.error("Erreur lors de la génération du rapport par l'IA DeepSeek.")
+
+
+panneau_rapport()
+
 # Section 5: Chat IA (question/réponse après la simulation)
 st.header("5. Chat IA (après simulation)")
 
-if DEEPSEEK_API_KEY:
-    if st.session_state.get("simulation_effectuee", False):
-        # Proposer une question automatique (affichée mais non envoyée automatiquement)
-        question_suggestion = "Quels autres conseils pour réduire la consommation de mon climatiseur ?"
-        st.write(f"*Suggestion de question à poser à l'IA :* **{question_suggestion}**")
-
-        # Champ de texte pour la question utilisateur
-        question_user = st.text_input("Votre question pour l'IA (vous pouvez poser une seule question par simulation) :")
-        if st.button("Envoyer la question"):
-            if st.session_state.get("chat_utilise", False):
-                st.warning("Vous avez déjà posé une question pour cette simulation. Relancez une nouvelle simulation pour poser une autre question.")
-            elif question_user.strip() == "":
-                st.warning("Veuillez saisir une question avant d'envoyer.")
-            else:
-                try:
-                    # Construire le message avec contexte + question de l'utilisateur
-                    contexte = (
-                        f"Modèle: {st.session_state.get('ac_modele', 'N/A')}, "
-                        f"Inverter: {'oui' if est_inverter else 'non'}, "
-                        f"Puissance: {puissance_frigo_kw} kW, Consommation: {consommation_kw} kW, "
-                        f"Âge: {age} ans, Entretien: {frequence_entretien}, "
-                        f"Pièce: {type_piece}, Surface: {surface} m², Hauteur: {hauteur} m, Orientation: {orientation}, Vitrage: {type_vitrage}, "
-                        f"Appareils: {presence_appareils}, Personnes: {nbr_personnes}, "
-                        f"Température de confort: {temp_confort} °C, "
-                        f"Consommation normale (jour 1): {consommation_journaliere_normale[0]:.1f} kWh, "
-                        f"Consommation optimisée (jour 1): {consommation_journaliere_optimisee[0]:.1f} kWh, "
-                        f"Économies 7j: {economie_kwh_total:.1f} kWh soit {economie_pourcent_total:.0f}%."
-                    )
-                    messages = [
-                        {"role": "system", "content": "Vous êtes un assistant énergétique qui aide l'utilisateur à optimiser la consommation de son climatiseur. Le contexte de la simulation est fourni."},
-                        {"role": "user", "content": f"Contexte: {contexte}\nQuestion: {question_user}"}
-                    ]
-                    response = openai.ChatCompletion.create(
-                        model="deepseek-chat",
-                        messages=messages,
-                        temperature=0.3,
-                        max_tokens=512
-                    )
-                    reponse_ia = response["choices"][0]["message"]["content"]
-                    # Afficher la réponse de l'IA
-                    st.write("**Réponse de l'IA :**")
-                    st.write(reponse_ia)
-                    # Marquer le chat comme utilisé pour cette simulation
-                    st.session_state["chat_utilise"] = True
-                    st.session_state["derniere_reponse_ia"] = reponse_ia
-                except Exception as e:
-                    st.error("Erreur lors de la communication avec l'IA DeepSeek.")
-        # Si l'utilisateur a déjà posé sa question, on empêche une autre question
-        if st.session_state.get("chat_utilise", False):
-            st.info("Vous avez posé une question. Pour poser une autre question, veuillez relancer une nouvelle simulation.")
-    else:
+
+@st.fragment
+@instrumenter("chat")
+def panneau_chat():
+    if client_deepseek() is None:
+        st.info("Clé API DeepSeek manquante. Le chat IA n'est pas disponible.")
+        return
+    if not st.session_state.get("simulation_effectuee", False):
         st.info("Lancez d'abord la simulation ci-dessus pour pouvoir discuter avec l'IA.")
-else:
-    st.info("Clé API DeepSeek manquante. Le chat IA n'est pas disponible.")
+        return
+    resultats_sim = st.session_state["resultats_simulation"]
+    consommation_journaliere_normale = resultats_sim["journaliere_normale"]
+    consommation_journaliere_optimisee = resultats_sim["journaliere_optimisee"]
+    economie_kwh_total = resultats_sim["economie_kwh"]
+    economie_pourcent_total = resultats_sim["economie_pourcent"]
+    # Proposer une question automatique (affichée mais non envoyée automatiquement)
+    question_suggestion = "Quels autres conseils pour réduire la consommation de mon climatiseur ?"
+    st.write(f"*Suggestion de question à poser à l'IA :* **{question_suggestion}**")
+
+    # Champ de texte pour la question utilisateur
+    question_user = st.text_input("Votre question pour l'IA (vous pouvez poser une seule question par simulation) :")
+    if st.button("Envoyer la question"):
+        if st.session_state.get("chat_utilise", False):
+            st.warning("Vous avez déjà posé une question pour cette simulation. Relancez une nouvelle simulation pour poser une autre question.")
+        elif question_user.strip() == "":
+            st.warning("Veuillez saisir une question avant d'envoyer.")
+        else:
+            try:
+                # Construire le message avec contexte + question de l'utilisateur
+                contexte = (
+                    "".join(f"{libelle}: {valeur}, " for libelle, valeur in description_simulation(resultats_sim)) +
+                    f"Consommation normale (jour 1): {consommation_journaliere_normale[0]:.1f} kWh, "
+                    f"Consommation optimisée (jour 1): {consommation_journaliere_optimisee[0]:.1f} kWh, "
+                    f"Économies 7j: {economie_kwh_total:.1f} kWh soit {economie_pourcent_total:.0f}%."
+                )
+                messages = [
+                    {"role": "system", "content": "Vous êtes un assistant énergétique qui aide l'utilisateur à optimiser la consommation de son climatiseur. Le contexte de la simulation est fourni."},
+                    {"role": "user", "content": f"Contexte: {contexte}\nQuestion: {question_user}"}
+                ]
+                # Afficher la réponse de l'IA au fil de la génération
+                st.write("**Réponse de l'IA :**")
+                mesure = {"appel": "chat"}
+                reponse_ia = st.write_stream(client_deepseek().en_flux(
+                    mesure,
+                    model="deepseek-chat",
+                    messages=messages,
+                    temperature=0.3,
+                    max_tokens=512
+                ))
+                st.session_state.setdefault("mesures_ia", []).append(mesure)
+                st.caption(resume_mesure(mesure))
+                # Marquer le chat comme utilisé pour cette simulation
+                st.session_state["chat_utilise"] = True
+                st.session_state["derniere_reponse_ia"] = reponse_ia
+            except Exception as e:
+                st.error("Erreur lors de la communication avec l'IA DeepSeek.")
+    # Si l'utilisateur a déjà posé sa question, on empêche une autre question
+    if st.session_state.get("chat_utilise", False):
+        st.info("Vous avez posé une question. Pour poser une autre question, veuillez relancer une nouvelle simulation.")
+
+
+panneau_chat()
+
+
+# Panneau de diagnostic : appels sortants partagés du processus, cascade des spans d'une exécution récente
+# et export de la trace
+@st.fragment
+def panneau_diagnostic():
+    import altair as alt
+    import pandas as pd
+
+    st.header("Diagnostic")
+    st.button("Rafraîchir")
+    appels = appels_partages.statistiques()
+    if appels:
+        st.write("**Appels sortants du processus (toutes sessions)** :")
+        st.dataframe(pd.DataFrame.from_dict(appels, orient="index"))
+    historique = list(st.session_state.get("traces", []))
+    if not historique:
+        st.write("Aucune trace enregistrée.")
+        return
+    choix = st.selectbox(
+        "Exécution :", range(len(historique)), index=len(historique) - 1,
+        format_func=lambda i: f"{i + 1}. {historique[i].nom} "
+                              f"({(historique[i].fin_ns - historique[i].debut_ns) / 1e6:.0f} ms)")
+    trace = historique[choix]
+    df_spans = pd.DataFrame(traces.cascade(trace))
+    cascade = alt.Chart(df_spans.reset_index()).mark_bar().encode(
+        x=alt.X("Début (ms):Q", title="ms depuis le début de l'exécution"),
+        x2="Fin (ms):Q",
+        y=alt.Y("Span:N", sort=alt.EncodingSortField("index"), title=None),
+        color=alt.Color("Profondeur:O", legend=None),
+        tooltip=[alt.Tooltip(c, format=".1f") if c.endswith("(ms)") else c
+                 for c in df_spans.columns if c != "Profondeur"]
+    )
+    st.altair_chart(cascade, use_container_width=True)
+    st.dataframe(df_spans.drop(columns=["Profondeur"]).round(1))
+    st.download_button("Exporter (JSON lines)", traces.exporter(trace, "jsonl"),
+                       file_name=f"trace-{trace.id}.jsonl", mime="application/jsonl")
+    st.download_button("Exporter (OTLP/JSON)", traces.exporter(trace, "otlp"),
+                       file_name=f"trace-{trace.id}.otlp.json", mime="application/json")
+
+
+if DIAGNOSTIC:
+    trace_rerun = st.session_state.pop("trace_en_cours", None)
+    if traces.terminer(trace_rerun) is not None:
+        conserver_trace(trace_rerun)
+    with st.sidebar:
+        panneau_diagnostic()
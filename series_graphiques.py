@@ -0,0 +1,87 @@
+"""Séries des graphiques réduites côté serveur : agrégation au pas affiché et sous-échantillonnage.
+
+Les graphiques Streamlit et Altair embarquent toutes leurs lignes dans la
+spécification envoyée au navigateur : pour une saison, une année ou de
+nombreuses pièces, les séries sont donc réduites avant l'affichage.
+
+- Une série datée est agrégée au pas affiché (heure, jour, semaine, mois),
+  par défaut le plus fin qui tient dans ``POINTS_MAX`` points.
+- Si elle dépasse encore ``POINTS_MAX`` lignes, elle est sous-échantillonnée :
+  chaque intervalle garde, pour chaque colonne, son minimum et son maximum
+  (pics d'appel et creux conservés), dans l'ordre chronologique.
+
+La taille envoyée au navigateur est ainsi bornée quelle que soit la durée simulée.
+"""
+import numpy as np
+import pandas as pd
+
+POINTS_MAX = 1000
+# Pas d'agrégation : fréquence pandas et durée (approchée pour le mois)
+PAS = {
+    "Heure": ("h", pd.Timedelta(hours=1)),
+    "Jour": ("D", pd.Timedelta(days=1)),
+    "Semaine": ("W-MON", pd.Timedelta(days=7)),
+    "Mois": ("MS", pd.Timedelta(days=31)),
+}
+
+
+def choisir_pas(index, points_max=POINTS_MAX):
+    """Pas le plus fin (clé de ``PAS``) qui affiche la période de ``index`` en au plus ``points_max`` points."""
+    duree = index.max() - index.min() if len(index) else pd.Timedelta(0)
+    for nom, (_, duree_pas) in PAS.items():
+        if duree / duree_pas + 1 <= points_max:
+            return nom
+    return nom
+
+
+def agreger(df, pas, agregation="sum"):
+    """Série ``df`` (index de dates) agrégée au pas ``pas`` : somme (énergie) ou ``"max"`` (puissance)."""
+    frequence, _ = PAS[pas]
+    # Semaines étiquetées par leur lundi
+    return df.resample(frequence, label="left", closed="left").agg(agregation)
+
+
+def indices_minmax(valeurs, points_max=POINTS_MAX):
+    """Indices croissants des lignes gardées de ``valeurs`` ``(n, colonnes)`` : au plus ``points_max``.
+
+    Premier et dernier point, puis minimum et maximum de chaque colonne dans
+    chacun des intervalles de même longueur.
+    """
+    n, colonnes = valeurs.shape
+    if n <= points_max:
+        return np.arange(n)
+    intervalles = max(1, (points_max - 2) // (2 * colonnes))
+    taille = -(-n // intervalles)
+    # Complète le dernier intervalle par des valeurs jamais retenues (NaN également ignorés)
+    bas = np.full((intervalles * taille, colonnes), np.inf)
+    haut = np.full((intervalles * taille, colonnes), -np.inf)
+    valides = ~np.isnan(valeurs)
+    bas[:n] = np.where(valides, valeurs, np.inf)
+    haut[:n] = np.where(valides, valeurs, -np.inf)
+    debuts = (np.arange(intervalles) * taille)[:, None]
+    indices = np.concatenate([
+        [0, n - 1],
+        (debuts + bas.reshape(intervalles, taille, colonnes).argmin(axis=1)).ravel(),
+        (debuts + haut.reshape(intervalles, taille, colonnes).argmax(axis=1)).ravel(),
+    ])
+    return np.unique(np.minimum(indices, n - 1))
+
+
+def sous_echantillonner(df, points_max=POINTS_MAX):
+    """Lignes de ``df`` gardées par le sous-échantillonnage min/max (colonnes numériques)."""
+    valeurs = df.select_dtypes("number").to_numpy(dtype=np.float64)
+    if valeurs.shape[1] == 0:
+        return df.iloc[:points_max]
+    return df.iloc[indices_minmax(valeurs, points_max)]
+
+
+def serie_graphique(df, pas=None, points_max=POINTS_MAX, agregation="sum"):
+    """Série prête à afficher, d'au plus ``points_max`` lignes.
+
+    Un index de dates est d'abord agrégé au pas ``pas`` (clé de ``PAS``, ou le
+    plus fin possible si ``None``) ; tout autre index est seulement
+    sous-échantillonné.
+    """
+    if isinstance(df.index, pd.DatetimeIndex):
+        df = agreger(df, pas or choisir_pas(df.index, points_max), agregation)
+    return sous_echantillonner(df, points_max)
@@ -0,0 +1,363 @@
+"""Service HTTP (asyncio, sans dépendance) de simulation de la consommation sur 7 jours.
+
+Expose le modèle de la section 3 de ``script3.py`` à d'autres systèmes
+(facturation, CRM). Une demande est un objet JSON avec les paramètres des
+sections 1 et 2 (noms de ``simulation.simuler_horaire``, valeurs par défaut
+de l'application si absents) et la météo des 7 jours :
+
+    {"consommation_kw": 1.2, "est_inverter": true, "heures_utilisation": 8,
+     "orientation": "Sud", "temperatures": [31, 33, 30], "humidites": [55, 60, 48]}
+
+Les jours sans météo reçoivent les valeurs par défaut (25 °C, 50%) ;
+``tarif`` (DZD/kWh) est optionnel. Les valeurs catégorielles inconnues, les
+valeurs hors des bornes de l'application (entiers compris), les météos
+invraisemblables et les nombres non finis (NaN, Infinity) sont refusés
+(400). La réponse donne, jour par jour et au total, les consommations
+normale et optimisée (kWh), leurs coûts et les économies (kWh, DZD).
+
+- ``POST /simulation`` : une demande (objet) ou une liste de demandes,
+  simulée d'un bloc ;
+- ``GET /sante`` : état et compteurs du service ;
+- ``GET /metriques`` : compteurs du service, du cache météo et des appels
+  sortants au format texte Prometheus (cf. ``metriques.py``).
+
+Les demandes individuelles reçues en même temps sont regroupées pendant une
+courte fenêtre (``FENETRE_S``) puis simulées en un seul appel vectorisé de
+``simulation.simuler`` (tableaux ``(demandes, 7, 24)``). Les connexions sont
+persistantes (keep-alive HTTP/1.1). Contre la surcharge, le nombre de
+demandes en attente est borné (réponse 503 au-delà), la taille des corps
+aussi (413), et l'écriture des réponses attend que le client les lise.
+
+Exemple ::
+
+    python service_simulation.py --port 8502
+    curl -d '{"consommation_kw": 1.2, "temperatures": [31, 33]}' http://localhost:8502/simulation
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import sqlite3
+import sys
+
+import numpy as np
+
+import metriques
+from cache_meteo import CacheMeteo
+from simulation import (FACTEURS_APPAREILS, FACTEURS_ENTRETIEN, FACTEURS_ISOLATION, FACTEURS_ORIENTATION,
+                        FACTEURS_VITRAGE, HUMIDITE_DEFAUT, TARIF_ELECTRICITE, TEMPERATURE_DEFAUT, simuler)
+from simulation_lot import COLONNES, JOURS
+
+# Fenêtre de regroupement des demandes simultanées (s) et taille maximale d'un lot
+FENETRE_S = 0.002
+TAILLE_LOT = 2048
+# Demandes en attente de simulation au-delà desquelles le service répond 503
+ATTENTE_MAX = 20000
+TAILLE_MAX_CORPS = 8 * 1024 * 1024
+DEMANDES_MAX_PAR_LISTE = 10000
+# Fermeture d'une connexion persistante inactive (s)
+DELAI_INACTIVITE = 30.0
+
+# Paramètre de simulation -> valeur par défaut de l'application
+PARAMETRES = dict(COLONNES.values())
+# Valeurs admises des paramètres catégoriels : clés des tables de facteurs et valeur par défaut (facteur neutre)
+CHOIX = {nom: set(table) | {PARAMETRES[nom]} for nom, table in (
+    ("frequence_entretien", FACTEURS_ENTRETIEN), ("type_vitrage", FACTEURS_VITRAGE),
+    ("orientation", FACTEURS_ORIENTATION), ("presence_appareils", FACTEURS_APPAREILS),
+    ("isolation", FACTEURS_ISOLATION))}
+# Bornes (incluses) des paramètres numériques, celles des champs de saisie de l'application
+BORNES = {
+    "consommation_kw": (0.1, 10.0),
+    "age": (0, 50),
+    "heures_utilisation": (0, 24),
+    "hauteur": (2.0, 5.0),
+    "nbr_personnes": (0, 20),
+    "temp_confort": (16, 30),
+}
+# Bornes (incluses) des moyennes journalières : températures plausibles (°C), humidités (%)
+BORNES_METEO = {"temperatures": (-50.0, 60.0), "humidites": (0.0, 100.0)}
+STATUTS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 411: "Length Required",
+           413: "Payload Too Large", 431: "Request Header Fields Too Large", 503: "Service Unavailable"}
+
+
+class Surcharge(Exception):
+    """Trop de demandes en attente : le client doit réessayer plus tard."""
+
+
+def _non_fini(constante):
+    # ``json.loads`` accepte NaN et Infinity, que les clients JSON stricts ne relisent pas
+    raise ValueError(f"Valeur non finie refusée : {constante}")
+
+
+def lire_json(corps):
+    """Objet JSON du corps d'une requête, sans valeurs non finies (NaN, Infinity)."""
+    return json.loads(corps, parse_constant=_non_fini)
+
+
+def lire_demande(objet):
+    """Demande validée (paramètres scalaires, listes de 7 températures et humidités) depuis un objet JSON."""
+    if not isinstance(objet, dict):
+        raise ValueError("Une demande doit être un objet JSON.")
+    inconnus = set(objet) - set(PARAMETRES) - {"temperatures", "humidites", "tarif"}
+    if inconnus:
+        raise ValueError(f"Champs inconnus : {', '.join(sorted(inconnus))}")
+    demande = {}
+    for nom, defaut in PARAMETRES.items():
+        valeur = objet.get(nom, defaut)
+        # bool est un int en Python : chaque type est vérifié séparément ; un entier de l'application
+        # (heures, âge, personnes, confort) doit rester entier plutôt qu'être tronqué par la simulation
+        if isinstance(defaut, bool) != isinstance(valeur, bool) or (
+                isinstance(defaut, str) != isinstance(valeur, str)) or (
+                type(defaut) is int and type(valeur) is not int) or not isinstance(valeur, (bool, str, int, float)):
+            raise ValueError(f"Valeur invalide pour « {nom} » : {valeur!r}")
+        if nom in CHOIX and valeur not in CHOIX[nom]:
+            raise ValueError(f"Valeur inconnue pour « {nom} » : {valeur!r} "
+                             f"(valeurs admises : {', '.join(sorted(CHOIX[nom]))})")
+        if nom in BORNES and not BORNES[nom][0] <= valeur <= BORNES[nom][1]:
+            raise ValueError(f"« {nom} » doit être compris entre {BORNES[nom][0]} et {BORNES[nom][1]}.")
+        demande[nom] = valeur
+    for nom, defaut in (("temperatures", TEMPERATURE_DEFAUT), ("humidites", HUMIDITE_DEFAUT)):
+        valeurs = objet.get(nom, [])
+        if not isinstance(valeurs, list) or len(valeurs) > JOURS:
+            raise ValueError(f"« {nom} » doit être une liste d'au plus {JOURS} valeurs.")
+        try:
+            valeurs = [defaut if v is None else float(v) for v in valeurs]
+        except (TypeError, ValueError, OverflowError):
+            raise ValueError(f"Valeurs non numériques dans « {nom} ».") from None
+        if not all(map(math.isfinite, valeurs)):
+            raise ValueError(f"Valeurs non finies dans « {nom} ».")
+        minimum, maximum = BORNES_METEO[nom]
+        if not all(minimum <= v <= maximum for v in valeurs):
+            raise ValueError(f"Les valeurs de « {nom} » doivent être comprises entre {minimum:g} et {maximum:g}.")
+        demande[nom] = valeurs + [defaut] * (JOURS - len(valeurs))
+    tarif = objet.get("tarif", TARIF_ELECTRICITE)
+    if isinstance(tarif, bool) or not isinstance(tarif, (int, float)) or not 0 <= tarif < math.inf:
+        raise ValueError(f"Valeur invalide pour « tarif » : {tarif!r}")
+    demande["tarif"] = float(tarif)
+    return demande
+
+
+def simuler_demandes(demandes):
+    """Réponses (dictionnaires JSON) de demandes validées, simulées en un seul appel vectorisé."""
+    parametres = {nom: np.array([d[nom] for d in demandes], dtype=object if isinstance(defaut, str) else None)
+                  for nom, defaut in PARAMETRES.items()}
+    temp = np.array([d["temperatures"] for d in demandes])
+    humid = np.array([d["humidites"] for d in demandes])
+    tarif = np.array([d["tarif"] for d in demandes])[:, None]
+    resultats = simuler(temp, humid, **parametres)
+    normale = resultats["journaliere_normale"]
+    optimisee = resultats["journaliere_optimisee"]
+    economie = normale - optimisee
+    journalier = {
+        "normale_kwh": normale, "optimisee_kwh": optimisee,
+        "cout_normal_dzd": normale * tarif, "cout_optimise_dzd": optimisee * tarif,
+        "economie_kwh": economie, "economie_dzd": economie * tarif,
+    }
+    # Conversion en listes Python une fois pour tout le lot
+    jours = {nom: np.round(valeurs, 4).tolist() for nom, valeurs in journalier.items()}
+    totaux = {nom: np.round(valeurs.sum(axis=1), 4).tolist() for nom, valeurs in journalier.items()}
+    total_normal = normale.sum(axis=1)
+    pourcent = np.round(np.divide(economie.sum(axis=1) * 100, total_normal, out=np.zeros(len(demandes)),
+                                  where=total_normal > 0), 1).tolist()
+    return [{"jours": {nom: valeurs[i] for nom, valeurs in jours.items()},
+             "totaux": {nom: valeurs[i] for nom, valeurs in totaux.items()},
+             "economie_pourcent": pourcent[i]} for i in range(len(demandes))]
+
+
+class LotsSimulation:
+    """Regroupe les demandes reçues pendant ``fenetre_s`` et les simule d'un bloc (boucle asyncio courante)."""
+
+    def __init__(self, fenetre_s=FENETRE_S, taille_lot=TAILLE_LOT, attente_max=ATTENTE_MAX):
+        self.fenetre_s = fenetre_s
+        self.taille_lot = taille_lot
+        self.attente_max = attente_max
+        self._attente = []
+        self._minuteur = None
+        self.compteurs = {"simulations": 0, "lots": 0, "rejets": 0}
+
+    async def simuler(self, demande):
+        """Réponse d'une demande validée, simulée avec les autres demandes de sa fenêtre."""
+        if len(self._attente) >= self.attente_max:
+            self.compteurs["rejets"] += 1
+            raise Surcharge()
+        futur = asyncio.get_running_loop().create_future()
+        self._attente.append((demande, futur))
+        if len(self._attente) >= self.taille_lot:
+            self._vider()
+        elif self._minuteur is None:
+            self._minuteur = asyncio.get_running_loop().call_later(self.fenetre_s, self._vider)
+        return await futur
+
+    def _vider(self):
+        if self._minuteur is not None:
+            self._minuteur.cancel()
+            self._minuteur = None
+        lot, self._attente = self._attente[:self.taille_lot], self._attente[self.taille_lot:]
+        if self._attente:
+            self._minuteur = asyncio.get_running_loop().call_soon(self._vider)
+        # Demande annulée entre-temps (arrêt du serveur) : elle n'est pas simulée
+        lot = [(demande, futur) for demande, futur in lot if not futur.done()]
+        if not lot:
+            return
+        try:
+            reponses = simuler_demandes([demande for demande, _ in lot])
+        except Exception as e:
+            for _, futur in lot:
+                futur.set_exception(e)
+            return
+        self.compteurs["simulations"] += len(lot)
+        self.compteurs["lots"] += 1
+        for (_, futur), reponse in zip(lot, reponses):
+            futur.set_result(reponse)
+
+    def etat(self):
+        lots = self.compteurs["lots"]
+        return {**self.compteurs, "en_attente": len(self._attente),
+                "taille_moyenne_lot": round(self.compteurs["simulations"] / lots, 1) if lots else 0.0}
+
+
+class ServiceSimulation:
+    """Serveur HTTP/1.1 minimal (connexions persistantes) des simulations."""
+
+    def __init__(self, lots=None, cache_meteo=None):
+        self.lots = lots or LotsSimulation()
+        self.connexions = 0
+        self._cache_meteo = cache_meteo
+
+    def metriques(self):
+        """Texte Prometheus : compteurs du service puis ceux de ``metriques.exposition``."""
+        if self._cache_meteo is None:
+            try:
+                # Même base que l'application : ses compteurs sont communs à tous les processus
+                self._cache_meteo = CacheMeteo()
+            except (OSError, sqlite3.Error):
+                pass
+        lignes = []
+        for nom, valeur in {**self.lots.etat(), "connexions": self.connexions}.items():
+            type_metrique = "counter" if nom in self.lots.compteurs else "gauge"
+            lignes.append(f"# TYPE service_{nom} {type_metrique}")
+            lignes.append(f"service_{nom} {valeur}")
+        return "\n".join(lignes) + "\n" + metriques.exposition(self._cache_meteo)
+
+    async def traiter(self, methode, chemin, corps):
+        """Statut et objet JSON de la réponse à une requête."""
+        chemin = chemin.split("?", 1)[0]
+        if chemin == "/sante":
+            if methode != "GET":
+                return 405, {"erreur": "Méthode non autorisée."}
+            return 200, {"statut": "ok", "connexions": self.connexions, **self.lots.etat()}
+        if chemin == metriques.CHEMIN:
+            if methode != "GET":
+                return 405, {"erreur": "Méthode non autorisée."}
+            # Lecture de la base SQLite du cache météo hors de la boucle asyncio
+            return 200, await asyncio.to_thread(self.metriques)
+        if chemin != "/simulation":
+            return 404, {"erreur": "Ressource inconnue."}
+        if methode != "POST":
+            return 405, {"erreur": "Méthode non autorisée."}
+        try:
+            objet = lire_json(corps)
+            if isinstance(objet, list):
+                if len(objet) > DEMANDES_MAX_PAR_LISTE:
+                    return 413, {"erreur": f"Au plus {DEMANDES_MAX_PAR_LISTE} demandes par liste."}
+                demandes = [lire_demande(o) for o in objet]
+                return 200, simuler_demandes(demandes) if demandes else []
+            return 200, await self.lots.simuler(lire_demande(objet))
+        except ValueError as e:  # y compris JSON invalide
+            return 400, {"erreur": str(e)}
+        except Surcharge:
+            return 503, {"erreur": "Service surchargé, réessayez plus tard."}
+
+    @staticmethod
+    def reponse(statut, objet, garder):
+        # Un texte (métriques) est servi tel quel, tout autre objet en JSON
+        if isinstance(objet, str):
+            corps, type_contenu = objet.encode("utf-8"), metriques.TYPE_CONTENU
+        else:
+            corps = json.dumps(objet, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            type_contenu = "application/json; charset=utf-8"
+        entetes = [f"HTTP/1.1 {statut} {STATUTS[statut]}", f"Content-Type: {type_contenu}",
+                   f"Content-Length: {len(corps)}", "Connection: " + ("keep-alive" if garder else "close")]
+        if statut == 503:
+            entetes.append("Retry-After: 1")
+        return ("\r\n".join(entetes) + "\r\n\r\n").encode("latin-1") + corps
+
+    async def connexion(self, lecteur, ecrivain):
+        """Requêtes successives d'une connexion, jusqu'à sa fermeture ou son inactivité."""
+        self.connexions += 1
+        try:
+            while True:
+                try:
+                    entete = await asyncio.wait_for(lecteur.readuntil(b"\r\n\r\n"), DELAI_INACTIVITE)
+                except asyncio.LimitOverrunError:
+                    ecrivain.write(self.reponse(431, {"erreur": "En-têtes trop longs."}, False))
+                    break
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    break
+                lignes = entete.decode("latin-1").split("\r\n")
+                try:
+                    methode, chemin, version = lignes[0].split(" ", 2)
+                except ValueError:
+                    ecrivain.write(self.reponse(400, {"erreur": "Requête HTTP invalide."}, False))
+                    break
+                champs = {}
+                for ligne in lignes[1:]:
+                    nom, _, valeur = ligne.partition(":")
+                    champs[nom.strip().lower()] = valeur.strip()
+                connexion = champs.get("connection", "").lower()
+                garder = connexion == "keep-alive" or (version == "HTTP/1.1" and connexion != "close")
+                if "transfer-encoding" in champs:
+                    ecrivain.write(self.reponse(411, {"erreur": "Content-Length requis."}, False))
+                    break
+                try:
+                    longueur = int(champs.get("content-length") or 0)
+                except ValueError:
+                    longueur = -1
+                if not 0 <= longueur <= TAILLE_MAX_CORPS:
+                    ecrivain.write(self.reponse(413, {"erreur": "Corps de requête invalide ou trop long."}, False))
+                    break
+                try:
+                    corps = await lecteur.readexactly(longueur) if longueur else b""
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                statut, objet = await self.traiter(methode, chemin, corps)
+                ecrivain.write(self.reponse(statut, objet, garder))
+                # Contre-pression : la requête suivante n'est lue qu'une fois la réponse transmise
+                await ecrivain.drain()
+                if not garder:
+                    break
+        except (ConnectionError, asyncio.CancelledError):
+            pass  # client parti ou arrêt du serveur
+        finally:
+            self.connexions -= 1
+            ecrivain.close()
+            with contextlib.suppress(ConnectionError):
+                await ecrivain.wait_closed()
+
+    async def demarrer(self, hote="127.0.0.1", port=8502):
+        """Serveur asyncio à l'écoute (``asyncio.Server``)."""
+        return await asyncio.start_server(self.connexion, hote, port, limit=64 * 1024, backlog=1024)
+
+
+async def servir(hote, port, fenetre_s=FENETRE_S, taille_lot=TAILLE_LOT):
+    serveur = await ServiceSimulation(LotsSimulation(fenetre_s, taille_lot)).demarrer(hote, port)
+    sys.stderr.write(f"Service de simulation à l'écoute sur http://{hote}:{port}/simulation\n")
+    async with serveur:
+        await serveur.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Service HTTP de simulation de la consommation (7 jours).")
+    parser.add_argument("--hote", default="127.0.0.1", help="Adresse d'écoute (défaut : 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8502, help="Port d'écoute (défaut : 8502)")
+    parser.add_argument("--fenetre-ms", type=float, default=FENETRE_S * 1e3,
+                        help="Fenêtre de regroupement des demandes simultanées (ms)")
+    parser.add_argument("--taille-lot", type=int, default=TAILLE_LOT, help="Nombre maximal de demandes par lot")
+    args = parser.parse_args(argv)
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(servir(args.hote, args.port, args.fenetre_ms / 1e3, args.taille_lot))
+
+
+if __name__ == "__main__":
+    main()
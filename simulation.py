@@ -0,0 +1,218 @@
+"""Moteur de simulation vectorisé (NumPy) de la consommation d'un climatiseur.
+
+Reprend exactement le modèle de la section 3 de ``script3.py`` (scénario normal
+vs optimisé) mais calcule toutes les heures de tous les jours en une seule passe
+sur des tableaux ``(..., jours, 24)``. Tous les paramètres peuvent être des
+scalaires ou des tableaux : ils sont diffusés (broadcasting) sur les dimensions
+de tête, ce qui permet de simuler plusieurs scénarios en un seul appel.
+"""
+import numpy as np
+
+# Tarif de l'électricité (DZD par kWh) - constant
+TARIF_ELECTRICITE = 5  # 5 DZD/kWh
+
+HEURES = 24
+# Heure du pic de chaleur autour de laquelle on centre la plage d'utilisation
+HEURE_PIC = 15
+# Plage approximative de fort ensoleillement (incluse)
+HEURES_SOLEIL = (10, 16)
+# Écart jour/nuit supposé autour de la température moyenne du jour
+AMPLITUDE_JOUR = 5.0
+# Écart de température (°C) nécessitant 100% de la puissance de la clim
+ECART_PLEINE_CHARGE = 10.0
+# Surcharge de déshumidification par point d'humidité au-delà du seuil (%)
+COEFFICIENT_HUMIDITE = 0.001
+SEUIL_HUMIDITE = 50.0
+# Valeurs utilisées quand la météo d'un jour est inconnue
+TEMPERATURE_DEFAUT = 25.0
+HUMIDITE_DEFAUT = 50.0
+
+# Facteurs multiplicatifs appliqués à l'écart de température (valeur par défaut si absente)
+FACTEURS_ISOLATION = {"Bonne": 0.8, "Faible": 1.2}
+FACTEURS_VITRAGE = {"Simple vitrage": 1.1}
+FACTEUR_VITRAGE_DEFAUT = 0.95  # double vitrage
+FACTEURS_ORIENTATION = {"Sud": 1.1, "Ouest": 1.1, "Est": 1.05, "Nord": 0.95}
+FACTEURS_APPAREILS = {"Oui, quelques-uns": 1.1, "Oui, plusieurs": 1.2}
+FACTEURS_ENTRETIEN = {"Tous les 2 ans": 1.05, "Plus rare (> 2 ans)": 1.10}
+
+
+def facteur(valeurs, table, defaut=1.0):
+    """Convertit une valeur (ou un tableau de valeurs) catégorielle en facteur numérique."""
+    valeurs = np.asarray(valeurs, dtype=object)
+    if valeurs.ndim == 0:
+        return np.float64(table.get(valeurs.item(), defaut))
+    return np.array([table.get(v, defaut) for v in valeurs.ravel()],
+                    dtype=np.float64).reshape(valeurs.shape)
+
+
+def plage_utilisation(heures_utilisation):
+    """Heures de début et de fin (incluses) de la plage d'utilisation quotidienne."""
+    X = np.minimum(np.asarray(heures_utilisation).astype(np.int64), HEURES)
+    # Usage <= 12h : plage centrée sur le pic de chaleur, décalée si elle dépasse minuit
+    debut_court = np.maximum(0, HEURE_PIC - X // 2)
+    fin_court = debut_court + X - 1
+    deborde = fin_court > HEURES - 1
+    fin_court = np.where(deborde, HEURES - 1, fin_court)
+    debut_court = np.where(deborde, fin_court - X + 1, debut_court)
+    # Usage > 12h : la plage s'étend jusqu'à la fin de la journée
+    debut_long = np.maximum(0, HEURES - X)
+    court = X <= 12
+    debut = np.where(court, debut_court, debut_long)
+    fin = np.where(court, fin_court, HEURES - 1)
+    return debut, fin
+
+
+def masque_occupation(heures_utilisation):
+    """Masque booléen ``(..., 24)`` des heures où le climatiseur est allumé."""
+    debut, fin = plage_utilisation(heures_utilisation)
+    h = np.arange(HEURES)
+    return (h >= debut[..., None]) & (h <= fin[..., None])
+
+
+def profil_triangulaire():
+    """Poids ``(24,)`` du modèle jour/nuit : 0 au minimum (nuit), 1 au maximum (15h)."""
+    h = np.arange(HEURES, dtype=np.float64)
+    montee = (h - 6) / (HEURE_PIC - 6)
+    descente = 1 - (h - HEURE_PIC) / (HEURES - HEURE_PIC)
+    return np.where(h < 6, 0.0, np.where(h <= HEURE_PIC, montee, descente))
+
+
+PROFIL_JOUR = profil_triangulaire()
+MASQUE_SOLEIL = (np.arange(HEURES) >= HEURES_SOLEIL[0]) & (np.arange(HEURES) <= HEURES_SOLEIL[1])
+
+
+def courbe_temperature(temp_jour):
+    """Températures extérieures ``(..., jours, 24)`` à partir des moyennes journalières."""
+    temp_jour = np.asarray(temp_jour, dtype=np.float64)
+    t_min = temp_jour - AMPLITUDE_JOUR
+    return t_min[..., None] + 2 * AMPLITUDE_JOUR * PROFIL_JOUR
+
+
+def facteur_charge(type_vitrage="Double vitrage", orientation="Sud", presence_appareils="Aucun",
+                   nbr_personnes=1, hauteur=2.5, isolation="Moyenne"):
+    """Facteur ``(..., 24)`` appliqué à l'écart de température, constant pendant une simulation."""
+    fixe = (facteur(isolation, FACTEURS_ISOLATION)
+            * facteur(type_vitrage, FACTEURS_VITRAGE, FACTEUR_VITRAGE_DEFAUT)
+            * facteur(presence_appareils, FACTEURS_APPAREILS)
+            * (1 + 0.05 * np.maximum(0, np.asarray(nbr_personnes) - 1)))
+    hauteur = np.asarray(hauteur, dtype=np.float64)
+    fixe = fixe * np.where(hauteur > 0, hauteur / 2.5, 1.0)
+    soleil = np.where(MASQUE_SOLEIL, facteur(orientation, FACTEURS_ORIENTATION)[..., None], 1.0)
+    return np.asarray(fixe)[..., None] * soleil
+
+
+def facteur_appareil(est_inverter=True, age=5, frequence_entretien="Annuel"):
+    """Facteur lié à la technologie, à l'âge et à l'entretien du climatiseur."""
+    techno = np.where(np.asarray(est_inverter, dtype=bool), 0.95, 1.05)
+    inefficacite = (1 + 0.01 * np.minimum(np.asarray(age), 20)) * facteur(frequence_entretien, FACTEURS_ENTRETIEN)
+    return techno * inefficacite
+
+
+def facteur_humidite(humid_jour):
+    """Surcharge de déshumidification : +0.1% par point d'humidité au-delà de 50%."""
+    humid_jour = np.asarray(humid_jour, dtype=np.float64)
+    return np.where(humid_jour > SEUIL_HUMIDITE, 1 + COEFFICIENT_HUMIDITE * (humid_jour - SEUIL_HUMIDITE), 1.0)
+
+
+def preparer(consommation_kw=1.0, est_inverter=True, age=5, frequence_entretien="Annuel", heures_utilisation=8,
+             hauteur=2.5, type_vitrage="Double vitrage", orientation="Sud", presence_appareils="Aucun",
+             nbr_personnes=1, temp_confort=24, isolation="Moyenne"):
+    """Facteurs d'une simulation qui ne dépendent pas de la météo (paramètres de ``simuler_horaire``).
+
+    Calculés une fois, ils peuvent être réutilisés par ``simuler_prepare`` pour
+    plusieurs météos (ex. pièces d'un bâtiment, cf. ``batiment.py``).
+    """
+    def tete(valeur):
+        # Ajoute les axes jours et heures à un paramètre de scénario
+        return np.asarray(valeur, dtype=np.float64)[..., None, None]
+
+    return {
+        "confort": tete(temp_confort),
+        "charge": facteur_charge(type_vitrage, orientation, presence_appareils,
+                                 nbr_personnes, hauteur, isolation)[..., None, :],
+        "appareil": tete(facteur_appareil(est_inverter, age, frequence_entretien)),
+        "masque": masque_occupation(heures_utilisation)[..., None, :],
+        "puissance": tete(consommation_kw),
+    }
+
+
+def simuler_prepare(temp_ext, humid, facteurs):
+    """``simuler_horaire`` avec des facteurs déjà calculés par ``preparer``."""
+    temp_ext = np.asarray(temp_ext, dtype=np.float64)
+    humid = facteur_humidite(humid)
+    masque = facteurs["masque"]
+    puissance = facteurs["puissance"]
+
+    # Calcul en place dans un seul tableau de la forme finale : sur de grands tableaux
+    # (ex. centaines de pièces), chaque temporaire coûte une allocation et ses défauts de page
+    forme = np.broadcast_shapes(temp_ext.shape, humid.shape, masque.shape, np.shape(facteurs["confort"]),
+                                np.shape(facteurs["charge"]), np.shape(facteurs["appareil"]), np.shape(puissance))
+    horaire_optimisee = np.empty(forme)
+    np.subtract(temp_ext, facteurs["confort"], out=horaire_optimisee)
+    np.maximum(horaire_optimisee, 0.0, out=horaire_optimisee)
+    horaire_optimisee *= facteurs["charge"]
+    horaire_optimisee *= humid
+    horaire_optimisee /= ECART_PLEINE_CHARGE
+    # Écart positif et facteurs positifs : seule la borne haute de [0, 1] peut être atteinte
+    np.minimum(horaire_optimisee, 1.0, out=horaire_optimisee)
+    horaire_optimisee *= facteurs["appareil"]
+    np.minimum(horaire_optimisee, 1.0, out=horaire_optimisee)  # facteur d'utilisation
+    horaire_optimisee *= puissance
+    np.copyto(horaire_optimisee, 0.0, where=~masque)
+
+    # Le scénario normal ne dépend pas de la météo : même profil (et même total) chaque jour
+    profil_normal = np.where(masque, puissance, 0.0)
+    return {
+        # Force la forme complète même si certains paramètres sont scalaires
+        "horaire_normale": np.broadcast_to(profil_normal, forme),
+        "horaire_optimisee": horaire_optimisee,
+        "journaliere_normale": np.broadcast_to(profil_normal.sum(axis=-1), forme[:-1]),
+        "journaliere_optimisee": horaire_optimisee.sum(axis=-1),
+    }
+
+
+def simuler_horaire(temp_ext, humid=HUMIDITE_DEFAUT, consommation_kw=1.0, est_inverter=True, age=5,
+                    frequence_entretien="Annuel", heures_utilisation=8, hauteur=2.5,
+                    type_vitrage="Double vitrage", orientation="Sud", presence_appareils="Aucun",
+                    nbr_personnes=1, temp_confort=24, isolation="Moyenne"):
+    """Simule les scénarios normal et optimisé à partir de températures extérieures horaires.
+
+    ``temp_ext`` a la forme ``(..., jours, 24)`` ; ``humid`` est diffusable vers
+    cette forme (humidité horaire, ou journalière de forme ``(..., jours, 1)``).
+    Les autres paramètres ont la forme des dimensions de tête ``(...)`` (ou sont
+    scalaires). Retourne un dictionnaire de tableaux : consommations horaires
+    ``(..., jours, 24)`` en kW et journalières ``(..., jours)`` en kWh.
+    """
+    facteurs = preparer(consommation_kw, est_inverter, age, frequence_entretien, heures_utilisation, hauteur,
+                        type_vitrage, orientation, presence_appareils, nbr_personnes, temp_confort, isolation)
+    return simuler_prepare(temp_ext, humid, facteurs)
+
+
+def simuler(temp_jour, humid_jour=HUMIDITE_DEFAUT, **parametres):
+    """Simule les scénarios normal et optimisé à partir des moyennes journalières.
+
+    ``temp_jour`` et ``humid_jour`` ont la forme ``(..., jours)`` ; la courbe
+    horaire est reconstituée par le modèle triangulaire jour/nuit. Les autres
+    paramètres sont ceux de ``simuler_horaire``.
+    """
+    humid_jour = np.asarray(humid_jour, dtype=np.float64)[..., None]
+    return simuler_horaire(courbe_temperature(temp_jour), humid_jour, **parametres)
+
+
+def meteo_depuis_previsions(previsions_jours, jours=7):
+    """Températures et humidités moyennes ``(jours,)`` depuis la table de prévisions de l'application.
+
+    Les jours absents ou illisibles reçoivent les valeurs par défaut (20-30 °C, 50%).
+    """
+    temp = np.full(jours, TEMPERATURE_DEFAUT)
+    humid = np.full(jours, HUMIDITE_DEFAUT)
+    for i, jour in enumerate(previsions_jours[:jours]):
+        try:
+            temp[i] = float(jour["Température (°C)"])
+        except (KeyError, TypeError, ValueError):
+            pass
+        try:
+            humid[i] = float(jour["Humidité (%)"])
+        except (KeyError, TypeError, ValueError):
+            pass
+    return temp, humid
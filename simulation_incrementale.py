@@ -0,0 +1,53 @@
+"""Simulation incrémentale : seuls les jours dont les entrées ont changé sont recalculés.
+
+Les résultats d'un jour ne dépendent que de sa météo (température et humidité
+moyennes) et des paramètres globaux (climatiseur, pièce, occupation). Les
+résultats de la simulation précédente sont donc conservés jour par jour :
+
+- modifier la météo d'un jour ne simule que ce jour ;
+- modifier un paramètre global (ou le nombre de jours) resimule tous les
+  jours en une seule passe vectorisée ;
+- les totaux sont mis à jour par différence sur les jours modifiés.
+"""
+import numpy as np
+
+from simulation import simuler
+
+
+class SimulationIncrementale:
+    """Derniers résultats de ``simulation.simuler``, recalculés jour par jour (une instance par session)."""
+
+    def __init__(self):
+        self._parametres = None
+        self._meteo = None
+        self._resultats = None
+        self.totaux = np.zeros(2)
+        self.jours_recalcules = np.zeros(0, dtype=np.int64)
+
+    def simuler(self, temp_jour, humid_jour, **parametres):
+        """Même résultat que ``simulation.simuler`` pour des moyennes journalières ``(jours,)``.
+
+        ``jours_recalcules`` donne ensuite les indices des jours effectivement
+        simulés, et ``totaux`` les consommations totales normale et optimisée (kWh).
+        """
+        meteo = np.stack(np.broadcast_arrays(np.asarray(temp_jour, dtype=np.float64).ravel(),
+                                             np.asarray(humid_jour, dtype=np.float64).ravel()))
+        if (parametres != self._parametres or self._meteo is None
+                or self._meteo.shape != meteo.shape):
+            resultats = simuler(meteo[0], meteo[1], **parametres)
+            self._resultats = {cle: np.array(valeur) for cle, valeur in resultats.items()}
+            self.jours_recalcules = np.arange(meteo.shape[1])
+            self.totaux = np.array([self._resultats["journaliere_normale"].sum(),
+                                    self._resultats["journaliere_optimisee"].sum()])
+        else:
+            self.jours_recalcules = np.flatnonzero((meteo != self._meteo).any(axis=0))
+            if len(self.jours_recalcules):
+                j = self.jours_recalcules
+                resultats = simuler(meteo[0, j], meteo[1, j], **parametres)
+                self.totaux = self.totaux + np.array([
+                    (resultats["journaliere_normale"] - self._resultats["journaliere_normale"][j]).sum(),
+                    (resultats["journaliere_optimisee"] - self._resultats["journaliere_optimisee"][j]).sum()])
+                for cle, valeur in resultats.items():
+                    self._resultats[cle][j] = valeur
+        self._parametres, self._meteo = dict(parametres), meteo
+        return self._resultats
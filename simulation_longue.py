@@ -0,0 +1,178 @@
+"""Simulation longue durée (saison, année, plusieurs années) sur données météo horaires.
+
+Le fichier météo (année type TMY au format EPW, ou CSV horaire historique) est
+lu par blocs de jours complets et chaque bloc est simulé en une passe
+vectorisée avec ``simulation.simuler_horaire``. Les totaux journaliers,
+mensuels et saisonniers sont agrégés au fil de l'eau : la mémoire utilisée ne
+dépend pas de la durée simulée.
+
+Formats acceptés :
+
+- EPW (EnergyPlus Weather) : 8 lignes d'en-tête puis une ligne par heure
+  (année, mois, jour, heure 1-24, ..., température sèche en colonne 7,
+  humidité relative en colonne 9) ;
+- CSV avec une colonne date/heure (``date_heure``) et les colonnes
+  ``temperature`` (°C) et ``humidite`` (%, optionnelle).
+"""
+import numpy as np
+import pandas as pd
+
+from simulation import HEURES, HUMIDITE_DEFAUT, TARIF_ELECTRICITE, simuler_horaire
+
+# Nombre de jours lus et simulés par bloc
+JOURS_PAR_BLOC = 92
+SAISONS = {12: "Hiver", 1: "Hiver", 2: "Hiver", 3: "Printemps", 4: "Printemps", 5: "Printemps",
+           6: "Été", 7: "Été", 8: "Été", 9: "Automne", 10: "Automne", 11: "Automne"}
+# Colonnes EPW (indices à partir de 0)
+EPW_ANNEE, EPW_MOIS, EPW_JOUR, EPW_HEURE, EPW_TEMPERATURE, EPW_HUMIDITE = 0, 1, 2, 3, 6, 8
+EPW_LIGNES_ENTETE = 8
+
+
+def _lignes_horaires(source, taille_bloc, colonne_date, colonne_temperature, colonne_humidite):
+    """Itère sur des triplets de tableaux (``datetime64[h]``, température, humidité) lus par blocs."""
+    nom = getattr(source, "name", source)
+    if isinstance(nom, str) and nom.lower().endswith(".epw"):
+        debuts_mois = None
+        for bloc in pd.read_csv(source, skiprows=EPW_LIGNES_ENTETE, header=None, chunksize=taille_bloc,
+                                usecols=[EPW_ANNEE, EPW_MOIS, EPW_JOUR, EPW_HEURE, EPW_TEMPERATURE, EPW_HUMIDITE]):
+            if debuts_mois is None:
+                # Une année type mélange des mois d'années différentes : on la ramène à une seule année
+                annee = int(bloc[EPW_ANNEE].iloc[0])
+                debuts_mois = np.array([np.datetime64(f"{annee}-{m:02d}-01", "D") for m in range(1, 13)])
+            jours = debuts_mois[bloc[EPW_MOIS].to_numpy() - 1] + (bloc[EPW_JOUR].to_numpy() - 1)
+            heures = jours.astype("datetime64[h]") + (bloc[EPW_HEURE].to_numpy() - 1)
+            yield (heures, bloc[EPW_TEMPERATURE].to_numpy(dtype=np.float64),
+                   bloc[EPW_HUMIDITE].to_numpy(dtype=np.float64))
+    else:
+        for bloc in pd.read_csv(source, chunksize=taille_bloc):
+            humidite = (pd.to_numeric(bloc[colonne_humidite], errors="coerce").to_numpy()
+                        if colonne_humidite in bloc else np.full(len(bloc), HUMIDITE_DEFAUT))
+            yield (pd.to_datetime(bloc[colonne_date]).to_numpy().astype("datetime64[h]"),
+                   pd.to_numeric(bloc[colonne_temperature], errors="coerce").to_numpy(), humidite)
+
+
+def _jours_complets(heures, temperature, humidite):
+    """Range des valeurs horaires dans des tableaux ``(jours, 24)`` indexés par date.
+
+    Les heures manquantes d'un jour sont complétées par interpolation.
+    """
+    jours = heures.astype("datetime64[D]")
+    dates, indice_jour = np.unique(jours, return_inverse=True)
+    indice_heure = (heures - jours).astype(np.int64)
+    grilles = []
+    for valeurs in (temperature, humidite):
+        grille = np.full((len(dates), HEURES), np.nan)
+        grille[indice_jour, indice_heure] = valeurs
+        if np.isnan(grille).any():
+            grille = pd.DataFrame(grille).interpolate(axis=1, limit_direction="both").to_numpy()
+        grilles.append(grille)
+    grilles[1] = np.where(np.isnan(grilles[1]), HUMIDITE_DEFAUT, grilles[1])
+    return pd.DatetimeIndex(dates), grilles[0], grilles[1]
+
+
+def blocs_meteo(source, jours_par_bloc=JOURS_PAR_BLOC, colonne_date="date_heure",
+                colonne_temperature="temperature", colonne_humidite="humidite"):
+    """Itère sur ``(dates, temperature (jours, 24), humidite (jours, 24))`` par blocs de jours complets."""
+    reste = None
+    for bloc in _lignes_horaires(source, jours_par_bloc * HEURES, colonne_date,
+                                 colonne_temperature, colonne_humidite):
+        if reste is not None:
+            bloc = tuple(np.concatenate([r, b]) for r, b in zip(reste, bloc))
+        # Le dernier jour du bloc peut être incomplet : il est reporté au bloc suivant
+        complet = bloc[0] < bloc[0][-1].astype("datetime64[D]")
+        reste = tuple(v[~complet] for v in bloc)
+        if complet.any():
+            yield _jours_complets(*(v[complet] for v in bloc))
+    if reste is not None and len(reste[0]):
+        yield _jours_complets(*reste)
+
+
+class Agregateur:
+    """Totaux de consommation par jour, mois et saison, cumulés bloc par bloc."""
+
+    def __init__(self, garder_journalier=True, garder_horaire=False):
+        self.garder_journalier = garder_journalier
+        self.garder_horaire = garder_horaire
+        self.journalier = []
+        self.horaire = []
+        self.mensuel = {}
+        self.saisonnier = {}
+        self.total = np.zeros(2)
+
+    def ajouter(self, dates, normale, optimisee, horaire_normale=None, horaire_optimisee=None):
+        """``normale`` et ``optimisee`` : consommations journalières (kWh) des ``dates``.
+
+        ``horaire_normale`` et ``horaire_optimisee`` ``(jours, 24)`` sont gardées si ``garder_horaire``.
+        """
+        valeurs = np.stack([normale, optimisee], axis=-1)
+        mois = dates.to_period("M")
+        for periode in mois.unique():
+            masque = np.asarray(mois == periode)
+            self.mensuel[periode] = self.mensuel.get(periode, 0) + valeurs[masque].sum(axis=0)
+        saisons = np.array([SAISONS[m] for m in dates.month])
+        for saison in np.unique(saisons):
+            self.saisonnier[saison] = self.saisonnier.get(saison, 0) + valeurs[saisons == saison].sum(axis=0)
+        self.total += valeurs.sum(axis=0)
+        if self.garder_journalier:
+            self.journalier.append(pd.DataFrame({"Date": dates, "Consommation normale (kWh)": normale,
+                                                 "Consommation optimisée (kWh)": optimisee}))
+        if self.garder_horaire:
+            heures = (dates.values[:, None] + np.arange(HEURES) * np.timedelta64(1, "h")).ravel()
+            self.horaire.append(pd.DataFrame({
+                "Consommation normale (kW)": np.broadcast_to(horaire_normale, (len(dates), HEURES)).ravel(),
+                "Consommation optimisée (kW)": np.asarray(horaire_optimisee).ravel(),
+            }, index=pd.DatetimeIndex(heures, name="Heure")))
+
+    @staticmethod
+    def _tableau(totaux, nom_index, tarif):
+        df = pd.DataFrame.from_dict(totaux, orient="index",
+                                    columns=["Consommation normale (kWh)", "Consommation optimisée (kWh)"])
+        df.index.name = nom_index
+        df["Économie (kWh)"] = df["Consommation normale (kWh)"] - df["Consommation optimisée (kWh)"]
+        df["Économie (DZD)"] = df["Économie (kWh)"] * tarif
+        return df
+
+    def resultats(self, tarif=TARIF_ELECTRICITE):
+        mensuel = self._tableau(self.mensuel, "Mois", tarif)
+        mensuel.index = mensuel.index.astype(str)
+        saisons = [s for s in ("Hiver", "Printemps", "Été", "Automne") if s in self.saisonnier]
+        return {
+            "journalier": (pd.concat(self.journalier, ignore_index=True) if self.journalier else None),
+            "horaire": (pd.concat(self.horaire) if self.horaire else None),
+            "mensuel": mensuel,
+            "saisonnier": self._tableau(self.saisonnier, "Saison", tarif).loc[saisons],
+            "total_normale_kwh": float(self.total[0]),
+            "total_optimisee_kwh": float(self.total[1]),
+        }
+
+
+def simuler_periode(source, tarif=TARIF_ELECTRICITE, jours_par_bloc=JOURS_PAR_BLOC, garder_journalier=True,
+                    colonnes=None, garder_horaire=False, **parametres):
+    """Simule toute la période couverte par un fichier météo horaire.
+
+    ``parametres`` sont les paramètres (scalaires) de ``simulation.simuler_horaire``.
+    ``colonnes`` permet de renommer les colonnes d'un CSV (``colonne_date``,
+    ``colonne_temperature``, ``colonne_humidite``). Avec ``garder_horaire``,
+    les consommations horaires de toute la période sont aussi rendues
+    (« horaire », indexé par heure), par exemple pour les graphiques.
+    """
+    agregateur = Agregateur(garder_journalier, garder_horaire)
+    for dates, temperature, humidite in blocs_meteo(source, jours_par_bloc, **(colonnes or {})):
+        resultats = simuler_horaire(temperature, humidite, **parametres)
+        agregateur.ajouter(dates, resultats["journaliere_normale"], resultats["journaliere_optimisee"],
+                           resultats["horaire_normale"], resultats["horaire_optimisee"])
+    return agregateur.resultats(tarif)
+
+
+def simuler_villes(sources, tarif=TARIF_ELECTRICITE, **parametres):
+    """Totaux annuels (ou de la période) par ville ; ``sources`` associe une ville à son fichier météo."""
+    lignes = {}
+    for ville, source in sources.items():
+        resultats = simuler_periode(source, tarif=tarif, garder_journalier=False, **parametres)
+        lignes[ville] = (resultats["total_normale_kwh"], resultats["total_optimisee_kwh"])
+    df = pd.DataFrame.from_dict(lignes, orient="index",
+                                columns=["Consommation normale (kWh)", "Consommation optimisée (kWh)"])
+    df.index.name = "Ville"
+    df["Économie (kWh)"] = df["Consommation normale (kWh)"] - df["Consommation optimisée (kWh)"]
+    df["Économie (DZD)"] = df["Économie (kWh)"] * tarif
+    return df
@@ -0,0 +1,260 @@
+"""Simulation en lot (sans interface) d'un portefeuille de foyers / climatiseurs.
+
+Lit un fichier CSV ou Parquet (une ligne par foyer, colonnes des sections 1 et 2
+de l'application), simule chaque ligne avec le même modèle que ``script3.py`` et
+écrit les résultats au fil de l'eau. La météo d'une ligne vient de ses colonnes
+``temp_1..temp_7`` / ``hum_1..hum_7`` si elles sont renseignées, sinon des
+normales climatiques de sa ``ville`` à partir de ``--debut`` (comme le repli
+hors ligne de l'application), sinon des valeurs constantes ``--temperature``
+et ``--humidite``. Les lignes sont lues par blocs et réparties
+sur un pool de processus ; le nombre de blocs en vol est borné pour que la
+mémoire reste constante quelle que soit la taille du fichier.
+
+Exemple ::
+
+    python simulation_lot.py foyers.csv resultats.csv --processus 8 --taille-bloc 20000
+"""
+import argparse
+import collections
+import datetime
+import functools
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import normales
+from simulation import HUMIDITE_DEFAUT, TARIF_ELECTRICITE, TEMPERATURE_DEFAUT, meteo_depuis_previsions, simuler
+
+JOURS = 7
+# Colonne du fichier -> (paramètre de simulation, valeur par défaut de l'application)
+COLONNES = {
+    "conso": ("consommation_kw", 1.0),
+    "inverter": ("est_inverter", True),
+    "age": ("age", 5),
+    "entretien": ("frequence_entretien", "Annuel"),
+    "heures": ("heures_utilisation", 8),
+    "hauteur": ("hauteur", 2.5),
+    "vitrage": ("type_vitrage", "Double vitrage"),
+    "orientation": ("orientation", "Sud"),
+    "appareils": ("presence_appareils", "Aucun"),
+    "personnes": ("nbr_personnes", 1),
+    "confort": ("temp_confort", 24),
+    "isolation": ("isolation", "Moyenne"),
+}
+# Colonnes météo optionnelles : temp_1..temp_7 (°C) et hum_1..hum_7 (%)
+COLONNES_TEMP = [f"temp_{j + 1}" for j in range(JOURS)]
+COLONNES_HUM = [f"hum_{j + 1}" for j in range(JOURS)]
+# Colonnes recopiées telles quelles dans le fichier de sortie (si présentes)
+COLONNES_CONTEXTE = ["id", "ville", "surface", "froid", "type_piece"]
+
+VALEURS_NON_INVERTER = {"non", "non-inverter", "non inverter", "false", "faux", "0", "no"}
+
+
+def inverter_booleen(valeurs):
+    """Interprète la colonne ``inverter`` (booléens, 0/1 ou libellés « Inverter » / « Non-inverter »)."""
+    if valeurs.dtype == bool:
+        return valeurs.to_numpy()
+    texte = valeurs.astype(str).str.strip().str.lower()
+    return ~texte.isin(VALEURS_NON_INVERTER).to_numpy()
+
+
+@functools.lru_cache(maxsize=None)
+def meteo_ville(ville, debut):
+    """Températures et humidités ``(7,)`` des normales de ``ville`` à partir de ``debut`` ; None si ville inconnue.
+
+    Calculées une fois par ville et par processus, puis partagées par toutes les lignes des blocs.
+    """
+    if not normales.disponible(ville):
+        return None
+    return meteo_depuis_previsions(normales.previsions_normales(ville, debut, JOURS), jours=JOURS)
+
+
+def meteo_bloc(bloc, temperature, humidite, debut=None):
+    """Tableaux ``(lignes, 7)`` de température et d'humidité, et masque des lignes restées sans météo.
+
+    Les colonnes ``temp_j`` / ``hum_j`` renseignées priment ; les autres jours
+    reçoivent les normales de la ``ville`` de la ligne, ou à défaut les valeurs
+    constantes ``temperature`` et ``humidite`` (lignes du masque).
+    """
+    debut = debut or datetime.date.today()
+    temp = np.full((len(bloc), JOURS), temperature, dtype=np.float64)
+    humid = np.full((len(bloc), JOURS), humidite, dtype=np.float64)
+    sans_meteo = np.ones(len(bloc), dtype=bool)
+    if "ville" in bloc:
+        villes = bloc["ville"].fillna("").astype(str).str.strip().to_numpy(dtype=object)
+        for ville in pd.unique(villes):
+            meteo = meteo_ville(ville, debut)
+            if meteo is not None:
+                lignes = villes == ville
+                temp[lignes], humid[lignes] = meteo
+                sans_meteo[lignes] = False
+    complet = np.ones(len(bloc), dtype=bool)
+    for j in range(JOURS):
+        for colonnes, valeurs in ((COLONNES_TEMP, temp), (COLONNES_HUM, humid)):
+            if colonnes[j] not in bloc:
+                complet[:] = False
+                continue
+            colonne = pd.to_numeric(bloc[colonnes[j]], errors="coerce").to_numpy()
+            renseigne = ~np.isnan(colonne)
+            valeurs[:, j] = np.where(renseigne, colonne, valeurs[:, j])
+            complet &= renseigne
+    return temp, humid, sans_meteo & ~complet
+
+
+def simuler_bloc(bloc, tarif=TARIF_ELECTRICITE, temperature=TEMPERATURE_DEFAUT, humidite=HUMIDITE_DEFAUT,
+                 debut=None):
+    """Simule toutes les lignes d'un bloc en un seul appel vectorisé et retourne le bloc de résultats.
+
+    ``attrs["lignes_sans_meteo"]`` du résultat compte les lignes simulées avec la météo constante.
+    """
+    parametres = {}
+    for colonne, (nom, defaut) in COLONNES.items():
+        if colonne not in bloc:
+            parametres[nom] = defaut
+        elif colonne == "inverter":
+            parametres[nom] = inverter_booleen(bloc[colonne])
+        elif isinstance(defaut, str):
+            parametres[nom] = bloc[colonne].fillna(defaut).astype(str).to_numpy(dtype=object)
+        else:
+            parametres[nom] = pd.to_numeric(bloc[colonne], errors="coerce").fillna(defaut).to_numpy()
+    temp, humid, sans_meteo = meteo_bloc(bloc, temperature, humidite, debut)
+    resultats = simuler(temp, humid, **parametres)
+
+    sortie = pd.DataFrame({c: bloc[c].to_numpy() for c in COLONNES_CONTEXTE if c in bloc}, index=bloc.index)
+    normale = resultats["journaliere_normale"]
+    optimisee = resultats["journaliere_optimisee"]
+    for j in range(JOURS):
+        sortie[f"normale_j{j + 1}_kwh"] = normale[:, j]
+        sortie[f"optimisee_j{j + 1}_kwh"] = optimisee[:, j]
+    sortie["total_normale_kwh"] = normale.sum(axis=1)
+    sortie["total_optimisee_kwh"] = optimisee.sum(axis=1)
+    sortie["cout_normal_dzd"] = sortie["total_normale_kwh"] * tarif
+    sortie["cout_optimise_dzd"] = sortie["total_optimisee_kwh"] * tarif
+    sortie["economie_kwh"] = sortie["total_normale_kwh"] - sortie["total_optimisee_kwh"]
+    sortie["economie_dzd"] = sortie["economie_kwh"] * tarif
+    sortie.attrs["lignes_sans_meteo"] = int(sans_meteo.sum())
+    return sortie
+
+
+def lire_blocs(chemin, taille_bloc):
+    """Itère sur le fichier d'entrée par blocs de ``taille_bloc`` lignes."""
+    if chemin.lower().endswith((".parquet", ".pq")):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            sys.exit("La lecture des fichiers Parquet nécessite le paquet pyarrow.")
+        for lot in pq.ParquetFile(chemin).iter_batches(batch_size=taille_bloc):
+            yield lot.to_pandas()
+    else:
+        yield from pd.read_csv(chemin, chunksize=taille_bloc)
+
+
+def tache(bloc, format_csv, tarif, temperature, humidite, debut):
+    """Travail d'un processus du pool : simule un bloc et, pour une sortie CSV, le sérialise
+    directement (la sérialisation est le poste le plus coûteux, elle ne doit pas rester dans
+    le processus principal)."""
+    resultat = simuler_bloc(bloc, tarif, temperature, humidite, debut)
+    sans_meteo = resultat.attrs["lignes_sans_meteo"]
+    if format_csv:
+        return (list(resultat.columns), len(resultat), sans_meteo,
+                resultat.to_csv(header=False, index=False, float_format="%.4f"))
+    return list(resultat.columns), len(resultat), sans_meteo, resultat
+
+
+class EcrivainResultats:
+    """Écrit les blocs de résultats au fil de l'eau (CSV, ou Parquet si l'extension l'indique)."""
+
+    def __init__(self, chemin):
+        self.chemin = chemin
+        self.parquet = chemin.lower().endswith((".parquet", ".pq"))
+        self.fichier = None
+        self.ecrivain = None
+
+    def ecrire(self, colonnes, contenu):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(contenu, preserve_index=False)
+            if self.ecrivain is None:
+                self.ecrivain = pq.ParquetWriter(self.chemin, table.schema)
+            self.ecrivain.write_table(table)
+        else:
+            if self.fichier is None:
+                self.fichier = open(self.chemin, "w", encoding="utf-8", newline="")
+                self.fichier.write(",".join(colonnes) + "\n")
+            self.fichier.write(contenu)
+
+    def fermer(self):
+        if self.ecrivain is not None:
+            self.ecrivain.close()
+        if self.fichier is not None:
+            self.fichier.close()
+
+
+def executer(entree, sortie, processus=None, taille_bloc=10000, tarif=TARIF_ELECTRICITE,
+             temperature=TEMPERATURE_DEFAUT, humidite=HUMIDITE_DEFAUT, debut=None, progression=sys.stderr):
+    """Simule tout le fichier ``entree`` et écrit les résultats dans ``sortie``. Retourne le nombre de lignes."""
+    processus = processus or os.cpu_count() or 1
+    # Même première journée pour tous les blocs, même si le calcul passe minuit
+    debut = debut or datetime.date.today()
+    # Au plus deux blocs en attente par processus : la mémoire ne dépend pas de la taille du fichier
+    max_en_vol = 2 * processus
+    ecrivain = EcrivainResultats(sortie)
+    en_vol = collections.deque()
+    lignes = sans_meteo = 0
+    depart = time.perf_counter()
+
+    def recuperer():
+        nonlocal lignes, sans_meteo
+        colonnes, n, n_sans_meteo, contenu = en_vol.popleft().get()
+        ecrivain.ecrire(colonnes, contenu)
+        lignes += n
+        sans_meteo += n_sans_meteo
+        if progression:
+            ecoule = time.perf_counter() - depart
+            progression.write(f"\r{lignes} lignes simulées ({lignes / max(ecoule, 1e-9):,.0f} lignes/s), "
+                              f"dont {sans_meteo} sans météo de ville (valeurs constantes)")
+            progression.flush()
+
+    try:
+        with multiprocessing.Pool(processus) as pool:
+            for bloc in lire_blocs(entree, taille_bloc):
+                en_vol.append(pool.apply_async(
+                    tache, (bloc, not ecrivain.parquet, tarif, temperature, humidite, debut)))
+                if len(en_vol) >= max_en_vol:
+                    recuperer()
+            while en_vol:
+                recuperer()
+    finally:
+        ecrivain.fermer()
+    if progression:
+        progression.write(f"\nTerminé en {time.perf_counter() - depart:.1f} s.\n")
+    return lignes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulation en lot de la consommation de climatiseurs (7 jours).")
+    parser.add_argument("entree", help="Fichier CSV ou Parquet des foyers (une ligne par climatiseur)")
+    parser.add_argument("sortie", help="Fichier de résultats (.csv ou .parquet)")
+    parser.add_argument("--processus", type=int, default=None, help="Nombre de processus (défaut : nombre de cœurs)")
+    parser.add_argument("--taille-bloc", type=int, default=10000, help="Nombre de lignes par bloc (défaut : 10000)")
+    parser.add_argument("--tarif", type=float, default=TARIF_ELECTRICITE, help="Tarif de l'électricité (DZD/kWh)")
+    parser.add_argument("--temperature", type=float, default=TEMPERATURE_DEFAUT,
+                        help="Température moyenne utilisée sans colonnes temp_1..temp_7 ni ville connue (°C)")
+    parser.add_argument("--humidite", type=float, default=HUMIDITE_DEFAUT,
+                        help="Humidité utilisée sans colonnes hum_1..hum_7 ni ville connue (%%)")
+    parser.add_argument("--debut", type=datetime.date.fromisoformat, default=None,
+                        help="Premier jour des normales climatiques des villes, AAAA-MM-JJ (défaut : aujourd'hui)")
+    parser.add_argument("--silencieux", action="store_true", help="Ne pas afficher la progression")
+    args = parser.parse_args(argv)
+    executer(args.entree, args.sortie, processus=args.processus, taille_bloc=args.taille_bloc,
+             tarif=args.tarif, temperature=args.temperature, humidite=args.humidite, debut=args.debut,
+             progression=None if args.silencieux else sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
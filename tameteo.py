@@ -0,0 +1,101 @@
+"""Analyse des prévisions de la page Tameteo (source de secours).
+
+La page est lue en flux, ligne par ligne, et l'analyse s'arrête dès que les
+7 jours sont trouvés : le reste de la page n'est ni téléchargé ni décodé.
+Chaque ligne de jour (« * Aujourd'hui 28 Mars ... 18° / 7° ... ») est
+reconnue par un seul motif précompilé qui extrait aussi les températures
+maximale et minimale, rendues en nombres. Les analyses sont mémorisées par
+ville et par date dans le processus.
+"""
+import collections
+import datetime
+import re
+import threading
+
+import traces
+
+JOURS = 7
+HUMIDITE_TAMETEO = 50  # Tameteo ne fournit pas l'humidité dans son résumé
+TAILLE_MORCEAU = 8192
+TAILLE_MAX_DEFAUT = 64
+
+# Ligne de jour : nom du jour suivi d'au plus deux mots (date), puis « max° / min° » éventuels
+MOTIF_JOUR = re.compile(
+    r"\s*\*\s*(?P<date>(?:Aujourd['´’]hui|Demain|Lundi|Mardi|Mercredi|Jeudi|Vendredi|Samedi|Dimanche)"
+    r"(?:\s+[^\s°/]+){0,2})"
+    r"(?:.*?(?P<max>-?\d+(?:[.,]\d+)?)°\s*/\s*(?P<min>-?\d+(?:[.,]\d+)?)°)?")
+
+
+def _nombre(texte):
+    return float(texte.replace(",", ".")) if texte is not None else None
+
+
+def analyser(lignes, jours=JOURS):
+    """Prévisions ``{"date", "max", "min"}`` (°C, ``None`` si absentes) des premières lignes de jour.
+
+    ``lignes`` peut être un itérateur paresseux (flux HTTP) : il n'est plus
+    consommé une fois ``jours`` lignes trouvées.
+    """
+    previsions = []
+    for ligne in lignes:
+        correspondance = MOTIF_JOUR.match(ligne)
+        if correspondance is None:
+            continue
+        previsions.append({
+            "date": re.sub(r"[´’]", "'", correspondance["date"]),
+            "max": _nombre(correspondance["max"]),
+            "min": _nombre(correspondance["min"]),
+        })
+        if len(previsions) >= jours:
+            break
+    return previsions
+
+
+def lire(reponse, jours=JOURS, taille_morceau=TAILLE_MORCEAU):
+    """Analyse une réponse ``requests`` ouverte avec ``stream=True`` puis la ferme."""
+    with reponse, traces.span("tameteo.lecture", statut=reponse.status_code) as s:
+        reponse.encoding = "utf-8"
+        previsions = analyser(reponse.iter_lines(chunk_size=taille_morceau, decode_unicode=True), jours)
+        # Octets effectivement lus avant l'arrêt anticipé
+        s["octets"] = reponse.raw.tell() if hasattr(reponse.raw, "tell") else -1
+        s["jours"] = len(previsions)
+        return previsions
+
+
+def lignes_previsions(previsions):
+    """Lignes de prévision (format du tableau de l'application) depuis les valeurs analysées."""
+    lignes = []
+    for jour in previsions:
+        if jour["max"] is not None and jour["min"] is not None:
+            moyenne = (jour["max"] + jour["min"]) / 2.0
+        else:
+            moyenne = jour["max"] if jour["max"] is not None else jour["min"]
+        lignes.append({
+            "Date": jour["date"],
+            "Température (°C)": f"{moyenne:.1f}" if moyenne is not None else "",
+            "Humidité (%)": f"{HUMIDITE_TAMETEO:.0f}"
+        })
+    return lignes
+
+
+class CachePrevisions:
+    """Analyses Tameteo par (ville, date), en LRU thread-safe ; seules les analyses non vides sont gardées."""
+
+    def __init__(self, taille_max=TAILLE_MAX_DEFAUT):
+        self.taille_max = taille_max
+        self._entrees = collections.OrderedDict()
+        self._verrou = threading.Lock()
+
+    def obtenir(self, ville, charger, date=None):
+        cle = (ville, str(date or datetime.date.today()))
+        with self._verrou:
+            if cle in self._entrees:
+                self._entrees.move_to_end(cle)
+                return self._entrees[cle]
+        previsions = charger()
+        if previsions:
+            with self._verrou:
+                self._entrees[cle] = previsions
+                while len(self._entrees) > self.taille_max:
+                    self._entrees.popitem(last=False)
+        return previsions
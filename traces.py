@@ -0,0 +1,229 @@
+"""Instrumentation légère : spans (durée, octets, cache, jetons) par exécution de l'application.
+
+Une trace regroupe les spans d'une exécution (rerun complet ou d'un fragment).
+Les spans s'emboîtent par ``contextvars`` et suivent les tâches soumises à un
+pool de threads si elles sont lancées avec ``soumettre()``. Hors trace active
+(fonction désactivée), ``span()`` retourne un gestionnaire de contexte vide
+partagé : le coût se limite à la lecture d'une variable de contexte.
+
+Export : JSON lines (un span par ligne) ou OTLP/JSON (format de fichier de
+l'exporteur OpenTelemetry : une requête ``resourceSpans`` par ligne). Si
+``TRACES_FICHIER`` est défini, chaque trace terminée y est ajoutée
+(``TRACES_FORMAT`` : ``jsonl`` par défaut, ou ``otlp``).
+"""
+import contextlib
+import contextvars
+import json
+import os
+import secrets
+import threading
+import time
+
+ACTIVES_PAR_DEFAUT = os.environ.get("TRACES_ACTIVES", "").lower() in {"1", "oui", "true"}
+FICHIER = os.environ.get("TRACES_FICHIER")
+FORMAT = os.environ.get("TRACES_FORMAT", "jsonl")
+SERVICE = "simulateur-climatiseur"
+
+_trace = contextvars.ContextVar("trace", default=None)
+_parent = contextvars.ContextVar("span_parent", default=None)
+_verrou_fichier = threading.Lock()
+
+
+class Trace:
+    """Spans d'une exécution, ajoutés depuis n'importe quel thread."""
+
+    def __init__(self, nom):
+        self.nom = nom
+        self.id = secrets.token_hex(16)
+        self.debut_ns = time.time_ns()
+        self.fin_ns = None
+        self.spans = []
+        self._verrou = threading.Lock()
+
+    def ajouter(self, span):
+        with self._verrou:
+            self.spans.append(span)
+
+
+class _SpanNul:
+    """Gestionnaire de contexte vide, utilisé quand aucune trace n'est active."""
+
+    def __enter__(self):
+        return {}
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NUL = _SpanNul()
+
+
+def active():
+    trace = _trace.get()
+    return trace is not None and trace.fin_ns is None
+
+
+def demarrer(nom):
+    """Démarre une trace dans le contexte courant et la retourne."""
+    trace = Trace(nom)
+    _trace.set(trace)
+    _parent.set(None)
+    return trace
+
+
+def terminer(trace=None):
+    """Termine la trace courante, ou ``trace`` (ex. exécution interrompue), et la retourne.
+
+    La trace terminée est écrite dans ``TRACES_FICHIER`` s'il est défini.
+    """
+    courante = _trace.get()
+    trace = trace or courante
+    if trace is None or trace.fin_ns is not None:
+        return None
+    trace.fin_ns = time.time_ns()
+    if trace is courante:
+        _trace.set(None)
+    if FICHIER:
+        ecrire(trace, FICHIER, FORMAT)
+    return trace
+
+
+def span(nom, **attributs):
+    """Span enfant du span courant ; sans trace active, gestionnaire vide."""
+    trace = _trace.get()
+    if trace is None or trace.fin_ns is not None:
+        return _NUL
+    return _span(trace, nom, attributs)
+
+
+@contextlib.contextmanager
+def _span(trace, nom, attributs):
+    # Les attributs peuvent être complétés pendant le span (``s["octets"] = ...``)
+    identifiant = secrets.token_hex(8)
+    parent = _parent.get()
+    jeton = _parent.set(identifiant)
+    debut = time.time_ns()
+    try:
+        yield attributs
+    except Exception as exc:
+        attributs["erreur"] = type(exc).__name__
+        raise
+    except BaseException as exc:
+        # Interruption de contrôle (ex. relance du script Streamlit), pas une erreur
+        attributs["interruption"] = type(exc).__name__
+        raise
+    finally:
+        fin = time.time_ns()
+        _parent.reset(jeton)
+        trace.ajouter({"nom": nom, "id": identifiant, "parent": parent, "debut_ns": debut,
+                       "fin_ns": fin, "attributs": dict(attributs)})
+
+
+def enregistrer(nom, debut_ns, fin_ns, **attributs):
+    """Ajoute un span déjà mesuré (ex. générateur consommé par morceaux) à la trace courante."""
+    trace = _trace.get()
+    if trace is None or trace.fin_ns is not None:
+        return
+    trace.ajouter({"nom": nom, "id": secrets.token_hex(8), "parent": _parent.get(), "debut_ns": debut_ns,
+                   "fin_ns": fin_ns, "attributs": attributs})
+
+
+@contextlib.contextmanager
+def execution(nom, collecter=None):
+    """Span ``nom`` dans la trace courante, ou nouvelle trace si aucune n'est active.
+
+    Une trace créée ici est terminée en sortie puis passée à ``collecter``
+    (ex. réexécution d'un fragment, hors de la trace du rerun complet).
+    """
+    if active():
+        with span(nom) as attributs:
+            yield attributs
+        return
+    trace = demarrer(nom)
+    try:
+        with span(nom) as attributs:
+            yield attributs
+    finally:
+        if terminer() is not None and collecter is not None:
+            collecter(trace)
+
+
+def soumettre(executeur, fonction, *args):
+    """``executeur.submit`` qui propage la trace courante dans le thread de la tâche."""
+    if _trace.get() is None:
+        return executeur.submit(fonction, *args)
+    return executeur.submit(contextvars.copy_context().run, fonction, *args)
+
+
+def lignes_jsonl(trace):
+    for s in sorted(trace.spans, key=lambda s: s["debut_ns"]):
+        yield json.dumps({"trace": trace.id, "execution": trace.nom, **s}, ensure_ascii=False, default=str)
+
+
+def _valeur_otlp(valeur):
+    if isinstance(valeur, bool):
+        return {"boolValue": valeur}
+    if isinstance(valeur, int):
+        return {"intValue": str(valeur)}
+    if isinstance(valeur, float):
+        return {"doubleValue": valeur}
+    return {"stringValue": str(valeur)}
+
+
+def otlp(trace):
+    """Trace au format OTLP/JSON (``ExportTraceServiceRequest``)."""
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE}}]},
+        "scopeSpans": [{
+            "scope": {"name": "traces"},
+            "spans": [{
+                "traceId": trace.id,
+                "spanId": s["id"],
+                **({"parentSpanId": s["parent"]} if s["parent"] else {}),
+                "name": s["nom"],
+                "kind": 1,
+                "startTimeUnixNano": str(s["debut_ns"]),
+                "endTimeUnixNano": str(s["fin_ns"]),
+                "attributes": [{"key": k, "value": _valeur_otlp(v)} for k, v in s["attributs"].items()],
+                "status": {"code": 2} if "erreur" in s["attributs"] else {},
+            } for s in trace.spans],
+        }],
+    }]}
+
+
+def exporter(trace, format_export="jsonl"):
+    """Texte exporté de la trace (``jsonl`` ou ``otlp``), terminé par un saut de ligne."""
+    if format_export == "otlp":
+        return json.dumps(otlp(trace), ensure_ascii=False) + "\n"
+    return "".join(ligne + "\n" for ligne in lignes_jsonl(trace))
+
+
+def ecrire(trace, chemin, format_export="jsonl"):
+    """Ajoute la trace au fichier local ``chemin``."""
+    texte = exporter(trace, format_export)
+    with _verrou_fichier, open(chemin, "a", encoding="utf-8") as f:
+        f.write(texte)
+
+
+def cascade(trace):
+    """Lignes ``{"Span", "Début (ms)", "Fin (ms)", "Durée (ms)", "Profondeur", ...attributs}`` triées par début."""
+    profondeurs = {}
+    par_id = {s["id"]: s for s in trace.spans}
+
+    def profondeur(s):
+        if s["id"] not in profondeurs:
+            parent = par_id.get(s["parent"])
+            profondeurs[s["id"]] = 0 if parent is None else profondeur(parent) + 1
+        return profondeurs[s["id"]]
+
+    lignes = []
+    for s in sorted(trace.spans, key=lambda s: s["debut_ns"]):
+        lignes.append({
+            "Span": "  " * profondeur(s) + s["nom"],
+            "Début (ms)": (s["debut_ns"] - trace.debut_ns) / 1e6,
+            "Fin (ms)": (s["fin_ns"] - trace.debut_ns) / 1e6,
+            "Durée (ms)": (s["fin_ns"] - s["debut_ns"]) / 1e6,
+            "Profondeur": profondeur(s),
+            **s["attributs"],
+        })
+    return lignes